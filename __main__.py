@@ -1,10 +1,47 @@
-from interpreter.interpreter.interpreter import Interpreter
+from interpreter.interpreter.interpreter import Interpreter, ResourceLimitExceeded
+from interpreter.interpreter.incremental import IncrementalCompiler
+from interpreter.interpreter.number import UninitializedRead
+from interpreter.interpreter.sanitizer import SanitizerError
+from interpreter.interpreter.profiler import Profiler
+from interpreter.interpreter.coverage import Coverage
+from interpreter.interpreter.stats import RunStats
+from interpreter.common.utils import MessageColor
+from interpreter.lexical_analysis.lexer import LexicalError
+from interpreter.syntax_analysis.parser import SyntaxError
+from interpreter.semantic_analysis.analyzer import SemanticError
 import argparse
+import json
+import os
+import sys
+import time
 
 
+# seconds between two checks of the modification time of the watched file
+WATCH_INTERVAL = 0.5
+
 parser = argparse.ArgumentParser(description='Execute .c file')
 parser.add_argument('-f', '--file', help='File with C code')
 parser.add_argument('-c', '--code', help='C code')
+parser.add_argument('args', nargs='*', help='Arguments passed to main(int argc, int* argv)')
+parser.add_argument('--uninitialized', choices=['zero', 'random', 'poison'], default='zero',
+                    help='Value of uninitialized memory: zero, random (see --seed) or poison (reading it is an error)')
+parser.add_argument('--seed', type=int, help='Seed for --uninitialized=random')
+parser.add_argument('--sanitize', action='store_true',
+                    help='Stop at uninitialized reads, use-after-free and double frees, report leaks to stderr')
+parser.add_argument('--jobs', type=int, help='Parse top-level declarations of large files in this many processes')
+parser.add_argument('--watch', action='store_true',
+                    help='Run the file again every time it changes, recompiling only the changed functions')
+parser.add_argument('--max-errors', type=int, default=20,
+                    help='Report up to this many lexical and syntax errors before stopping (default 20)')
+parser.add_argument('--diagnostics', choices=['text', 'json', 'none'], default='text',
+                    help='Print the warnings of the analysis to stderr as text (default), as JSON or not at all')
+parser.add_argument('--max-steps', type=int, help='Maximum number of evaluated statements/expressions')
+parser.add_argument('--time-limit', type=float, help='Wall-clock time limit in seconds')
+parser.add_argument('--profile', action='store_true', help='Print hot C lines and functions to stderr')
+parser.add_argument('--profile-output', help='Write collapsed stacks (for flamegraph tools) to this file')
+parser.add_argument('--stats', action='store_true', help='Print phase timings and memory statistics as JSON to stderr')
+parser.add_argument('--coverage', help='Merge node counters of this run into this JSON file')
+parser.add_argument('--coverage-report', help='Write gcov-like line and branch coverage to this file')
 
 args = parser.parse_args()
 if not args.file and not args.code:
@@ -13,10 +50,97 @@ if not args.file and not args.code:
 elif args.file and args.code:
     argparse.ArgumentParser().error('You can choose only one argument [-f or -c]')
 
-code = ''
-if args.file:
-    with open(args.file, 'r') as file:
-        code = file.read()
+elif args.watch and not args.file:
+    argparse.ArgumentParser().error('--watch needs a file [-f]')
+
+
+def run(code, compiler=None):
+    """ Runs the code once, returns 1 if it stopped with an error """
+    profiler = None
+    if args.profile or args.profile_output:
+        profiler = Profiler()
+
+    coverage = None
+    if args.coverage or args.coverage_report:
+        coverage = Coverage(code, args.file or '<code>')
+
+    stats = RunStats()
+
+    try:
+        Interpreter.run(code, max_steps=args.max_steps, time_limit=args.time_limit, profiler=profiler,
+                        coverage=coverage, stats=stats, argv=[args.file or '<code>'] + args.args,
+                        uninitialized=args.uninitialized, seed=args.seed, sanitize=args.sanitize,
+                        jobs=args.jobs, max_errors=args.max_errors, compiler=compiler,
+                        diagnostics=None if args.diagnostics == 'none' else args.diagnostics)
+    except (ResourceLimitExceeded, UninitializedRead, SanitizerError) as e:
+        print()
+        print(MessageColor.FAIL + str(e) + MessageColor.ENDC, file=sys.stderr)
+        return 1
+    finally:
+        if args.stats:
+            print(stats.to_json(), file=sys.stderr)
+        if profiler is not None:
+            if args.profile:
+                print(profiler.report(), file=sys.stderr)
+            if args.profile_output:
+                with open(args.profile_output, 'w') as file:
+                    file.write(profiler.collapsed_stacks())
+        if coverage is not None and coverage.hits is not None:
+            if args.coverage:
+                if os.path.exists(args.coverage):
+                    try:
+                        with open(args.coverage, 'r') as file:
+                            coverage.merge(json.load(file))
+                    except (ValueError, KeyError) as e:
+                        # counters of another version of the file, replaced by the ones of this run
+                        print(MessageColor.WARNING + '{}, overwriting {}'.format(e, args.coverage) + MessageColor.ENDC,
+                              file=sys.stderr)
+                with open(args.coverage, 'w') as file:
+                    file.write(coverage.to_json())
+            if args.coverage_report:
+                with open(args.coverage_report, 'w') as file:
+                    file.write(coverage.gcov())
+    return 0
+
+
+def watch(filename):
+    """ Polls the modification time of the file and runs it whenever it changes, until interrupted """
+    compiler = IncrementalCompiler(max_errors=args.max_errors)
+    modified = None
+    while True:
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != modified:
+            modified = mtime
+            with open(filename, 'r') as file:
+                code = file.read()
+            try:
+                run(code, compiler)
+            except (LexicalError, SyntaxError, SemanticError) as e:
+                print(MessageColor.FAIL + str(e) + MessageColor.ENDC, file=sys.stderr)
+            except Exception as e:
+                # the program failed at run time, the next save may fix it
+                print()
+                print(MessageColor.FAIL + '{}: {}'.format(type(e).__name__, e) + MessageColor.ENDC, file=sys.stderr)
+            else:
+                print('Recompiled {} declarations, analyzed {} functions'.format(
+                    compiler.reparsed, compiler.reanalyzed), file=sys.stderr)
+            print('Watching {} for changes'.format(filename), file=sys.stderr)
+        time.sleep(WATCH_INTERVAL)
+
+
+if args.watch:
+    try:
+        watch(args.file)
+    except KeyboardInterrupt:
+        pass
 else:
-    code = args.code
-Interpreter.run(code)
+    if args.file:
+        with open(args.file, 'r') as file:
+            code = file.read()
+    else:
+        code = args.code
+    if run(code):
+        sys.exit(1)
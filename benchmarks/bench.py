@@ -0,0 +1,202 @@
+###############################################################################
+#  Benchmarks for the whole pipeline: lexing, parsing, analysis, execution.  #
+#                                                                             #
+#  $ python benchmarks/bench.py run -o results.json                          #
+#  $ python benchmarks/bench.py compare baseline.json results.json           #
+#                                                                             #
+###############################################################################
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter.lexical_analysis.lexer import Lexer
+from interpreter.lexical_analysis.token_type import EOF
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from interpreter.interpreter.interpreter import Interpreter
+from interpreter.interpreter import idioms
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs')
+PHASES = ['lex', 'parse', 'analyze', 'execute']
+
+
+def read_program(name):
+    with open(os.path.join(PROGRAMS_DIR, name), 'r') as file:
+        return file.read()
+
+
+def large_source(functions=150):
+    """ Generates a long translation unit: many small functions and a main that calls a few of them """
+    parts = ['#include <stdio.h>\n']
+    for i in range(functions):
+        parts.append("""
+int helper{i}(int a, int b) {{
+    int c = a * {i} + b;
+    int d = c - (a + b) * 2;
+    if (c > d) {{
+        c = c - d;
+    }} else {{
+        d = d - c;
+    }}
+    while (d > 100) {{
+        d = d / 2;
+    }}
+    return c + d;
+}}
+""".format(i=i))
+    parts.append("""
+int main() {
+    int total = helper0(1, 2) + helper1(3, 4);
+    printf("%d\\n", total);
+    return 0;
+}
+""")
+    return ''.join(parts)
+
+
+# name -> (source, stdin)
+BENCHMARKS = {
+    'arith_loop': lambda: (read_program('arith_loop.c'), ''),
+    'recursion': lambda: (read_program('recursion.c'), ''),
+    'pointer_chase': lambda: (read_program('pointer_chase.c'), ''),
+    'struct_list': lambda: (read_program('struct_list.c'), ''),
+    'printf_heavy': lambda: (read_program('printf_heavy.c'), ''),
+    'scanf_heavy': lambda: (read_program('scanf_heavy.c'), '2000\n' + ''.join('{}\n'.format(i) for i in range(2000))),
+    'large_source': lambda: (large_source(), ''),
+}
+
+
+@contextlib.contextmanager
+def redirected_io(stdin):
+    """ Feeds the program's stdin and swallows everything it (and the analyzer) prints """
+    old_stdin, old_stdout = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = io.StringIO(stdin), io.StringIO()
+    try:
+        yield
+    finally:
+        sys.stdin, sys.stdout = old_stdin, old_stdout
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_once(source, stdin, sanitize=False):
+    """ Runs every phase on fresh objects, returns {phase: seconds} """
+    def lex():
+        lexer = Lexer(source)
+        while lexer.get_next_token.type != EOF:
+            pass
+
+    times = {}
+    with redirected_io(stdin):
+        _, times['lex'] = timed(lex)
+        # the parser pulls tokens on demand so this includes a second lexing pass
+        tree, times['parse'] = timed(lambda: Parser(Lexer(source)).parse())
+        _, times['analyze'] = timed(lambda: (SemanticAnalyzer.analyze(tree), idioms.annotate(tree)))
+        _, times['execute'] = timed(lambda: Interpreter(sanitize=sanitize).interpret(tree))
+    times['total'] = sum(times[phase] for phase in PHASES)
+    return times
+
+
+def run_benchmarks(names, repeat, sanitize=False):
+    results = {}
+    for name in names:
+        source, stdin = BENCHMARKS[name]()
+        runs = [run_once(source, stdin, sanitize) for _ in range(repeat)]
+        results[name] = {
+            phase: {
+                'min': min(run[phase] for run in runs),
+                'median': statistics.median(run[phase] for run in runs),
+            } for phase in PHASES + ['total']
+        }
+        print('{:<16} {}'.format(name, '  '.join(
+            '{} {:8.2f}ms'.format(phase, 1000 * results[name][phase]['min']) for phase in PHASES + ['total']
+        )), file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': repeat,
+        'sanitize': sanitize,
+        'benchmarks': results,
+    }
+
+
+def compare(baseline, current, threshold, noise_floor):
+    """ Prints a per-phase comparison, returns the list of regressions """
+    regressions = []
+    print('{:<16} {:<8} {:>11} {:>11} {:>8}'.format('benchmark', 'phase', 'baseline', 'current', 'change'))
+    for name, phases in sorted(current['benchmarks'].items()):
+        if name not in baseline['benchmarks']:
+            continue
+        for phase in PHASES + ['total']:
+            old = baseline['benchmarks'][name][phase]['min']
+            new = phases[phase]['min']
+            change = (new - old) / old if old else 0.0
+            flag = ''
+            # ignore phases too short to measure reliably
+            if change > threshold and max(old, new) >= noise_floor:
+                flag = '  REGRESSION'
+                regressions.append((name, phase, change))
+            print('{:<16} {:<8} {:>9.2f}ms {:>9.2f}ms {:>+7.1f}%{}'.format(
+                name, phase, 1000 * old, 1000 * new, 100 * change, flag
+            ))
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Benchmark the C interpreter pipeline.')
+    subparsers = argparser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and store the results as JSON')
+    run_parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all)')
+    run_parser.add_argument('-o', '--output', help='JSON file for the results (default: stdout)')
+    run_parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs per benchmark')
+    run_parser.add_argument('--sanitize', action='store_true', help='Execute with the memory sanitizer')
+
+    compare_parser = subparsers.add_parser('compare', help='Flag regressions against a saved baseline')
+    compare_parser.add_argument('baseline', help='Baseline results JSON')
+    compare_parser.add_argument('current', help='Current results JSON')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.10,
+                                help='Relative slowdown reported as a regression (default: 0.10)')
+    compare_parser.add_argument('--noise-floor', type=float, default=0.005,
+                                help='Phases faster than this many seconds are never flagged')
+
+    args = argparser.parse_args()
+    if args.command == 'run':
+        unknown = [name for name in args.names if name not in BENCHMARKS]
+        if unknown:
+            argparser.error('Unknown benchmarks: {}'.format(', '.join(unknown)))
+        results = run_benchmarks(args.names or list(BENCHMARKS), args.repeat, args.sanitize)
+        content = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, 'w') as file:
+                file.write(content)
+        else:
+            print(content)
+    elif args.command == 'compare':
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        with open(args.current, 'r') as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, args.threshold, args.noise_floor)
+        if regressions:
+            print('{} regression(s) above {:.0f}%'.format(len(regressions), 100 * args.threshold))
+            sys.exit(1)
+    else:
+        argparser.print_help()
+
+
+if __name__ == '__main__':
+    main()
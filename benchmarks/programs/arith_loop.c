@@ -0,0 +1,15 @@
+#include <stdio.h>
+
+int main() {
+    int i, j;
+    int acc = 0;
+    double x = 0.5;
+    for (i = 0; i < 60; i++) {
+        for (j = 0; j < 50; j++) {
+            acc = (acc * 31 + i * j + 7) % 65521;
+            x = x * 0.75 + j / 4.0;
+        }
+    }
+    printf("%d %f\n", acc, x);
+    return 0;
+}
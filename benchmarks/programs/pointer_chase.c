@@ -0,0 +1,24 @@
+#include <stdio.h>
+#include <stdlib.h>
+
+int main() {
+    int n = 401;
+    int base = malloc(n * 4);
+    int* cell = base;
+    int i;
+    // every cell points to the cell 37 slots ahead, wrapping around
+    for (i = 0; i < n; i++) {
+        *cell = base + ((i + 37) % n) * 4;
+        cell++;
+    }
+    int p = base;
+    int hops;
+    int sum = 0;
+    for (hops = 0; hops < 3000; hops++) {
+        p = *p;
+        sum += (p - base) / 4;
+    }
+    printf("%d\n", sum);
+    free(base);
+    return 0;
+}
@@ -0,0 +1,10 @@
+#include <stdio.h>
+
+int main() {
+    int i;
+    double x = 1.5;
+    for (i = 0; i < 1500; i++) {
+        printf("%d: %f %c\n", i, x * i, 'a' + i % 26);
+    }
+    return 0;
+}
@@ -0,0 +1,27 @@
+#include <stdio.h>
+
+int fib(int n) {
+    int r = n;
+    if (n >= 2) {
+        r = fib(n - 1) + fib(n - 2);
+    }
+    return r;
+}
+
+int ackermann(int m, int n) {
+    int r = n + 1;
+    if (m > 0) {
+        if (n == 0) {
+            r = ackermann(m - 1, 1);
+        } else {
+            r = ackermann(m - 1, ackermann(m, n - 1));
+        }
+    }
+    return r;
+}
+
+int main() {
+    printf("%d\n", fib(15));
+    printf("%d\n", ackermann(2, 3));
+    return 0;
+}
@@ -0,0 +1,29 @@
+#include <stdio.h>
+#include <stdlib.h>
+
+struct node {
+    int val;
+    int weight;
+    struct node* next;
+};
+
+int main() {
+    struct node a, b, c, d, e, f, g, h;
+    a.val = 1; b.val = 2; c.val = 3; d.val = 4;
+    e.val = 5; f.val = 6; g.val = 7; h.val = 8;
+    a.next = &b; b.next = &c; c.next = &d; d.next = &e;
+    e.next = &f; f.next = &g; g.next = &h; h.next = NULL;
+    struct node* curr;
+    int round;
+    int total = 0;
+    for (round = 0; round < 150; round++) {
+        curr = &a;
+        while (curr != NULL) {
+            curr->weight = curr->val * round;
+            total += curr->weight % 7;
+            curr = curr->next;
+        }
+    }
+    printf("%d\n", total);
+    return 0;
+}
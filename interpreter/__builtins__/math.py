@@ -3,6 +3,7 @@ Supports basic functions and constants from math.h library.
 """
 
 from ..common.utils import definition
+from ..interpreter.kernels import map_elements
 import math
 
 # Trigonometric functions
@@ -101,3 +102,36 @@ def trunc(a):
 def round(a):
     import builtins
     return builtins.round(a)
+
+# Bulk functions over double arrays: vf(dst, src, n) computes dst[i] = f(src[i]) for 0 <= i < n.
+# They give exactly the same results as the scalar function called in a C loop, only faster.
+
+@definition(return_type=None, arg_types=['double *', 'double *', 'int'])
+def vsqrt(*args):
+    dst, src, n, memory = args
+    map_elements(memory, sqrt, dst, [src], n)
+
+@definition(return_type=None, arg_types=['double *', 'double *', 'int'])
+def vsin(*args):
+    dst, src, n, memory = args
+    map_elements(memory, sin, dst, [src], n)
+
+@definition(return_type=None, arg_types=['double *', 'double *', 'int'])
+def vcos(*args):
+    dst, src, n, memory = args
+    map_elements(memory, cos, dst, [src], n)
+
+@definition(return_type=None, arg_types=['double *', 'double *', 'int'])
+def vexp(*args):
+    dst, src, n, memory = args
+    map_elements(memory, exp, dst, [src], n)
+
+@definition(return_type=None, arg_types=['double *', 'double *', 'int'])
+def vlog(*args):
+    dst, src, n, memory = args
+    map_elements(memory, log, dst, [src], n)
+
+@definition(return_type=None, arg_types=['double *', 'double *', 'double *', 'int'])
+def vpow(*args):
+    dst, base, exponent, n, memory = args
+    map_elements(memory, pow, dst, [base, exponent], n)
@@ -8,14 +8,20 @@ from ..common.ctype import CType
 
 
 import re
-import sys
 
 @definition(return_type='int', arg_types=None)
 def printf(*args):
-    fmt, *params = args
-    message = fmt % tuple([param for param in params])
+    fmt, *params, memory = args
+    fmt = memory.read_string(fmt)
+    # %s arguments are addresses of C strings
+    conversions = [match[-1] for match in re.findall(r'%[-+ #0-9.*hlL]*[a-zA-Z%]', fmt) if match != '%%']
+    params = [
+        memory.read_string(param) if conversion == 's' else param
+        for conversion, param in zip(conversions, params)
+    ] + params[len(conversions):]
+    message = fmt % tuple(params)
     result = len(message)
-    print(message, end='')
+    memory.stdout.write(message)
     return result
 
 @definition(return_type='int', arg_types=None)
@@ -32,10 +38,11 @@ def scanf(*args):
 
     # unpack args: format string, addresses, memory
     fmt, *addresses, memory = args
+    fmt = memory.read_string(fmt)
 
     # Extract type specifiers from the format string
     fmt = re.sub(r'\s+', '', fmt)  # Remove whitespace
-    specifiers = re.findall('%[^%]*[dfic]', fmt)
+    specifiers = re.findall('%[^%]*[dfics]', fmt)
     if len(specifiers) != len(addresses):
         raise Exception('Format of scanf function takes {} positional arguments but {} were given'.format(
             len(specifiers),
@@ -45,25 +52,38 @@ def scanf(*args):
     # Scan the appropriate number of tokens
     tokens = []
     while len(tokens) < len(specifiers):
-        line = input()
+        line = memory.stdin.readline()
+        if not line:
+            # end of input before the first conversion
+            if not tokens:
+                return -1
+            break
         tokens.extend(line.split())
         # Note: this can easily fail because it always reads the whole line
 
     # Cast tokens and perform assignments
     for spec, address, val in zip(specifiers, addresses, tokens):
+        if spec[-1] == 's':
+            memory.write_bytes(address, val.encode('utf-8') + b'\0')
+            continue
         memory.set_at_address(address, Number(CType.from_string(get_type_name(spec)), val))
 
     return len(tokens)
 
 @definition(return_type='char', arg_types=[])
-def getchar():
-    return ord(sys.stdin.read(1))
+def getchar(*args):
+    memory, = args
+    ch = memory.stdin.read(1)
+    if not ch:
+        return -1  # EOF
+    return ord(ch)
 
 
 @definition(return_type='char', arg_types=['char'])
-def putchar(ch):
+def putchar(*args):
+    ch, memory = args
     try:
-        sys.stdout.write(chr(ch))
+        memory.stdout.write(chr(ch))
         return ch
     except UnicodeEncodeError:
         return 0
@@ -2,20 +2,21 @@
 Supports basic functions and constants from stdlib.h library.
 """
 
-import random
 from ..common.utils import definition
 
 RAND_MAX = 32767
 NULL = 0
 
 @definition(return_type='int', arg_types=None)
-def rand():
-    return random.randint(0, RAND_MAX)
+def rand(*args):
+    memory, = args
+    return memory.random.randint(0, RAND_MAX)
 
 
 @definition(return_type='int', arg_types=['unsigned int'])
-def srand(seed):
-    random.seed(seed)
+def srand(*args):
+    seed, memory = args
+    memory.random.seed(seed)
 
 
 @definition(return_type='int', arg_types=['int'])
@@ -30,18 +31,11 @@ def abs(num):
 @definition(return_type='int', arg_types=['int'])
 def malloc(*args):
     sz, memory = args
-    address = memory.allocate(sz)
-    memory.dyn_alloc_addr.add(address)
-    return address
+    return memory.dyn_allocate(sz)
 
 @definition(return_type=None, arg_types=None)
 def free(*args):
     address, memory = args
-    # if allocated kill it
-    if address in memory.dyn_alloc_addr:
-        memory.dyn_alloc_addr.remove(address)
-        del memory.raw_memory[address]
-    else:
-        raise RuntimeError("Can't free memory that was not dynamically allocated")
+    memory.dyn_free(address)
 
 
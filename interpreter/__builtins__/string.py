@@ -0,0 +1,94 @@
+"""
+Supports basic functions from string.h library.
+
+Strings are NUL-terminated bytes: in the data segment of the memory they are read, searched and
+written through memoryview slices without copying them, anywhere else byte by byte as char cells. Memory outside of the data
+segment is made of typed cells rather than bytes: functions working with raw blocks copy or
+overwrite whole cells, see the bulk operations of Memory.
+"""
+
+from ..common.utils import definition
+
+NULL = 0
+
+
+@definition(return_type='char *', arg_types=None)
+def memset(*args):
+    address, byte, block_sz, memory = args
+    memory.set_bytes(address, byte, block_sz)
+    return address
+
+
+@definition(return_type='char *', arg_types=None)
+def memcpy(*args):
+    dst, src, block_sz, memory = args
+    memory.move_bytes(dst, src, block_sz)
+    return dst
+
+
+@definition(return_type='char *', arg_types=None)
+def memmove(*args):
+    dst, src, block_sz, memory = args
+    memory.move_bytes(dst, src, block_sz)
+    return dst
+
+
+@definition(return_type='int', arg_types=None)
+def memcmp(*args):
+    first, second, block_sz, memory = args
+    return memory.compare_bytes(memory.read_bytes(first, block_sz), memory.read_bytes(second, block_sz))
+
+
+@definition(return_type='int', arg_types=None)
+def strlen(*args):
+    address, memory = args
+    return len(memory.c_string(address))
+
+
+@definition(return_type='int', arg_types=None)
+def strcmp(*args):
+    first, second, memory = args
+    return memory.compare_bytes(memory.c_string(first), memory.c_string(second))
+
+
+@definition(return_type='char *', arg_types=None)
+def strcpy(*args):
+    dst, src, memory = args
+    memory.write_string(dst, memory.c_string(src))
+    return dst
+
+
+@definition(return_type='char *', arg_types=None)
+def strncpy(*args):
+    dst, src, count, memory = args
+    content = memory.c_string(src)[:count]
+    memory.write_bytes(dst, content)
+    # the rest is padded with NULs, there is no terminator if src is count bytes or longer
+    if count > len(content):
+        memory.write_bytes(dst + len(content), bytes(count - len(content)))
+    return dst
+
+
+@definition(return_type='char *', arg_types=None)
+def strcat(*args):
+    dst, src, memory = args
+    memory.write_string(dst + len(memory.c_string(dst)), memory.c_string(src))
+    return dst
+
+
+@definition(return_type='char *', arg_types=None)
+def strchr(*args):
+    address, ch, memory = args
+    ch &= 0xff
+    if ch == 0:
+        # the terminator is a part of the string
+        return address + len(memory.c_string(address))
+    offset = memory.find_in_string(address, bytes([ch]))
+    return NULL if offset == -1 else address + offset
+
+
+@definition(return_type='char *', arg_types=None)
+def strstr(*args):
+    haystack, needle, memory = args
+    offset = memory.find_in_string(haystack, memory.c_string(needle))
+    return NULL if offset == -1 else haystack + offset
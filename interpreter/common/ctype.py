@@ -39,12 +39,12 @@ class CType:
         else:
             return int
 
-    def random_value(self):
+    def random_value(self, rng=random):
         py_type = self.py_type()
         if py_type == float:
-            return random.uniform(*self.limits())
+            return rng.uniform(*self.limits())
         elif py_type == int:
-            return random.randint(*self.limits())
+            return rng.randint(*self.limits())
         else:
             raise RuntimeError("Unknown py type {}".format(str(py_type)))
 
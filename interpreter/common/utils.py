@@ -28,12 +28,15 @@ def get_constants(module):
             yield (name, const)
 
 def restorable(fn):
-    """ Decorator that resets object state after calling a function """
+    """ Decorator that resets object state after calling a function, but the attributes named in unrestored """
     @wraps(fn)
     def wrapper(self, *args, **kwargs):
-        state = pickle.dumps(self.__dict__)
+        kept = getattr(self, 'unrestored', ())
+        state = pickle.dumps({name: value for name, value in self.__dict__.items() if name not in kept})
         result = fn(self, *args, **kwargs)
-        self.__dict__ = pickle.loads(state)
+        restored = pickle.loads(state)
+        restored.update((name, self.__dict__[name]) for name in kept)
+        self.__dict__ = restored
         return result
     return wrapper
 
@@ -1,10 +1,32 @@
-""" Uses reflection to call a function that visits a given object based on its type """
+""" Calls a function that visits a given object based on its type """
 
 class Visitor(object):
+    """
+        visit calls the visit_<class name> method of the node's class (generic_visit if there is none).
+        The method of every node class is looked up once per Visitor subclass and kept in its dispatch
+        table, so visiting a node is one dict lookup.
+    """
+
+    # node class -> visit function, every subclass gets its own table
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super(Visitor, cls).__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
     def visit(self, node):
-        method_name = 'visit_' + type(node).__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+        try:
+            method = self._dispatch[node.__class__]
+        except KeyError:
+            method = self._resolve(node.__class__)
+        return method(self, node)
+
+    @classmethod
+    def _resolve(cls, node_class):
+        """ Finds the visit function of a node class and stores it in the dispatch table """
+        method = getattr(cls, 'visit_' + node_class.__name__, cls.generic_visit)
+        cls._dispatch[node_class] = method
+        return method
 
     def generic_visit(self, node):
         raise Exception('No visit_{} method'.format(type(node).__name__))
@@ -0,0 +1,141 @@
+"""
+Line and branch coverage for interpreted C programs.
+
+Every node of the program gets an id (see tree.number_nodes) and the interpreter bumps
+hits[node_id] each time it visits a node. Counters of several runs of the same source are
+merged by adding them up, line and branch coverage are derived from them on demand.
+"""
+
+import hashlib
+import json
+from array import array
+
+from ..syntax_analysis.tree import *
+
+
+# Nodes that are declarations rather than executable code, they don't make a line executable
+STRUCTURAL_NODES = (Program, IncludeLibrary, FunctionDecl, StructDecl, Param, Type, StructType)
+
+
+class Coverage(object):
+
+    def __init__(self, source, filename='<code>'):
+        self.source = source
+        self.filename = filename
+        self.source_hash = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        self.runs = 0
+        self.nodes = None
+        # hits[0] collects the nodes created outside of the tree (e.g. the call to main)
+        self.hits = None
+
+    def attach(self, interpreter, tree):
+        """ Numbers the tree nodes and registers the hit counter on the given interpreter """
+        nodes = number_nodes(tree)
+        if self.hits is None:
+            self.hits = array('Q', bytes(8 * (len(nodes) + 1)))
+        elif len(self.hits) != len(nodes) + 1:
+            raise ValueError("Coverage counters don't match the program tree")
+        self.nodes = nodes
+        self.runs += 1
+        interpreter.add_node_hook(self.count)
+
+    def count(self, node):
+        self.hits[node.node_id] += 1
+
+    def merge(self, data):
+        """ Adds counters previously saved by to_dict """
+        if data['source_hash'] != self.source_hash or len(data['hits']) != len(self.hits):
+            raise ValueError("Coverage data of {} comes from a different source".format(data['source']))
+        for node_id, count in enumerate(data['hits']):
+            self.hits[node_id] += count
+        self.runs += data['runs']
+
+    # derived coverage
+
+    def line_counts(self):
+        """ Returns {line: executions} for every line containing executable code """
+        counts = {}
+        for node in self.nodes:
+            if isinstance(node, STRUCTURAL_NODES):
+                continue
+            counts[node.line] = max(counts.get(node.line, 0), self.hits[node.node_id])
+        return counts
+
+    def branch_counts(self):
+        """ Returns a list of (line, kind, [(branch name, times taken)]) for every branch point """
+        hits = self.hits
+        branches = []
+        for node in self.nodes:
+            if isinstance(node, IfStmt):
+                taken = [('true', hits[node.true_body.node_id]), ('false', hits[node.false_body.node_id])]
+            elif isinstance(node, DoWhileStmt):
+                exits = hits[node.node_id]
+                taken = [('true', hits[node.condition.node_id] - exits), ('false', exits)]
+            elif isinstance(node, (WhileStmt, ForStmt)):
+                body = hits[node.body.node_id]
+                taken = [('true', body), ('false', hits[node.condition.node_id] - body)]
+            elif isinstance(node, SwitchStmt):
+                taken = []
+                for child in node.children:
+                    if isinstance(child, SwitchCaseLabel):
+                        taken.append(('case', hits[child.node_id]))
+                    elif isinstance(child, SwitchDefaultLabel):
+                        taken.append(('default', hits[child.node_id]))
+                taken.append(('none', hits[node.node_id] - sum(count for name, count in taken)))
+            else:
+                continue
+            branches.append((node.line, type(node).__name__, taken))
+        return branches
+
+    def summary(self):
+        lines = self.line_counts()
+        branches = [count for line, kind, taken in self.branch_counts() for name, count in taken]
+        return {
+            'lines': {'covered': sum(1 for count in lines.values() if count), 'total': len(lines)},
+            'branches': {'covered': sum(1 for count in branches if count), 'total': len(branches)},
+        }
+
+    # reports
+
+    def to_dict(self):
+        return {
+            'source': self.filename,
+            'source_hash': self.source_hash,
+            'runs': self.runs,
+            'hits': list(self.hits),
+            'lines': {str(line): count for line, count in sorted(self.line_counts().items())},
+            'branches': [
+                {'line': line, 'kind': kind, 'taken': [{'branch': name, 'count': count} for name, count in taken]}
+                for line, kind, taken in self.branch_counts()
+            ],
+            'summary': self.summary(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def gcov(self):
+        """ Returns the annotated source in the style of gcov """
+        line_counts = self.line_counts()
+        branches_by_line = {}
+        for line, kind, taken in self.branch_counts():
+            branches_by_line.setdefault(line, []).extend(taken)
+
+        output = [
+            '{:>9}:{:>5}:Source:{}'.format('-', 0, self.filename),
+            '{:>9}:{:>5}:Runs:{}'.format('-', 0, self.runs),
+        ]
+        for line, text in enumerate(self.source.splitlines(), 1):
+            if line not in line_counts:
+                count = '-'
+            elif line_counts[line] == 0:
+                count = '#####'
+            else:
+                count = str(line_counts[line])
+            output.append('{:>9}:{:>5}:{}'.format(count, line, text))
+            for idx, (name, taken) in enumerate(branches_by_line.get(line, [])):
+                if taken:
+                    output.append('branch {:>2} taken {} ({})'.format(idx, taken, name))
+                else:
+                    output.append('branch {:>2} never executed ({})'.format(idx, name))
+        return '\n'.join(output) + '\n'
@@ -0,0 +1,218 @@
+"""
+Loop idiom recognition.
+
+Recognizes for loops of these shapes (i, p, q and s are distinct variables, N is a constant or a variable,
+C is a constant or a variable, the condition may also be i <= N and the increment ++i or i += 1):
+
+    for (...; i < N; i++) { *p = C; p++; }              fill
+    for (...; i < N; i++) { *p = *q; p++; q++; }        copy
+    for (...; i < N; i++) { s += *p; p++; }             sum
+
+and executes them with the bulk operations of Memory. The shape is checked once per tree (annotate),
+the rest when the loop is reached: integer trip count and no variable of the loop stored in the block
+the loop writes. If anything doesn't hold the loop is interpreted node by node as usual, so the results
+(and the number of counted steps) are always the same.
+"""
+
+from .number import Number
+from ..common.ctype import CType
+from ..lexical_analysis.token_type import *
+from ..syntax_analysis.tree import *
+
+
+FILL, COPY, SUM = 'fill', 'copy', 'sum'
+
+
+def annotate(tree):
+    """ Stores a LoopIdiom on every for loop of a recognized shape """
+    for node in walk(tree):
+        if isinstance(node, ForStmt):
+            node.idiom = LoopIdiom.recognize(node)
+
+
+def evaluated_nodes(node):
+    """ The number of nodes the interpreter visits when it evaluates an expression (lvalues aren't visited) """
+    count = sum(1 for _ in walk(node))
+    if isinstance(node, Assignment):
+        count -= sum(1 for _ in walk(node.left))
+    elif isinstance(node, UnOp) and node.op in (Op.INC_OP, Op.DEC_OP):
+        count -= sum(1 for _ in walk(node.expr))
+    elif isinstance(node, CompoundStmt):
+        count = 1 + sum(evaluated_nodes(child) for child in node.children)
+    return count
+
+
+def is_var(node):
+    return isinstance(node, Var)
+
+
+def is_deref(node):
+    """ *p """
+    return isinstance(node, UnOp) and node.prefix and node.op == Op.ASTERISK and is_var(node.expr)
+
+
+def incremented_var(node):
+    """ Returns the name of the variable incremented by one (p++, ++p, p += 1) or None """
+    if isinstance(node, UnOp) and node.op == Op.INC_OP and is_var(node.expr):
+        return node.expr.value
+    if isinstance(node, Assignment) and node.op == Op.ADD_ASSIGN and is_var(node.left) and \
+            isinstance(node.right, Num) and node.right.op == Op.INTEGER_CONST and node.right.value == 1:
+        return node.left.value
+    return None
+
+
+class LoopIdiom(object):
+    """ A recognized loop: the kind of bulk operation and the variables it works with """
+
+    def __init__(self, kind, counter, limit, inclusive, target, source, value, cost):
+        self.kind = kind
+        # the induction variable, the loop runs while counter < limit (<= if inclusive)
+        self.counter = counter
+        self.limit = limit
+        self.inclusive = inclusive
+        # the walked pointers (source is None for fill), the filled value or the sum variable
+        self.target = target
+        self.source = source
+        self.value = value
+        # (steps counted for one iteration, steps counted for the final condition)
+        self.cost = cost
+
+    @staticmethod
+    def recognize(node):
+        """ Returns a LoopIdiom for a ForStmt of a recognized shape, None otherwise """
+        condition = node.condition
+        if not (isinstance(condition, BinOp) and condition.op in (Op.LT_OP, Op.LE_OP) and is_var(condition.left)):
+            return None
+        counter = condition.left.value
+        limit = condition.right
+        if not (is_var(limit) or isinstance(limit, Num) and limit.op == Op.INTEGER_CONST):
+            return None
+        if incremented_var(node.increment) != counter or not isinstance(node.body, CompoundStmt):
+            return None
+
+        statements = node.body.children
+        if len(statements) < 2 or not isinstance(statements[0], Assignment):
+            return None
+        assignment = statements[0]
+        incremented = [incremented_var(statement) for statement in statements[1:]]
+
+        if assignment.op == Op.ASSIGN and is_deref(assignment.left) and is_deref(assignment.right):
+            kind = COPY
+            target, source, value = assignment.left.expr.value, assignment.right.expr.value, None
+            walked = [target, source]
+        elif assignment.op == Op.ASSIGN and is_deref(assignment.left) and \
+                (is_var(assignment.right) or isinstance(assignment.right, Num)):
+            kind = FILL
+            target, source, value = assignment.left.expr.value, None, assignment.right
+            walked = [target]
+        elif assignment.op == Op.ADD_ASSIGN and is_var(assignment.left) and is_deref(assignment.right):
+            kind = SUM
+            target, source, value = assignment.right.expr.value, None, assignment.left.value
+            walked = [target]
+        else:
+            return None
+
+        if sorted(incremented) != sorted(walked):
+            return None
+        names = [counter] + walked
+        if kind == SUM:
+            names.append(value)
+        if is_var(limit):
+            names.append(limit.value)
+        if kind == FILL and is_var(value):
+            names.append(value.value)
+        if len(set(names)) != len(names):
+            return None
+
+        condition_cost = evaluated_nodes(condition)
+        iteration_cost = condition_cost + evaluated_nodes(node.body) + evaluated_nodes(node.increment)
+        return LoopIdiom(kind, counter, limit, condition.op == Op.LE_OP, target, source, value,
+                         (iteration_cost, condition_cost))
+
+    @staticmethod
+    def stride(pointer):
+        """ The number of bytes p++ moves a pointer by """
+        return Number(pointer.c_type, pointer + Number(CType(type_spec='int'), 1)).value - pointer.value
+
+    def execute(self, interpreter):
+        """ Runs the loop as a bulk operation, returns False (having changed nothing) if it can't """
+        memory = interpreter.memory
+        counter_address = memory.get_value_in_scope(self.counter)
+        if not isinstance(counter_address, int):
+            return False
+        counter = memory.get_at_address(counter_address)
+        limit = interpreter.visit_Num(self.limit) if isinstance(self.limit, Num) else memory[self.limit.value]
+        if not (isinstance(counter, Number) and isinstance(limit, Number)) or counter.c_type.pointer or \
+                not (isinstance(counter.value, int) and isinstance(limit.value, int)):
+            return False
+        count = max(0, limit.value - counter.value + (1 if self.inclusive else 0))
+        lo, hi = counter.c_type.limits()
+        if count and counter.value + count > hi:
+            return False
+
+        iteration_cost, condition_cost = self.cost
+        steps = count * iteration_cost + condition_cost
+        if interpreter.max_steps is not None and interpreter.steps + steps > interpreter.max_steps:
+            # let the interpreter stop at exactly the same node
+            return False
+
+        target_address = memory.get_value_in_scope(self.target)
+        if not isinstance(target_address, int):
+            return False
+        target = memory.get_at_address(target_address)
+        if not isinstance(target, Number):
+            return False
+        target_stride = LoopIdiom.stride(target)
+        blocks = [(target.value, target.value + count * target_stride)]
+        variables = [counter_address, target_address]
+        if self.source is not None:
+            source_address = memory.get_value_in_scope(self.source)
+            if not isinstance(source_address, int):
+                return False
+            source = memory.get_at_address(source_address)
+            if not isinstance(source, Number):
+                return False
+            source_stride = LoopIdiom.stride(source)
+            blocks.append((source.value, source.value + count * source_stride))
+            variables.append(source_address)
+        if target_stride <= 0 or self.source is not None and source_stride <= 0:
+            return False
+
+        # the loop must not read or write the variables it changes on every iteration and must not
+        # write the ones it reads on every iteration
+        if any(start <= address < end for start, end in blocks for address in variables):
+            return False
+        read_variables = []
+        for node in (self.limit, self.value):
+            if is_var(node):
+                read_variables.append(memory.get_value_in_scope(node.value))
+        read_variables = [address for address in read_variables if isinstance(address, int)]
+        if self.kind != SUM:
+            start, end = blocks[0]
+            if any(start <= address < end for address in read_variables):
+                return False
+        else:
+            sum_address = memory.get_value_in_scope(self.value)
+            if not isinstance(sum_address, int):
+                return False
+            total = memory.get_at_address(sum_address)
+            if not isinstance(total, Number) or total.c_type.pointer:
+                return False
+
+        if self.kind == FILL:
+            value = interpreter.visit_Num(self.value) if isinstance(self.value, Num) else memory[self.value.value]
+            memory.fill(target.value, count, target_stride, value)
+        elif self.kind == COPY:
+            memory.copy(target.value, source.value, count, target_stride, source_stride)
+            memory.set_at_address(source_address, Number(source.c_type, source.value + count * source_stride))
+        else:
+            for cell in memory.cells(target.value, count, target_stride):
+                total = memory.get_at_address(sum_address)
+                memory.set_at_address(sum_address, Number(total.c_type, total + cell))
+        memory.set_at_address(target_address, Number(target.c_type, target.value + count * target_stride))
+        memory.set_at_address(counter_address, Number(counter.c_type, counter.value + count))
+
+        interpreter.steps += steps
+        if interpreter.steps >= interpreter.next_check:
+            interpreter.check_limits(self.limit)
+        return True
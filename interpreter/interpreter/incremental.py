@@ -0,0 +1,172 @@
+"""
+Incremental compilation of a program that is edited and compiled again and again (see --watch).
+
+The source is split into top-level declarations (see parallel.declaration_chunks) and only the
+declarations whose text changed are lexed and parsed, the others are taken from the previous
+compilation, their node lines moved if the declaration moved (node spans are kept relative to the
+start of the declaration). A declaration is identified by its text, so two copies of the same text
+are two entries.
+
+Semantic analysis still visits every top-level declaration in order, that is what builds the global
+scope, but the body of a function is only analyzed again if its text changed or if one of the
+declarations before it (all a body can refer to) changed its name or type. A function that isn't
+analyzed again reports the warnings of its last analysis, moved with the function, and its body keeps
+the symbols and types (see Var.symbol and ExprNode) of the analysis that resolved them, declared the
+same way as the new ones.
+
+Nodes of unchanged declarations are shared with the programs compiled before, so only the last
+compiled program should be executed: compiling clears the callees cached on its call sites (see
+Interpreter.bind_callee), which can belong to an older program.
+"""
+
+from array import array
+
+from . import idioms
+from .interpreter import CompiledProgram
+from .stats import RunStats
+from ..syntax_analysis.parallel import declaration_chunks, column, join, parse_batch, parse_serial
+from ..syntax_analysis.tree import *
+from ..semantic_analysis.analyzer import SemanticAnalyzer
+
+
+def signature(node):
+    """ What the declarations after a top-level declaration see of it """
+    if isinstance(node, FunctionDecl):
+        return 'function', node.func_name, str(node.type_node.c_type), \
+               tuple(str(param.type_node.c_type) for param in node.params)
+    if isinstance(node, VarDecl):
+        return 'var', node.var_node.value, str(node.type_node.c_type)
+    if isinstance(node, StructDecl):
+        return 'struct', node.name, tuple((name, str(c_type)) for name, c_type in node.fields.items())
+    return 'include', node.library_name
+
+
+def move_lines(declarations, delta):
+    """ Moves every node of the declarations by delta lines, nodes they share (type nodes) only once """
+    nodes = {id(node): node for declaration in declarations for node in walk(declaration)}
+    for node in nodes.values():
+        node.line += delta
+
+
+def declaration_nodes(declarations):
+    """ The nodes of a list of declarations, in the order their spans are kept """
+    return [node for declaration in declarations for node in walk(declaration)]
+
+
+class ParsedDeclaration(object):
+    """ The nodes of the text of one top-level declaration """
+    def __init__(self, program, tokens, line, offset):
+        # usually one node, `int a, b;` is one VarDecl per variable
+        self.declarations = program.children
+        # the number of tokens, its EOF included
+        self.tokens = tokens
+        # the first line of the text
+        self.line = line
+        # the spans of declaration_nodes, relative to the start of the text
+        spans = [program.positions.span(node) for node in declaration_nodes(self.declarations)]
+        self.starts = array('q', [start - offset for start, _ in spans])
+        self.ends = array('q', [end - offset for _, end in spans])
+
+
+class IncrementalCompiler(object):
+    """ Compiles versions of one program, reusing the declarations and analyses of the previous one """
+
+    def __init__(self, max_errors=1):
+        self.max_errors = max_errors
+        # (declaration text, occurrence) -> ParsedDeclaration
+        self.parsed = {}
+        # (declaration text, occurrence, hash of the declarations before it) -> symbols in the function
+        # and its diagnostics (see SemanticAnalyzer.function_symbols)
+        self.analyzed = {}
+        # declarations parsed and function bodies analyzed by the last compilation
+        self.reparsed = 0
+        self.reanalyzed = 0
+
+    def compile(self, program, stats=None):
+        """ Like Interpreter.compile, returns a CompiledProgram """
+        if stats is None:
+            stats = RunStats()
+        with stats.phase('parse'):
+            tree, tokens, keys = self.parse(program)
+        with stats.phase('analyze'):
+            analyzer = self.analyze(tree, keys)
+        stats.tokens = tokens
+        stats.ast_nodes = 0
+        for node in walk(tree):
+            stats.ast_nodes += 1
+            if isinstance(node, FunctionCall):
+                # a reused call site may have cached the FunctionDecl of an older version of its callee
+                node.callee = None
+        stats.symbols = analyzer.symbol_count
+        return CompiledProgram(program, tree, stats, analyzer.diagnostics)
+
+    def parse(self, text):
+        """ Returns the Program, the number of tokens and the key of every FunctionDecl """
+        chunks = declaration_chunks(text) if text else None
+        if not chunks:
+            return self.parse_all(text)
+
+        parsed = {}
+        occurrences = {}
+        self.reparsed = 0
+        try:
+            for start, end, line in chunks:
+                chunk = text[start:end]
+                key = chunk, occurrences.get(chunk, 0)
+                occurrences[chunk] = key[1] + 1
+                entry = self.parsed.get(key)
+                if entry is None:
+                    program, tokens = parse_batch((chunk, line, start, column(text, start)))
+                    idioms.annotate(program)
+                    entry = ParsedDeclaration(program, tokens, line, start)
+                    self.reparsed += 1
+                elif entry.line != line:
+                    move_lines(entry.declarations, line - entry.line)
+                    entry.line = line
+                parsed[key] = entry, start
+        except Exception:
+            # the serial parser reports the errors of the file
+            return self.parse_all(text)
+
+        children = []
+        spans = {}
+        keys = {}
+        for key, (entry, start) in parsed.items():
+            children.extend(entry.declarations)
+            for declaration in entry.declarations:
+                keys[declaration] = key
+            for node, node_start, node_end in zip(declaration_nodes(entry.declarations), entry.starts, entry.ends):
+                spans[node] = node_start + start, node_end + start
+        if not children:
+            return self.parse_all(text)
+        self.parsed = {key: entry for key, (entry, _) in parsed.items()}
+        # every declaration was lexed up to its own EOF token
+        tokens = sum(entry.tokens for entry, _ in parsed.values()) - (len(parsed) - 1)
+        return join(text, children, spans), tokens, keys
+
+    def parse_all(self, text):
+        tree, tokens = parse_serial(text, self.max_errors)
+        idioms.annotate(tree)
+        self.parsed = {}
+        self.reparsed = len(tree.children)
+        return tree, tokens, {}
+
+    def analyze(self, tree, keys):
+        """ Analyzes the tree, skipping the bodies of functions analyzed before in the same context """
+        unchanged = {}
+        contexts = {}
+        context = 0
+        for node in tree.children:
+            if isinstance(node, FunctionDecl) and node in keys:
+                contexts[node] = keys[node] + (context,)
+                if contexts[node] in self.analyzed:
+                    unchanged[node] = self.analyzed[contexts[node]]
+            context = hash((context, signature(node)))
+
+        analyzer = SemanticAnalyzer.analyze(tree, unchanged)
+        self.reanalyzed = len(analyzer.function_symbols)
+        self.analyzed = {
+            contexts[node]: analyzer.unchanged.get(node, analyzer.function_symbols.get(node))
+            for node in contexts
+        }
+        return analyzer
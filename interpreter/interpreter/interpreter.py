@@ -1,10 +1,22 @@
+import copy
+import io
+import operator
+import sys
+import time
+
 from .memory import *
-from .number import Number
+from .number import Number, UninitializedRead, TRUE, FALSE
+from .sanitizer import SanitizedMemory, SanitizerError
+from .stats import RunStats
+from . import idioms
 from ..lexical_analysis.lexer import Lexer
+from ..lexical_analysis.token import Token
 from ..lexical_analysis.token_type import *
 from ..syntax_analysis.parser import Parser
+from ..syntax_analysis.parallel import parse_parallel
 from ..syntax_analysis.tree import *
 from ..semantic_analysis.analyzer import SemanticAnalyzer
+from ..semantic_analysis.diagnostics import Diagnostics
 from ..common.utils import get_functions, get_constants, MessageColor
 from ..common.visitor import Visitor
 from ..common.ctype import CType, StructCType
@@ -16,13 +28,91 @@ class ControlFlowFlag:
         self.value = value
 
 
+class ResourceLimitExceeded(Exception):
+    """ Raised when a program runs out of its step budget or past its wall-clock deadline """
+    def __init__(self, message, line, call_stack):
+        super(ResourceLimitExceeded, self).__init__(
+            "ResourceLimitExceeded: {} at line {} (call stack: {})".format(
+                message,
+                line,
+                ' -> '.join(call_stack)
+            )
+        )
+        # C line of the node that was being evaluated and the names of the active frames
+        self.line = line
+        self.call_stack = call_stack
+
+
 class Interpreter(Visitor):
 
-    def __init__(self):
+    # The step counter is compared on every visit but the limits (and the clock)
+    # are only checked once every CHECK_INTERVAL steps
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, max_steps=None, time_limit=None, stdin=None, stdout=None, uninitialized='zero', seed=None,
+                 sanitize=False):
         """ Initializes the memory for this run """
         # we can use declare, memory[] for values, get_address, new/del_scope, new/del_frame
         # the Memory class takes care of the underlying logic
-        self.memory = Memory()
+        if sanitize:
+            # the sanitizer poisons uninitialized memory itself
+            self.memory = SanitizedMemory(stdin=stdin, stdout=stdout, seed=seed)
+        else:
+            self.memory = Memory(stdin=stdin, stdout=stdout, uninitialized=uninitialized, seed=seed)
+
+        # Resource limits: the number of evaluated statements/expressions and wall-clock seconds
+        self.max_steps = max_steps
+        self.time_limit = time_limit
+        self.deadline = None
+        self.steps = 0
+        self.next_check = sys.maxsize
+        if max_steps is not None or time_limit is not None:
+            self.next_check = self.get_next_check()
+
+        # Callables invoked with every visited node, used by instrumentation (profiling)
+        self.node_hooks = []
+
+    def visit(self, node):
+        """ Counts every evaluated node against the step budget """
+        self.steps += 1
+        if self.steps >= self.next_check:
+            self.check_limits(node)
+        try:
+            return Visitor.visit(self, node)
+        except (UninitializedRead, SanitizerError) as e:
+            # the innermost node that used the value
+            if e.line is None:
+                e.line = node.line
+            raise
+
+    def hooked_visit(self, node):
+        """ Replaces visit once a node hook is registered so uninstrumented runs don't pay for hooks """
+        for hook in self.node_hooks:
+            hook(node)
+        return Interpreter.visit(self, node)
+
+    def add_node_hook(self, hook):
+        self.node_hooks.append(hook)
+        self.visit = self.hooked_visit
+
+    def get_next_check(self):
+        """ Returns the step count at which the limits are checked next """
+        next_check = self.steps + Interpreter.CHECK_INTERVAL
+        if self.max_steps is not None:
+            next_check = min(next_check, self.max_steps + 1)
+        return next_check
+
+    def check_limits(self, node):
+        """ Raises ResourceLimitExceeded if the step budget or the deadline is exceeded """
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self.limit_exceeded('step budget of {} exceeded'.format(self.max_steps), node)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.limit_exceeded('time limit of {}s exceeded'.format(self.time_limit), node)
+        self.next_check = self.get_next_check()
+
+    def limit_exceeded(self, message, node):
+        call_stack = [frame.frame_name for frame in self.memory.stack.frames]
+        raise ResourceLimitExceeded(message, node.line, call_stack)
 
     # Program and its children - interpreted before _init
     # these visits don't return anything
@@ -71,40 +161,59 @@ class Interpreter(Visitor):
 
     # functions
     # these visits return function return value (as a Number)
-    memory_modifying_fns = ['scanf', 'malloc', 'free']
+    # library functions that get the memory as their last argument (this includes the ones
+    # working with the program's streams or random state, which are part of the memory)
+    memory_modifying_fns = frozenset([
+        'printf', 'scanf', 'getchar', 'putchar', 'rand', 'srand', 'malloc', 'free',
+        'vsqrt', 'vsin', 'vcos', 'vexp', 'vlog', 'vpow', 'memset', 'memcpy', 'memmove', 'memcmp',
+        'strlen', 'strcmp', 'strcpy', 'strncpy', 'strcat', 'strchr', 'strstr'
+    ])
+
+    def bind_callee(self, node):
+        """
+            Resolves the function called at a call site and caches it on the node (an inline cache).
+            Functions live in the global scope and can't be redefined, so the callee of a call site doesn't
+            change between executions of the same compiled program, library functions are module globals.
+            A call site reused in a new program (see IncrementalCompiler) has its cache cleared.
+        """
+        func = self.memory[node.name]
+        if callable(func):
+            """
+                   FunctionDecl functions can access the memory since they are evaluated in the 
+                   context of the current interpreter. However, python library functions that need
+                   to work with memory have no way of accessing it. One way of doing this is having
+                   a singleton memory, but that is considered bad practice, so for now we will send 
+                   an additional memory argument to all functions that need it.
+            """
+            needs_memory = node.name in Interpreter.memory_modifying_fns
+            ret_c_type = None if func.return_type is None else CType.from_string(func.return_type)
+            node.callee = (func, True, needs_memory, ret_c_type)
+        else:
+            node.callee = (func, False, False, func.type_node.c_type)
+        return node.callee
 
     def visit_FunctionCall(self, node):
         # Evaluate argument expressions
         args = [self.visit(arg) for arg in node.args]
 
-        """
-               FunctionDecl functions can access the memory since they are evaluated in the 
-               context of the current interpreter. However, python library functions that need
-               to work with memory have no way of accessing it. One way of doing this is having
-               a singleton memory, but that is considered bad practice, so for now we will send 
-               an additional memory argument to all functions that need it.
-        """
-        if node.name in Interpreter.memory_modifying_fns:
-            args.append(self.memory)
+        func, native, needs_memory, ret_c_type = node.callee or self.bind_callee(node)
 
         """
         Since our library functions are just pure python functions we have
         to treat them as black boxes - they are never parsed so we can't 
         simulate their behaviour, in this case we just return the value
         """
-        func = self.memory[node.name]
-        if callable(func):
-
+        if native:
             # pass regular numbers to python functions
-            for i in range(len(args)):
-                val = args[i]
-                if isinstance(val, Number):
-                    args[i] = val.value
+            args = [arg.value if isinstance(arg, Number) else arg for arg in args]
+            if needs_memory:
+                self.memory.call_line = node.line
+                args.append(self.memory)
 
             ret = func(*args)
-            if ret is None:
+            if ret is None or ret_c_type is None:
                 return ret
-            return Number(CType.from_string(func.return_type), ret)
+            return Number(ret_c_type, ret)
 
         # Otherwise, func is a FunctionDecl AstNode, we can properly simulate
 
@@ -123,16 +232,16 @@ class Interpreter(Visitor):
         for idx, arg in enumerate(args):
             param = func.params[idx]
             self.memory.declare_num(param.type_node.c_type, param.var_node.value)
-            self.memory[param.var_node.value] = arg
+            # arguments are converted to parameter types as if by assignment
+            self.memory[param.var_node.value] = Number(param.type_node.c_type, arg)
 
         # Visit the function body and cast the return value to the appropriate type
         raw_ret_val = self.visit(func.body)
-        if raw_ret_val is None:
-            return raw_ret_val
-        ret_val = Number(func.type_node.c_type, raw_ret_val.value)
         # Delete the frame and return
         self.memory.del_frame()
-        return ret_val
+        if raw_ret_val is None:
+            return raw_ret_val
+        return Number(ret_c_type, raw_ret_val.value)
 
     def visit_FunctionBody(self, node):
         for child in node.children:
@@ -182,6 +291,9 @@ class Interpreter(Visitor):
                         do_execute = True
                 elif isinstance(child, SwitchDefaultLabel):
                     do_execute = True
+                if do_execute:
+                    # mark the label where the execution starts
+                    self.visit(child)
             else:
                 # execute!
                 if not isinstance(child, SwitchCaseLabel) and not isinstance(child, SwitchDefaultLabel):
@@ -189,8 +301,14 @@ class Interpreter(Visitor):
                     if isinstance(ret, ControlFlowFlag) and ret.value == "BREAK":
                         break
 
+    def visit_SwitchCaseLabel(self, node):
+        pass
+
+    def visit_SwitchDefaultLabel(self, node):
+        pass
+
     def visit_IfStmt(self, node):
-        if self.visit(node.condition):
+        if self.condition(node.condition):
             return self.visit(node.true_body)
         else:
             return self.visit(node.false_body)
@@ -198,7 +316,7 @@ class Interpreter(Visitor):
     # loops
 
     def visit_WhileStmt(self, node):
-        while self.visit(node.condition):
+        while self.condition(node.condition):
             ret = self.visit(node.body)
             if isinstance(ret, ControlFlowFlag) and ret.value == "BREAK":
                 break
@@ -209,17 +327,69 @@ class Interpreter(Visitor):
             ret = self.visit(node.body)
             if isinstance(ret, ControlFlowFlag) and ret.value == "BREAK":
                 break
-            if not self.visit(node.condition):
+            if not self.condition(node.condition):
                 break
 
     def visit_ForStmt(self, node):
         self.visit(node.setup)
-        while self.visit(node.condition):
+        # recognized loops run as a bulk memory operation, unless instrumentation needs every node
+        if node.idiom is not None and not self.node_hooks and node.idiom.execute(self):
+            return
+        while self.condition(node.condition):
             ret = self.visit(node.body)
             if isinstance(ret, ControlFlowFlag) and ret.value == "BREAK":
                 break
             self.visit(node.increment)
 
+    # conditions
+
+    COMPARISONS = {
+        Op.LT_OP: operator.lt,
+        Op.GT_OP: operator.gt,
+        Op.LE_OP: operator.le,
+        Op.GE_OP: operator.ge,
+        Op.EQ_OP: operator.eq,
+        Op.NE_OP: operator.ne,
+    }
+
+    def condition(self, node):
+        """
+            Evaluates a condition to a python bool. Comparisons, &&, || and ! are evaluated here without
+            building a Number for their result, their nodes are counted exactly like visit counts them.
+        """
+        if self.node_hooks:
+            return bool(self.visit(node))
+        if type(node) is BinOp:
+            op = node.op
+            compare = Interpreter.COMPARISONS.get(op)
+            if compare is None and op != Op.LOG_AND_OP and op != Op.LOG_OR_OP:
+                return bool(self.visit(node))
+        elif type(node) is UnOp and node.op == Op.LOG_NEG:
+            compare = None
+        else:
+            return bool(self.visit(node))
+
+        self.steps += 1
+        if self.steps >= self.next_check:
+            self.check_limits(node)
+        try:
+            if type(node) is UnOp:
+                return not self.condition(node.expr)
+            if compare is None:
+                if op == Op.LOG_AND_OP:
+                    return self.condition(node.left) and self.condition(node.right)
+                return self.condition(node.left) or self.condition(node.right)
+            left = self.visit(node.left).value
+            right = self.visit(node.right).value
+            if type(left) is not type(right):
+                # int and float operands are compared as floats, like Number does
+                left, right = float(left), float(right)
+            return compare(left, right)
+        except (UninitializedRead, SanitizerError) as e:
+            if e.line is None:
+                e.line = node.line
+            raise
+
     # expressions
     # these visits return expression value
 
@@ -235,14 +405,12 @@ class Interpreter(Visitor):
             var_name = lvalue_node.value
             return self.memory.get_value_in_scope(var_name)
         elif isinstance(lvalue_node, UnOp):  # UnOp(*, Ptr)
-            ptr_name = lvalue_node.expr.value
-            return self.memory[ptr_name].value
+            if isinstance(lvalue_node.expr, Var):
+                return self.memory[lvalue_node.expr.value].value
+            # *(pointer expression)
+            return self.visit(lvalue_node.expr).value
         elif isinstance(lvalue_node, FieldAccess):  # FieldAccess
-            if lvalue_node.op_type == ARROW:
-                var_addr = self.memory[lvalue_node.var.value].value
-                return self.memory.get_at_address(var_addr)[lvalue_node.field.value]
-            else:
-                return self.memory[lvalue_node.var.value][lvalue_node.field.value]
+            return self.field_address(lvalue_node)
         elif isinstance(lvalue_node, BinOp): # Var a -> Var b
             return self.memory[lvalue_node.left.value][lvalue_node.right.value]
         else:
@@ -257,18 +425,30 @@ class Interpreter(Visitor):
         val_right = self.visit(node.right)
 
         # combine the operands
-        if node.token.type == ADD_ASSIGN:
+        if node.op == Op.ADD_ASSIGN:
             val_result = Number(val_self.c_type, val_self+val_right)
-        elif node.token.type == SUB_ASSIGN:
+        elif node.op == Op.SUB_ASSIGN:
             val_result = Number(val_self.c_type, val_self-val_right)
-        elif node.token.type == MUL_ASSIGN:
+        elif node.op == Op.MUL_ASSIGN:
             val_result = Number(val_self.c_type, val_self*val_right)
-        elif node.token.type == DIV_ASSIGN:
+        elif node.op == Op.DIV_ASSIGN:
             val_result = Number(val_self.c_type, val_self/val_right)
-        elif node.token.type == ASSIGN:
+        elif node.op == Op.MOD_ASSIGN:
+            val_result = Number(val_self.c_type, val_self % val_right)
+        elif node.op == Op.LEFT_ASSIGN:
+            val_result = Number(val_self.c_type, val_self << val_right)
+        elif node.op == Op.RIGHT_ASSIGN:
+            val_result = Number(val_self.c_type, val_self >> val_right)
+        elif node.op == Op.AND_ASSIGN:
+            val_result = Number(val_self.c_type, val_self & val_right)
+        elif node.op == Op.XOR_ASSIGN:
+            val_result = Number(val_self.c_type, val_self ^ val_right)
+        elif node.op == Op.OR_ASSIGN:
+            val_result = Number(val_self.c_type, val_self | val_right)
+        elif node.op == Op.ASSIGN:
             val_result = Number(val_self.c_type, val_right)
         else:
-            raise RuntimeError("Unknown assignment op: {}".format(node.token.type))
+            raise RuntimeError("Unknown assignment op: {}".format(Op.name(node.op)))
 
         # perform the assignment
         self.memory.set_at_address(address, val_result)
@@ -276,51 +456,48 @@ class Interpreter(Visitor):
 
     def visit_UnOp(self, node):
         if node.prefix:
-            if isinstance(node.token, Type):
-                # Cast
-                # there is a to do for this to be refactored but node.token is an AstNode in this case
-                return Number(node.token.c_type, self.visit(node.expr))
-            elif node.token.type == AMPERSAND:
+            if node.op == Op.CAST:
+                return Number(node.type_node.c_type, self.visit(node.expr))
+            elif node.op == Op.AMPERSAND:
                 # reference - return variable address
                 # node.expr is a Var node
                 return Number(CType(type_spec='int'), self.memory.get_value_in_scope(node.expr.value))
-            elif node.token.type == ASTERISK:
+            elif node.op == Op.ASTERISK:
                 # dereference - return variable at the pointed address
                 # node.expr is anything but a pointer type
                 res = self.visit(node.expr)
                 return self.memory.get_at_address(res.value)
-            elif node.token.type == INC_OP:
+            elif node.op == Op.INC_OP:
                 # node.expr is an LValue
                 address = self.get_lvalue_address(node.expr)
                 val_self = self.memory.get_at_address(address)
                 val_result = Number(val_self.c_type, val_self+Number(CType(type_spec='int'), 1))
                 self.memory.set_at_address(address, val_result)
                 return val_result
-            elif node.token.type == DEC_OP:
+            elif node.op == Op.DEC_OP:
                 # node.expr is an LValue
                 address = self.get_lvalue_address(node.expr)
                 val_self = self.memory.get_at_address(address)
                 val_result = Number(val_self.c_type, val_self-Number(CType(type_spec='int'), 1))
                 self.memory.set_at_address(address, val_result)
                 return val_result
-            elif node.token.type == MINUS:
+            elif node.op == Op.MINUS:
                 return Number(CType(type_spec='int'), -1) * self.visit(node.expr)
-            elif node.token.type == PLUS:
+            elif node.op == Op.PLUS:
                 return self.visit(node.expr)
-            elif node.token.type == LOG_NEG:
-                res = self.visit(node.expr)
-                return res.log_neg()
+            elif node.op == Op.LOG_NEG:
+                return FALSE if self.condition(node.expr) else TRUE
             else:
                 raise RuntimeError("Unknown prefix operator, earlier stages should catch this")
         else:
-            if node.token.type == INC_OP:
+            if node.op == Op.INC_OP:
                 # node.expr is an LValue
                 address = self.get_lvalue_address(node.expr)
                 val_self = self.memory.get_at_address(address)
                 val_result = Number(val_self.c_type, val_self+Number(CType(type_spec='int'), 1))
                 self.memory.set_at_address(address, val_result)
                 return val_self
-            elif node.token.type == DEC_OP:
+            elif node.op == Op.DEC_OP:
                 # node.expr is an LValue
                 address = self.get_lvalue_address(node.expr)
                 val_self = self.memory.get_at_address(address)
@@ -331,55 +508,71 @@ class Interpreter(Visitor):
                 raise RuntimeError("Unknown postfix operator, earlier stages should catch this")
 
     def visit_BinOp(self, node):
-        if node.token.type == PLUS:
+        if node.op == Op.PLUS:
             return self.visit(node.left) + self.visit(node.right)
-        elif node.token.type == MINUS:
+        elif node.op == Op.MINUS:
             return self.visit(node.left) - self.visit(node.right)
-        elif node.token.type == ASTERISK:
+        elif node.op == Op.ASTERISK:
             return self.visit(node.left) * self.visit(node.right)
-        elif node.token.type == DIV_OP:
+        elif node.op == Op.DIV_OP:
             return self.visit(node.left) / self.visit(node.right)
-        elif node.token.type == MOD_OP:
+        elif node.op == Op.MOD_OP:
             return self.visit(node.left) % self.visit(node.right)
-        elif node.token.type == LT_OP:
+        elif node.op == Op.LT_OP:
             return self.visit(node.left) < self.visit(node.right)
-        elif node.token.type == GT_OP:
+        elif node.op == Op.GT_OP:
             return self.visit(node.left) > self.visit(node.right)
-        elif node.token.type == LE_OP:
+        elif node.op == Op.LE_OP:
             return self.visit(node.left) <= self.visit(node.right)
-        elif node.token.type == GE_OP:
+        elif node.op == Op.GE_OP:
             return self.visit(node.left) >= self.visit(node.right)
-        elif node.token.type == EQ_OP:
+        elif node.op == Op.EQ_OP:
             return self.visit(node.left) == self.visit(node.right)
-        elif node.token.type == NE_OP:
+        elif node.op == Op.NE_OP:
             return self.visit(node.left) != self.visit(node.right)
-        elif node.token.type == LOG_AND_OP:
-            return self.visit(node.left) and self.visit(node.right)
-        elif node.token.type == LOG_OR_OP:
-            return self.visit(node.left) or self.visit(node.right)
-        elif node.token.type == AMPERSAND:
+        elif node.op == Op.LOG_AND_OP:
+            # short-circuit, the result is an int 0 or 1
+            return TRUE if self.condition(node.left) and self.condition(node.right) else FALSE
+        elif node.op == Op.LOG_OR_OP:
+            return TRUE if self.condition(node.left) or self.condition(node.right) else FALSE
+        elif node.op == Op.AMPERSAND:
             return self.visit(node.left) & self.visit(node.right)
-        elif node.token.type == OR_OP:
+        elif node.op == Op.OR_OP:
             return self.visit(node.left) | self.visit(node.right)
-        elif node.token.type == XOR_OP:
+        elif node.op == Op.XOR_OP:
             return self.visit(node.left) ^ self.visit(node.right)
-        elif node.token.type == ARROW:
+        elif node.op == Op.LEFT_OP:
+            return self.visit(node.left) << self.visit(node.right)
+        elif node.op == Op.RIGHT_OP:
+            return self.visit(node.left) >> self.visit(node.right)
+        elif node.op == Op.ARROW:
             self.memory.get_at_address(self.memory[node.left.value][node.right.value])
 
+    def visit_TerOp(self, node):
+        if self.condition(node.condition):
+            return self.visit(node.true_exp)
+        return self.visit(node.false_exp)
+
+    def field_address(self, node):
+        """ Returns the address of the field a FieldAccess refers to """
+        if node.op == Op.ARROW:
+            if isinstance(node.var, Var):
+                var_addr = self.memory[node.var.value].value
+            else:
+                # a chain like p->next->val, the pointer is the value of the inner access
+                var_addr = self.visit(node.var).value
+            return self.memory.get_at_address(var_addr)[node.field.value]
+        return self.memory[node.var.value][node.field.value]
+
     def visit_FieldAccess(self, node):
-        if node.op_type == ARROW:
-            var_addr = self.memory[node.var.value].value
-            addr = self.memory.get_at_address(var_addr)[node.field.value]
-        else:
-            addr = self.memory[node.var.value][node.field.value]
-        return self.memory.get_at_address(addr)
+        return self.memory.get_at_address(self.field_address(node))
 
     def visit_Num(self, node):
-        if node.token.type == INTEGER_CONST:
+        if node.op == Op.INTEGER_CONST:
             return Number(CType(type_spec='int'), node.value)
-        elif node.token.type == CHAR_CONST:
+        elif node.op == Op.CHAR_CONST:
             return Number(CType(type_spec='char'), node.value)
-        elif node.token.type == REAL_CONST:
+        elif node.op == Op.REAL_CONST:
             return Number(CType(type_spec='double'), node.value)
         else:
             raise RuntimeError("Unknown num const, earlier stages should catch this")
@@ -388,22 +581,32 @@ class Interpreter(Visitor):
         return self.memory[node.value]
 
     def visit_String(self, node):
-        return node.value
+        # string literals live in the data segment of the memory
+        return Number(CType(type_spec='char', pointer=True), self.memory.string_literal(node.value))
 
     def visit_NoOp(self, node):
         pass
 
-    def interpret(self, tree):
-        """ Interprets a C program from its AST """
+    def interpret(self, tree, argv=None):
+        """ Interprets a C program from its AST, argv (list of str) is passed to main(int argc, int* argv) """
         # Visit the AST root (Program) - this will prepare the memory by:
         # loading functions from included libraries, loading local functions and loading global variables
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
         self.visit(tree)
 
         # Create a new stack frame and trigger _init that calls main
-        self.memory.new_frame('main')
+        self.memory.new_frame('_init')
+        args = []
+        if argv is not None:
+            argc, argv_address = self.memory.store_argv(argv)
+            args = [
+                Num(Token(INTEGER_CONST, argc), line=0),
+                Num(Token(INTEGER_CONST, argv_address), line=0)
+            ][:len(self.memory['main'].params)]
         _init = FunctionCall(
             name='main',
-            args=[],
+            args=args,
             line=0
         )
         ret_val = self.visit(_init)
@@ -411,14 +614,134 @@ class Interpreter(Visitor):
         return ret_val.value
 
     @staticmethod
-    def run(program):
-        lexer = Lexer(program)
-        parser = Parser(lexer)
-        tree = parser.parse()
-        SemanticAnalyzer.analyze(tree)
-        status = Interpreter().interpret(tree)
-        print()
-        print(MessageColor.OKBLUE + "Process terminated with status {}".format(status) + MessageColor.ENDC)
-        return status
-
+    def compile(program, stats=None, jobs=None, max_errors=1):
+        """
+            Parses and analyzes a C program, returns a CompiledProgram that can be executed many times.
+            With jobs > 1 top-level declarations are parsed in up to jobs processes (see parse_parallel).
+            Parsing stops at the first error, with max_errors > 1 it recovers and one error with the
+            messages of up to max_errors lexical and syntax errors is raised.
+        """
+        if stats is None:
+            stats = RunStats()
+        with stats.phase('parse'):
+            if jobs is not None and jobs > 1:
+                tree, tokens = parse_parallel(program, workers=jobs, max_errors=max_errors)
+            else:
+                parser = Parser(Lexer(program, max_errors=max_errors))
+                tree = parser.parse()
+                tokens = parser.lexer.token_count
+        with stats.phase('analyze'):
+            analyzer = SemanticAnalyzer.analyze(tree)
+            idioms.annotate(tree)
+        stats.tokens = tokens
+        stats.ast_nodes = sum(1 for _ in walk(tree))
+        stats.symbols = analyzer.symbol_count
+        return CompiledProgram(program, tree, stats, analyzer.diagnostics)
 
+    @staticmethod
+    def run(program, max_steps=None, time_limit=None, profiler=None, coverage=None, stats=None, argv=None,
+            uninitialized='zero', seed=None, sanitize=False, jobs=None, max_errors=1, compiler=None,
+            diagnostics='text'):
+        """
+            Runs a C program and returns its exit status, per-phase statistics are stored in stats (RunStats).
+            The program is compiled by compiler (an IncrementalCompiler) if there is one.
+            The warnings of the analysis are printed to stderr before it runs, as text, as JSON
+            (diagnostics='json') or not at all (diagnostics=None).
+        """
+        if stats is None:
+            stats = RunStats()
+        if compiler is not None:
+            compiled = compiler.compile(program, stats)
+        else:
+            compiled = Interpreter.compile(program, stats, jobs=jobs, max_errors=max_errors)
+        if diagnostics == 'json':
+            print(compiled.diagnostics.to_json(), file=sys.stderr)
+        elif diagnostics is not None and len(compiled.diagnostics):
+            print(compiled.diagnostics.format(), file=sys.stderr)
+        result = compiled.execute(
+            stdin=sys.stdin,
+            stdout=sys.stdout,
+            argv=argv,
+            uninitialized=uninitialized,
+            seed=seed,
+            sanitize=sanitize,
+            max_steps=max_steps,
+            time_limit=time_limit,
+            profiler=profiler,
+            coverage=coverage,
+            stats=stats
+        )
+        print()
+        if sanitize:
+            print(result.leak_report, file=sys.stderr)
+        print(MessageColor.OKBLUE + "Process terminated with status {}".format(result.status) + MessageColor.ENDC)
+        return result.status
+
+
+class ExecutionResult(object):
+    """ The outcome of a single execution of a CompiledProgram """
+    def __init__(self, status, stdout, stats):
+        # value returned by main
+        self.status = status
+        # everything the program printed if no output stream was given, None otherwise
+        self.stdout = stdout
+        self.stats = stats
+        # blocks that were never freed (address, size, C line of the malloc call), only when sanitizing
+        self.leaks = None
+        self.leak_report = None
+
+    def __repr__(self):
+        return 'ExecutionResult(status={}, steps={})'.format(self.status, self.stats.steps)
+
+
+class CompiledProgram(object):
+    """
+        A parsed and analyzed program. The tree is never modified by an execution and every execution
+        gets its own Interpreter (memory, streams, random state), so a program can be executed any
+        number of times, also from several threads at once.
+    """
+    def __init__(self, source, tree, stats, diagnostics=None):
+        self.source = source
+        self.tree = tree
+        # statistics of parsing and analysis, copied into the stats of every execution
+        self.stats = stats
+        # warnings of the analysis (Diagnostics)
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+
+    def execute(self, stdin='', stdout=None, argv=None, uninitialized='zero', seed=None, sanitize=False,
+                max_steps=None, time_limit=None, profiler=None, coverage=None, stats=None):
+        """
+            Executes the program and returns an ExecutionResult.
+            stdin is a string or a readable stream, stdout a writable stream (by default the output
+            is collected in the result), argv a list of strings passed to main(int argc, int* argv).
+            uninitialized is the policy for uninitialized memory (zero, random with seed or poison),
+            sanitize turns memory errors into SanitizerErrors and reports leaks in the result.
+        """
+        if isinstance(stdin, str):
+            stdin = io.StringIO(stdin)
+        captured = None
+        if stdout is None:
+            stdout = captured = io.StringIO()
+        if stats is None:
+            stats = copy.deepcopy(self.stats)
+
+        interpreter = Interpreter(max_steps=max_steps, time_limit=time_limit, stdin=stdin, stdout=stdout,
+                                  uninitialized=uninitialized, seed=seed, sanitize=sanitize)
+        if coverage is not None:
+            coverage.attach(interpreter, self.tree)
+        if profiler is not None:
+            profiler.attach(interpreter)
+            profiler.start()
+        try:
+            with stats.phase('execute'):
+                status = interpreter.interpret(self.tree, argv)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+            stats.steps = interpreter.steps
+            stats.record_memory(interpreter.memory)
+        result = ExecutionResult(status, None if captured is None else captured.getvalue(), stats)
+        if sanitize:
+            result.leaks = interpreter.memory.leaks()
+            result.leak_report = interpreter.memory.leak_report()
+        return result
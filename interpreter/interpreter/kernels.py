@@ -0,0 +1,24 @@
+"""
+Bulk kernels over the simulated memory, used by library functions that work on whole arrays.
+
+Every element is loaded and stored exactly like the equivalent C loop stores it
+(*(dst + i) = f(*(src + i)) keeps the c_type of the destination cell), so a bulk function gives
+the same results as calling the scalar function in a loop, bit for bit. What it saves is evaluating
+the loop node by node.
+"""
+
+from .number import Number
+from ..common.ctype import CType
+
+
+DOUBLE = CType.from_string('double')
+
+
+def map_elements(memory, fn, dst, srcs, count):
+    """ Computes dst[i] = fn(srcs[0][i], srcs[1][i], ...) for 0 <= i < count over double arrays """
+    size = DOUBLE.size_bytes()
+    for offset in range(0, max(count, 0) * size, size):
+        values = [memory.get_at_address(src + offset).value for src in srcs]
+        address = dst + offset
+        cell = memory.get_at_address(address)
+        memory.set_at_address(address, Number(cell.c_type, Number(DOUBLE, fn(*values))))
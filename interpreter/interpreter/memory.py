@@ -1,5 +1,9 @@
 
-from .number import Number, ConstNumber
+import random
+import struct
+import sys
+
+from .number import Number, ConstNumber, PoisonNumber
 from ..common.ctype import CType, StructCType
 
 
@@ -29,44 +33,60 @@ class Scope(object):
 
 
 class Frame(object):
-    """ A single stack frame, contains nested scopes """
+    """
+        A single stack frame, contains nested scopes.
+
+        The scopes share one name -> address/const map. Every declaration is recorded in an undo log
+        with the value it shadows, so leaving a scope just restores the log to the length it had when
+        the scope was entered: a scope is a depth and a log position, nothing else. Scope names are only
+        built for __repr__.
+    """
     def __init__(self, frame_name):
         self.frame_name = frame_name
-        # depth = 00
-        self.curr_scope = Scope(
-            '{}.scope_00'.format(frame_name),
-            None
-        )
+        self._values = dict()
+        # (name, value, shadowed value or None) of every declaration in an open scope
+        self._log = []
+        # log length at the start of every nested scope, the depth is its length (scope_00 has none)
+        self._marks = []
 
     def new_scope(self):
         # increase depth
-        self.curr_scope = Scope(
-            '{}{:02d}'.format(
-                self.curr_scope.scope_name[:-2],
-                int(self.curr_scope.scope_name[-2:]) + 1
-            ),
-            self.curr_scope
-        )
+        self._marks.append(len(self._log))
 
     def del_scope(self):
-        self.curr_scope = self.curr_scope.parent_scope
+        mark = self._marks.pop()
+        log = self._log
+        values = self._values
+        while len(log) > mark:
+            name, _, shadowed = log.pop()
+            if shadowed is None:
+                del values[name]
+            else:
+                values[name] = shadowed
+
+    def __setitem__(self, key, value):
+        self._log.append((key, value, self._values.get(key)))
+        self._values[key] = value
+
+    def __getitem__(self, item):
+        return self._values[item]
+
+    def __contains__(self, key):
+        return key in self._values
 
     def find_key(self, key):
-        scope = self.curr_scope
-        while scope and key not in scope:
-            scope = scope.parent_scope
-        return scope
+        return self if key in self._values else None
 
     def _get_scopes(self):
+        """ Returns the open scopes, the innermost first, as Scope objects """
+        bounds = [0] + self._marks + [len(self._log)]
         scopes = []
-        curr_scope = self.curr_scope
-        while curr_scope is not None:
-            scopes.append(curr_scope)
-            curr_scope = curr_scope.parent_scope
-        return scopes
-
-    def __contains__(self, key):
-        return key in self._get_scopes()
+        for depth in range(len(bounds) - 1):
+            scope = Scope('{}.scope_{:02d}'.format(self.frame_name, depth), scopes[-1] if scopes else None)
+            for name, value, _ in self._log[bounds[depth]:bounds[depth + 1]]:
+                scope[name] = value
+            scopes.append(scope)
+        return scopes[::-1]
 
     def __repr__(self):
         lines = [
@@ -90,6 +110,7 @@ class Stack(object):
         # curr_frame is always the last in the list
         self.curr_frame = None
         self.frames = []
+        self.max_depth = 0
 
     def is_empty(self):
         return self.curr_frame is None
@@ -97,6 +118,8 @@ class Stack(object):
     def new_frame(self, frame_name):
         self.frames.append(Frame(frame_name))
         self.curr_frame = self.frames[-1]
+        if len(self.frames) > self.max_depth:
+            self.max_depth = len(self.frames)
 
     def del_frame(self):
         self.frames.pop(-1)
@@ -115,24 +138,68 @@ class Stack(object):
 class Memory(object):
     """
         A simulated program memory, contains a raw_memory map that maps addresses to values and a stack with frames.
-        Every frame contains nested scopes and each scope maps symbol names to addresses/consts.
+        Every frame contains nested scopes that map symbol names to addresses/consts.
         There is also a global scope and a list of dynamically allocated addresses.
 
         Mapping name->address in scopes and address->val in raw_memory is a way to simulate C memory system in python.
         In reality the raw_memory map would not be necessary since scope members would inherently have addresses.
 
         Possible values are Number(ctype, value), FunctionDecl(C Fun), <function> (Py Fun), StructDecl, dict (struct m.)
+
+        Everything a run touches lives here (including its standard streams and the rand() state)
+        so independent programs can be executed side by side.
+
+        C strings (literals, argv) are stored as NUL-terminated bytes in a separate data segment
+        starting at DATA_ADDRESS, every byte reads as a char cell. string.h works directly on its bytes.
     """
 
     # Addresses start from this number and always grow
     STARTING_ADDRESS = int(1e6)
+    # Start of the data segment (C strings), far above the addresses of cells
+    DATA_ADDRESS = 1 << 30
 
-    def __init__(self):
+    # What uninitialized memory (declared variables, unknown addresses) holds
+    UNINITIALIZED_POLICIES = ('zero', 'random', 'poison')
+
+    def __init__(self, stdin=None, stdout=None, uninitialized='zero', seed=None):
         self.global_scope = Scope('global_scope')
         self.stack = Stack()
         self.raw_memory = dict()
         self.next_free_address = Memory.STARTING_ADDRESS
-        self.dyn_alloc_addr = set()
+        # live malloc'd blocks: address -> (size, C line of the malloc call)
+        self.dyn_alloc_addr = dict()
+        # statistics: raw_memory only shrinks on free so its peak is recorded there
+        self.peak_entries = 0
+        self.alloc_count = 0
+        self.free_count = 0
+        # bytes in live malloc'd blocks and the most there ever were
+        self.heap_bytes = 0
+        self.peak_heap_bytes = 0
+        # C line of the malloc call -> [blocks allocated, bytes allocated]
+        self.allocation_sites = dict()
+        # standard streams of the program and the state of rand()/srand()
+        self.stdin = sys.stdin if stdin is None else stdin
+        self.stdout = sys.stdout if stdout is None else stdout
+        self.random = random.Random()
+        # zero: cheap and reproducible, random: garbage from a generator seeded with seed,
+        # poison: any use of the value raises UninitializedRead
+        if uninitialized not in Memory.UNINITIALIZED_POLICIES:
+            raise ValueError("Unknown uninitialized memory policy '{}'".format(uninitialized))
+        self.uninitialized = uninitialized
+        self.garbage = random.Random(seed)
+        # C line of the library call being executed (e.g. malloc), set by the interpreter
+        self.call_line = 0
+        # the data segment and the addresses of string literals stored in it
+        self.data = bytearray()
+        self.string_literals = dict()
+
+    def uninitialized_value(self, c_type):
+        """ Returns the value of uninitialized memory of the given type """
+        if self.uninitialized == 'zero':
+            return Number(c_type, 0)
+        if self.uninitialized == 'random':
+            return Number(c_type, c_type.random_value(self.garbage))
+        return PoisonNumber(c_type)
 
     def declare_constant(self, name, value):
         scope = self._get_curr_scope()
@@ -144,11 +211,57 @@ class Memory(object):
         self.next_free_address += block_sz
         return ret_address
 
+    def dyn_allocate(self, block_sz):
+        """ Allocates a dynamic (malloc) memory block """
+        address = self.allocate(block_sz)
+        self.dyn_alloc_addr[address] = (block_sz, self.call_line)
+        self.alloc_count += 1
+        self.heap_bytes += block_sz
+        self.peak_heap_bytes = max(self.peak_heap_bytes, self.heap_bytes)
+        site = self.allocation_sites.get(self.call_line)
+        if site is None:
+            site = self.allocation_sites[self.call_line] = [0, 0]
+        site[0] += 1
+        site[1] += block_sz
+        return address
+
+    def dyn_free(self, address):
+        """ Frees a dynamically allocated memory block, free(NULL) does nothing """
+        if address == 0:
+            return
+        if address not in self.dyn_alloc_addr:
+            raise RuntimeError("Can't free memory that was not dynamically allocated")
+        self.peak_entries = self.get_peak_entries()
+        block_sz, _ = self.dyn_alloc_addr.pop(address)
+        self.raw_memory.pop(address, None)
+        self.free_count += 1
+        self.heap_bytes -= block_sz
+
+    def leaks(self):
+        """ Returns (address, size, C line of the malloc call) of every block that was never freed """
+        return [(address, block_sz, line) for address, (block_sz, line) in sorted(self.dyn_alloc_addr.items())]
+
+    def store_argv(self, argv):
+        """ Stores command line arguments as C strings, returns argc and the address of the argv array """
+        int_type = CType.from_string('int')
+        addresses = [self.store_string(arg) for arg in argv]
+        # argv[argc] is a null pointer
+        addresses.append(0)
+        argv_address = self.allocate(len(addresses) * int_type.size_bytes())
+        for idx, address in enumerate(addresses):
+            self.raw_memory[argv_address + idx * int_type.size_bytes()] = Number(int_type, address)
+        return len(argv), argv_address
+
+    def get_peak_entries(self):
+        """ Returns the largest number of raw_memory entries seen so far """
+        return max(self.peak_entries, len(self.raw_memory))
+
     def _get_curr_scope(self):
         if self.stack.is_empty():
             return self.global_scope
         else:
-            return self.stack.curr_frame.curr_scope
+            # the frame stores the names of all its scopes
+            return self.stack.curr_frame
 
     def _declare(self, name, size_bytes, initial_value):
         # find the current scope
@@ -157,7 +270,7 @@ class Memory(object):
         # name -> address (just int) / const (Number!, no address)
         scope[name] = self.allocate(size_bytes)  # random fixed fun size
 
-        # address -> random value
+        # address -> initial value
         self.raw_memory[scope[name]] = initial_value
 
     def declare_fun(self, name):
@@ -172,7 +285,7 @@ class Memory(object):
 
     def declare_num(self, c_type, name):
         """ Reserves space for a num variable """
-        self._declare(name, c_type.size_bytes(), Number(c_type))
+        self._declare(name, c_type.size_bytes(), self.uninitialized_value(c_type))
 
     def declare_struct_var(self, c_type, name):
         """ Reserves space for a struct variable """
@@ -186,9 +299,9 @@ class Memory(object):
             address = self.allocate(field_c_type.size_bytes())
             self[name][field_name] = address
             if isinstance(field_c_type, StructCType):  # also field_c_type is a pointer
-                self.raw_memory[address] = Number(CType.from_string('int'))
+                self.raw_memory[address] = self.uninitialized_value(CType.from_string('int'))
             else:
-                self.raw_memory[address] = Number(field_c_type)
+                self.raw_memory[address] = self.uninitialized_value(field_c_type)
 
     def find_key(self, key):
         """ Returns the scope with the given key starting from the current scope """
@@ -205,20 +318,173 @@ class Memory(object):
         raise RuntimeError("Failed to find {} in the current scope".format(key))
 
     def get_value_in_scope(self, key):
-        scope = self.find_key(key)
-        return scope[key]
+        frame = self.stack.curr_frame
+        if frame is not None and key in frame:
+            return frame[key]
+        return self.find_key(key)[key]
 
     def set_at_address(self, address, value):
+        if address >= Memory.DATA_ADDRESS and self.in_data(address):
+            # only the low byte of the value fits in the data segment
+            self.data[address - Memory.DATA_ADDRESS] = int(value.value) & 0xff
+            return
         self.raw_memory[address] = value
         if value is None:
             raise RuntimeError()
 
     def get_at_address(self, address):
         if address not in self.raw_memory:
-            # Return a random int number
-            self.raw_memory[address] = Number(CType(type_spec='int'))
+            if address >= Memory.DATA_ADDRESS and self.in_data(address):
+                return Number(CType(type_spec='char'), self.data[address - Memory.DATA_ADDRESS])
+            # memory that was never written holds an uninitialized int
+            self.raw_memory[address] = self.uninitialized_value(CType(type_spec='int'))
         return self.raw_memory[address]
 
+    # C strings
+
+    def in_data(self, address, block_sz=1):
+        """ Checks if a block lies in the data segment """
+        offset = address - Memory.DATA_ADDRESS
+        return 0 <= offset and offset + block_sz <= len(self.data)
+
+    def store_bytes(self, content):
+        """ Copies bytes to the end of the data segment, returns their address """
+        address = Memory.DATA_ADDRESS + len(self.data)
+        self.data += content
+        return address
+
+    def store_string(self, text):
+        """ Stores a python string as a NUL-terminated C string, returns its address """
+        return self.store_bytes(text.encode('utf-8') + b'\0')
+
+    def string_literal(self, text):
+        """ Returns the address of a string literal, every literal is stored once per run """
+        address = self.string_literals.get(text)
+        if address is None:
+            address = self.string_literals[text] = self.store_string(text)
+        return address
+
+    def read_bytes(self, address, block_sz):
+        """ Returns the bytes of a block, a memoryview of the data segment if it lies there """
+        if self.in_data(address, block_sz):
+            offset = address - Memory.DATA_ADDRESS
+            return memoryview(self.data)[offset:offset + block_sz]
+        return bytes(int(self.get_at_address(address + i).value) & 0xff for i in range(block_sz))
+
+    def c_string(self, address):
+        """ Returns the bytes of a C string without its terminating NUL """
+        if self.in_data(address):
+            offset = address - Memory.DATA_ADDRESS
+            end = self.data.find(0, offset)
+            if end != -1:
+                return memoryview(self.data)[offset:end]
+        content = bytearray()
+        while True:
+            byte = int(self.get_at_address(address + len(content)).value) & 0xff
+            if byte == 0:
+                return bytes(content)
+            content.append(byte)
+
+    def write_string(self, address, content):
+        """ Stores the bytes of a C string (a memoryview is written without copying it) and its NUL """
+        self.write_bytes(address, content)
+        self.write_bytes(address + len(content), b'\0')
+
+    @staticmethod
+    def compare_bytes(first, second):
+        """ Compares two blocks (memoryviews or bytes) like unsigned chars, returns -1, 0 or 1 """
+        if first == second:
+            return 0
+        # views don't support ordering, only unequal blocks are copied
+        first, second = bytes(first), bytes(second)
+        return (first > second) - (first < second)
+
+    def find_in_string(self, address, sub):
+        """ Returns the offset of sub (bytes-like) in the C string at address, -1 if it isn't there """
+        string = self.c_string(address)
+        if isinstance(string, memoryview):
+            # searched in place
+            offset = address - Memory.DATA_ADDRESS
+            found = self.data.find(sub, offset, offset + len(string))
+            return -1 if found == -1 else found - offset
+        return string.find(sub)
+
+    def read_string(self, address):
+        """ Returns a C string as a python string """
+        return bytes(self.c_string(address)).decode('utf-8', 'replace')
+
+    def write_bytes(self, address, content):
+        """ Stores bytes at an address, outside of the data segment every byte gets a char cell """
+        if self.in_data(address, len(content)):
+            offset = address - Memory.DATA_ADDRESS
+            self.data[offset:offset + len(content)] = content
+            return
+        char = CType(type_spec='char')
+        for offset, byte in enumerate(bytes(content)):
+            self.set_at_address(address + offset, Number(char, byte))
+
+    # Bulk operations, used by recognized loop idioms and string.h
+
+    def cells(self, address, count, stride):
+        """ Yields the values of count cells starting at address, stride bytes apart """
+        for address in range(address, address + count * stride, stride):
+            yield self.get_at_address(address)
+
+    def fill(self, address, count, stride, value):
+        """ Does *p = value; p++; count times, value is converted to the type of each cell """
+        for address in range(address, address + count * stride, stride):
+            self.set_at_address(address, Number(self.get_at_address(address).c_type, value))
+
+    def copy(self, dst, src, count, dst_stride, src_stride):
+        """ Does *p = *q; p++; q++; count times (front to back even if the blocks overlap) """
+        for offset in range(count):
+            address = dst + offset * dst_stride
+            c_type = self.get_at_address(address).c_type
+            self.set_at_address(address, Number(c_type, self.get_at_address(src + offset * src_stride)))
+
+    def set_bytes(self, address, byte, block_sz):
+        """
+            memset: every cell in the block gets the byte pattern of its type,
+            addresses that hold no value yet get int cells with the byte value
+        """
+        byte &= 0xff
+        if self.in_data(address, block_sz):
+            offset = address - Memory.DATA_ADDRESS
+            self.data[offset:offset + block_sz] = bytes([byte]) * block_sz
+            return
+        raw_memory = self.raw_memory
+        for address in range(address, address + block_sz):
+            cell = raw_memory.get(address)
+            if isinstance(cell, Number):
+                raw_memory[address] = Number(cell.c_type, Memory.byte_pattern(cell.c_type, byte))
+            elif cell is None:
+                raw_memory[address] = Number(CType.from_string('int'), byte)
+            else:
+                raise RuntimeError("Can't set bytes of a non-numeric value at address {}".format(address))
+
+    def move_bytes(self, dst, src, block_sz):
+        """ memmove/memcpy: copies the values stored in a block (with their types), the blocks may overlap """
+        if self.in_data(src, block_sz) or self.in_data(dst, block_sz):
+            # bytes of the data segment, the source is copied before anything is written
+            self.write_bytes(dst, bytes(self.read_bytes(src, block_sz)))
+            return
+        raw_memory = self.raw_memory
+        values = [(offset, raw_memory.get(src + offset)) for offset in range(block_sz)]
+        for offset, value in values:
+            if value is None:
+                continue
+            if not isinstance(value, Number):
+                raise RuntimeError("Can't copy a non-numeric value at address {}".format(src + offset))
+            raw_memory[dst + offset] = value
+
+    @staticmethod
+    def byte_pattern(c_type, byte):
+        """ Returns the value of a c_type whose every byte is byte """
+        raw = bytes([byte]) * c_type.size_bytes()
+        if c_type.py_type() == float:
+            return struct.unpack('<f' if len(raw) == 4 else '<d', raw)[0]
+        return int.from_bytes(raw, 'little')
+
     def __setitem__(self, key, value):
         val_in_scope = self.get_value_in_scope(key)
         if isinstance(val_in_scope, ConstNumber):
@@ -45,7 +45,7 @@ class Number(object):
         """ self - other """
         if self.c_type.pointer:
             # ptr - int
-            data_size = self.c_type().dereference().size_bytes()
+            data_size = self.c_type.dereference().size_bytes()
             return Number(self.c_type, self.value - other.value * data_size)
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
@@ -81,37 +81,37 @@ class Number(object):
         """ self > other """
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
-        return Number(CType(type_spec='int'), res_py_type(self.value) > res_py_type(other.value))
+        return TRUE if res_py_type(self.value) > res_py_type(other.value) else FALSE
 
     def __ge__(self, other):
         """ self >= other """
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
-        return Number(CType(type_spec='int'), res_py_type(self.value) >= res_py_type(other.value))
+        return TRUE if res_py_type(self.value) >= res_py_type(other.value) else FALSE
 
     def __lt__(self, other):
         """ self < other """
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
-        return Number(CType(type_spec='int'), res_py_type(self.value) < res_py_type(other.value))
+        return TRUE if res_py_type(self.value) < res_py_type(other.value) else FALSE
 
     def __le__(self, other):
         """ self <= other """
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
-        return Number(CType(type_spec='int'), res_py_type(self.value) <= res_py_type(other.value))
+        return TRUE if res_py_type(self.value) <= res_py_type(other.value) else FALSE
 
     def __eq__(self, other):
         """ self == other """
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
-        return Number(CType(type_spec='int'), res_py_type(self.value) == res_py_type(other.value))
+        return TRUE if res_py_type(self.value) == res_py_type(other.value) else FALSE
 
     def __ne__(self, other):
         """ self != other """
         res_c_type = CType.combine_types(self.c_type, other.c_type)
         res_py_type = res_c_type.py_type()
-        return Number(CType(type_spec='int'), res_py_type(self.value) != res_py_type(other.value))
+        return TRUE if res_py_type(self.value) != res_py_type(other.value) else FALSE
 
     def __iadd__(self, other):
         """ self += other """
@@ -147,14 +147,30 @@ class Number(object):
         res_py_type = res_c_type.py_type()
         return Number(res_c_type, res_py_type(self.value) ^ res_py_type(other.value))
 
+    def __lshift__(self, other):
+        """ self << other """
+        return self.shift(other, lambda value, count: value << count)
+
+    def __rshift__(self, other):
+        """ self >> other """
+        return self.shift(other, lambda value, count: value >> count)
+
+    def shift(self, other, fn):
+        # the result has the (promoted) type of the left operand
+        res_c_type = CType.combine_types(self.c_type, CType(type_spec='int'))
+        if res_c_type.py_type() != int or other.c_type.py_type() != int:
+            raise TypeError("invalid operands of types '{}' and '{}' to a shift operator".format(
+                str(self.c_type),
+                str(other.c_type)
+            ))
+        return Number(res_c_type, fn(self.value, other.value))
+
     def __bool__(self):
         return bool(self.value)
 
     def log_neg(self):
-        if self.value:
-            return Number(CType(type_spec='int'), 1)
-        else:
-            return Number(CType(type_spec='int'), 0)
+        """ !self """
+        return FALSE if self.value else TRUE
 
     def __repr__(self):
         return '{} ({})'.format(
@@ -168,3 +184,39 @@ class Number(object):
 
 class ConstNumber(Number):
     pass
+
+
+# canonical results of comparisons and logical operators, shared since a Number is never modified
+TRUE = Number(CType(type_spec='int'), 1)
+FALSE = Number(CType(type_spec='int'), 0)
+
+
+class UninitializedRead(RuntimeError):
+    """ Raised when the value of uninitialized memory is used under the poison policy """
+    def __init__(self, c_type):
+        super(UninitializedRead, self).__init__()
+        self.c_type = c_type
+        # C line of the node that used the value, filled in by the interpreter
+        self.line = None
+
+    def __str__(self):
+        return "UninitializedRead: use of an uninitialized {} value at line {}".format(self.c_type, self.line)
+
+
+class PoisonNumber(Number):
+    """
+        Uninitialized memory under the poison policy, any use of its value raises UninitializedRead
+        (or the exception returned by error, if given)
+    """
+    def __init__(self, c_type, error=None):
+        self.c_type = c_type
+        self.error = error
+
+    @property
+    def value(self):
+        if self.error is not None:
+            raise self.error()
+        raise UninitializedRead(self.c_type)
+
+    def __repr__(self):
+        return '{} (uninitialized)'.format(str(self.c_type))
@@ -0,0 +1,174 @@
+"""
+A sampling profiler for interpreted C programs.
+
+A background thread periodically inspects the python stack of the interpreter thread and rebuilds
+the C call stack from it: every visit_FunctionCall frame is a C (or library) function and the
+innermost visited node inside it gives the C line being executed. The interpreter itself only
+pays for a per-node counter that records how many times each C line was evaluated.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from ..syntax_analysis.tree import AstNode, FunctionCall, FunctionDecl
+
+
+class Profiler(object):
+
+    def __init__(self, interval=0.005):
+        # seconds between two samples
+        self.interval = interval
+        # (('main', 12), ('fact', 3), ...) -> seconds spent with that stack on top
+        self.stacks = Counter()
+        self.sample_count = 0
+        # evaluated nodes per C line and calls per C function
+        self.line_evals = Counter()
+        self.calls = Counter()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._target_id = None
+
+    def attach(self, interpreter):
+        """ Registers the evaluation counters on the given interpreter """
+        interpreter.add_node_hook(self.count)
+
+    def count(self, node):
+        self.line_evals[node.line] += 1
+        if node.__class__ is FunctionCall:
+            self.calls[node.name] += 1
+
+    def start(self):
+        """ Starts sampling the calling thread """
+        self._target_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name='c-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target_id)
+            now = time.perf_counter()
+            if frame is not None:
+                stack = self.c_stack(frame)
+                if stack:
+                    self.stacks[stack] += now - last
+                    self.sample_count += 1
+            last = now
+
+    @staticmethod
+    def c_stack(frame):
+        """ Rebuilds the C call stack as a tuple of (function name, line) from a python frame """
+        frames = []
+        while frame is not None:
+            if frame.f_code.co_name.startswith('visit'):
+                frames.append(frame)
+            frame = frame.f_back
+
+        stack = []
+        for frame in reversed(frames):
+            local_vars = frame.f_locals
+            node = local_vars.get('node')
+            if isinstance(node, AstNode) and stack:
+                stack[-1][1] = node.line
+            if frame.f_code.co_name == 'visit_FunctionCall' and 'func' in local_vars:
+                func = local_vars['func']
+                if isinstance(func, FunctionDecl):
+                    stack.append([func.func_name, func.line])
+                else:
+                    # library function, it runs at the line of its call site
+                    stack.append([func.__name__, node.line])
+        return tuple((name, line) for name, line in stack)
+
+    # reports
+
+    def total_time(self):
+        return sum(self.stacks.values())
+
+    def flat_report(self, limit=20):
+        """ Returns a table of the hottest C lines and functions """
+        line_self = Counter()
+        line_total = Counter()
+        func_self = Counter()
+        func_total = Counter()
+        for stack, seconds in self.stacks.items():
+            name, line = stack[-1]
+            line_self[line] += seconds
+            func_self[name] += seconds
+            for name, line in set(stack):
+                line_total[line] += seconds
+            for name in set(name for name, line in stack):
+                func_total[name] += seconds
+
+        total = self.total_time() or 1.0
+        lines = [
+            'Profile: {} samples, {:.3f}s sampled'.format(self.sample_count, self.total_time()),
+            '',
+            '{:>8} {:>8} {:>10} {:>12}  {}'.format('self%', 'total%', 'self(ms)', 'evaluations', 'line'),
+        ]
+        for line, seconds in line_self.most_common(limit):
+            lines.append('{:>7.1f}% {:>7.1f}% {:>10.2f} {:>12}  {}'.format(
+                100 * seconds / total,
+                100 * line_total[line] / total,
+                1000 * seconds,
+                self.line_evals[line],
+                line
+            ))
+        lines.extend([
+            '',
+            '{:>8} {:>8} {:>10} {:>12}  {}'.format('self%', 'total%', 'self(ms)', 'calls', 'function'),
+        ])
+        for name, seconds in func_total.most_common(limit):
+            lines.append('{:>7.1f}% {:>7.1f}% {:>10.2f} {:>12}  {}'.format(
+                100 * func_self[name] / total,
+                100 * seconds / total,
+                1000 * func_self[name],
+                self.calls[name],
+                name
+            ))
+        return '\n'.join(lines)
+
+    def call_tree(self):
+        """ Returns an indented call tree of C functions with their inclusive time """
+        def new_node():
+            return [0.0, defaultdict(new_node)]
+
+        root = new_node()
+        for stack, seconds in self.stacks.items():
+            tree_node = root
+            tree_node[0] += seconds
+            for name, line in stack:
+                tree_node = tree_node[1][name]
+                tree_node[0] += seconds
+
+        total = root[0] or 1.0
+        lines = []
+
+        def format_node(name, tree_node, depth):
+            lines.append('{:>7.1f}% {}{}'.format(100 * tree_node[0] / total, '  ' * depth, name))
+            for child_name, child in sorted(tree_node[1].items(), key=lambda item: -item[1][0]):
+                format_node(child_name, child, depth + 1)
+
+        for name, tree_node in sorted(root[1].items(), key=lambda item: -item[1][0]):
+            format_node(name, tree_node, 0)
+        return '\n'.join(lines)
+
+    def collapsed_stacks(self):
+        """ Returns stacks in the collapsed format used by flamegraph.pl and speedscope """
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            frames = ';'.join('{}:{}'.format(name, line) for name, line in stack)
+            # weights are integer microseconds
+            lines.append('{} {}'.format(frames, max(1, int(seconds * 1e6))))
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        return '{}\n\nCall tree\n{}'.format(self.flat_report(), self.call_tree())
@@ -0,0 +1,119 @@
+"""
+A memory sanitizer for interpreted C programs.
+
+SanitizedMemory keeps one shadow byte for every byte of the cell address space with the state of that
+byte: allocated (declared variables and malloc'd blocks), heap (malloc'd) and freed. Whether a slot
+was initialized is tracked by the cell itself: uninitialized memory is poisoned (see PoisonNumber),
+so the error is raised where the value is used, not where it is merely addressed (the interpreter
+reads the old cell of every assignment to learn its type).
+
+Errors (uninitialized reads, use-after-free, double and invalid frees) stop the program, the
+interpreter adds the C line. Blocks still allocated when the program exits are reported as leaks.
+"""
+
+from .memory import Memory
+from .number import PoisonNumber
+from ..common.ctype import CType
+
+
+# shadow byte states
+ALLOCATED = 1
+HEAP = 2
+FREED = 4
+
+
+class SanitizerError(RuntimeError):
+    """ A memory error found by the sanitizer """
+    def __init__(self, kind, message):
+        super(SanitizerError, self).__init__()
+        # heap-use-after-free, double-free or invalid-free
+        self.kind = kind
+        self.message = message
+        # C line of the node that caused the error, filled in by the interpreter
+        self.line = None
+
+    def __str__(self):
+        return "SanitizerError: {}: {} at line {}".format(self.kind, self.message, self.line)
+
+
+class SanitizedMemory(Memory):
+
+    def __init__(self, stdin=None, stdout=None, seed=None):
+        super(SanitizedMemory, self).__init__(stdin=stdin, stdout=stdout, uninitialized='poison', seed=seed)
+        # one state byte per address from STARTING_ADDRESS to next_free_address
+        self.shadow = bytearray()
+
+    def state(self, address):
+        offset = address - Memory.STARTING_ADDRESS
+        if 0 <= offset < len(self.shadow):
+            return self.shadow[offset]
+        return 0
+
+    def allocate(self, block_sz):
+        address = super(SanitizedMemory, self).allocate(block_sz)
+        self.shadow += bytes([ALLOCATED]) * block_sz
+        return address
+
+    def dyn_allocate(self, block_sz):
+        address = super(SanitizedMemory, self).dyn_allocate(block_sz)
+        offset = address - Memory.STARTING_ADDRESS
+        self.shadow[offset:offset + block_sz] = bytes([ALLOCATED | HEAP]) * block_sz
+        return address
+
+    def dyn_free(self, address):
+        if address == 0:
+            # free(NULL) does nothing
+            return
+        if address not in self.dyn_alloc_addr:
+            if self.state(address) & FREED:
+                raise SanitizerError('double-free', 'address {} was already freed'.format(address))
+            raise SanitizerError('invalid-free', 'address {} is not the start of a malloc\'d block'.format(address))
+        block_sz, _ = self.dyn_alloc_addr[address]
+        super(SanitizedMemory, self).dyn_free(address)
+        offset = address - Memory.STARTING_ADDRESS
+        self.shadow[offset:offset + block_sz] = bytes([HEAP | FREED]) * block_sz
+        for address in range(address, address + block_sz):
+            self.raw_memory.pop(address, None)
+
+    def get_at_address(self, address):
+        if address not in self.raw_memory and self.state(address) & FREED:
+            # reading it is an error, getting its type (to overwrite it) is not
+            return PoisonNumber(CType(type_spec='int'), lambda: self.use_after_free(address))
+        return super(SanitizedMemory, self).get_at_address(address)
+
+    def set_at_address(self, address, value):
+        if self.state(address) & FREED:
+            raise self.use_after_free(address)
+        super(SanitizedMemory, self).set_at_address(address, value)
+
+    def check_block(self, address, block_sz):
+        """ Raises heap-use-after-free if any byte of the block belongs to a freed block """
+        offset = address - Memory.STARTING_ADDRESS
+        start = max(offset, 0)
+        for index, state in enumerate(self.shadow[start:max(offset + block_sz, start)]):
+            if state & FREED:
+                raise self.use_after_free(Memory.STARTING_ADDRESS + start + index)
+
+    def set_bytes(self, address, byte, block_sz):
+        # every cell of the block gets a value, so it is initialized
+        self.check_block(address, block_sz)
+        super(SanitizedMemory, self).set_bytes(address, byte, block_sz)
+
+    def move_bytes(self, dst, src, block_sz):
+        # the copies keep their cells, copying an uninitialized value is no error until it is used
+        self.check_block(src, block_sz)
+        self.check_block(dst, block_sz)
+        super(SanitizedMemory, self).move_bytes(dst, src, block_sz)
+
+    @staticmethod
+    def use_after_free(address):
+        return SanitizerError('heap-use-after-free', 'address {} belongs to a freed block'.format(address))
+
+    def leak_report(self):
+        leaks = self.leaks()
+        if not leaks:
+            return 'LeakSanitizer: no leaks'
+        lines = ['LeakSanitizer: {} bytes leaked in {} block(s)'.format(sum(size for _, size, _ in leaks), len(leaks))]
+        for address, block_sz, line in leaks:
+            lines.append('    {} bytes at address {} allocated at line {}'.format(block_sz, address, line))
+        return '\n'.join(lines)
@@ -0,0 +1,104 @@
+"""
+Statistics of a single run of the whole pipeline: per-phase timings and sizes of the
+structures each phase produced.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class RunStats(object):
+
+    def __init__(self):
+        # phase name -> {'wall': seconds, 'cpu': seconds}
+        self.phases = OrderedDict()
+        # lexing is done on demand by the parser so its time is included in 'parse'
+        self.tokens = 0
+        self.ast_nodes = 0
+        self.symbols = 0
+        # memory
+        self.peak_memory_entries = 0
+        self.max_frame_depth = 0
+        # malloc'd memory, allocations and frees included
+        self.heap = HeapStats()
+        # evaluated statements and expressions (the unit of the step budget)
+        self.steps = 0
+
+    @contextmanager
+    def phase(self, name):
+        """ Measures the wall-clock and CPU time spent in the body of the with statement """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.phases[name] = {
+                'wall': time.perf_counter() - wall,
+                'cpu': time.process_time() - cpu,
+            }
+
+    def record_memory(self, memory):
+        self.peak_memory_entries = memory.get_peak_entries()
+        self.max_frame_depth = memory.stack.max_depth
+        self.heap.record(memory)
+
+    def to_dict(self):
+        return OrderedDict([
+            ('phases', self.phases),
+            ('tokens', self.tokens),
+            ('ast_nodes', self.ast_nodes),
+            ('symbols', self.symbols),
+            ('peak_memory_entries', self.peak_memory_entries),
+            ('max_frame_depth', self.max_frame_depth),
+            ('steps', self.steps),
+            ('heap', self.heap.to_dict()),
+        ])
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+
+class HeapStats(object):
+    """ The state of malloc'd memory at the end of a run """
+
+    # allocation sites listed in the report
+    TOP_SITES = 10
+
+    def __init__(self):
+        self.allocations = 0
+        self.frees = 0
+        self.live_blocks = 0
+        self.bytes_leaked = 0
+        self.peak_bytes = 0
+        # (C line, blocks, bytes) of the lines that allocated the most bytes
+        self.top_sites = []
+        # (address, size, C line) of the blocks that were never freed
+        self.leaks = []
+
+    def record(self, memory):
+        self.allocations = memory.alloc_count
+        self.frees = memory.free_count
+        self.leaks = memory.leaks()
+        self.live_blocks = len(self.leaks)
+        self.bytes_leaked = memory.heap_bytes
+        self.peak_bytes = memory.peak_heap_bytes
+        sites = sorted(memory.allocation_sites.items(), key=lambda site: (-site[1][1], site[0]))
+        self.top_sites = [(line, blocks, size) for line, (blocks, size) in sites[:HeapStats.TOP_SITES]]
+
+    def to_dict(self):
+        return OrderedDict([
+            ('allocations', self.allocations),
+            ('frees', self.frees),
+            ('live_blocks', self.live_blocks),
+            ('bytes_leaked', self.bytes_leaked),
+            ('peak_bytes', self.peak_bytes),
+            ('top_sites', [
+                OrderedDict([('line', line), ('blocks', blocks), ('bytes', size)])
+                for line, blocks, size in self.top_sites
+            ]),
+            ('leaks', [
+                OrderedDict([('address', address), ('bytes', size), ('line', line)])
+                for address, size, line in self.leaks
+            ]),
+        ])
@@ -1,5 +1,7 @@
 """ SCI - Simple C Interpreter """
 
+import sys
+
 from .token_type import *
 from .token import Token
 
@@ -30,24 +32,63 @@ RESERVED_KEYWORDS = {
 class LexicalError(Exception):
     pass
 
+def collected(errors):
+    """ A single error for all the errors of a compilation: the class of the first one, the messages of all """
+    if len(errors) == 1:
+        error = errors[0]
+    else:
+        error = type(errors[0])('\n'.join(str(error) for error in errors))
+    error.errors = list(errors)
+    return error
+
 class Lexer(object):
-    def __init__(self, text):
+    def __init__(self, text, line=1, max_errors=1, offset=0, column=1):
         """
         Initializes the lexer.
 
         text: the source code to be lexically analyzed
         pos: the current lexer position
         current_char: the character at the current lexer position
-        line: the current line number
+        line: the current line number, text may be a part of a file that starts at a later line
+        first_line, offset, first_column: the line, the offset in the file and the column text starts at
+        line_start: the position (can be negative) the current line starts at
+        token_start, token_line: the position and the line the last token starts at
+        token_count: the number of tokens returned so far
+        errors: lexical and syntax errors recorded so far, the lexer and the parser recover from errors
+            and go on until there are max_errors of them
         """
         self.text = text
         self.pos = 0
         self.current_char = self.text[self.pos]
-        self.line = 1
+        self.line = line
+        self.first_line = line
+        self.offset = offset
+        self.first_column = column
+        self.line_start = 1 - column
+        self.token_start = 0
+        self.token_line = line
+        self.token_count = 0
+        self.errors = []
+        self.max_errors = max_errors
 
     def error(self, message):
-        """ Raises a lexical error. """
-        raise LexicalError("LexicalError: " + message)
+        """ Records a lexical error, the caller skips the invalid input. """
+        self.report(LexicalError("LexicalError: " + message))
+
+    def report(self, error):
+        """ Records an error, raises all of them once there are max_errors """
+        if hasattr(error, 'errors'):
+            # all of them were raised already
+            raise error from None
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+        if len(self.errors) >= self.max_errors:
+            raise collected(self.errors) from None
+
+    def raise_errors(self):
+        """ Raises the recorded errors if there are any """
+        if self.errors:
+            raise collected(self.errors) from None
 
     def advance(self, n=1):
         """ Advances the `pos` pointer and sets the `current_char` variable. """
@@ -70,6 +111,7 @@ class Lexer(object):
         while self.current_char is not None and self.current_char.isspace():
             if self.current_char == '\n':
                 self.line += 1
+                self.line_start = self.pos + 1
             self.advance()
 
     def skip_comment(self):
@@ -78,6 +120,7 @@ class Lexer(object):
         while self.current_char is not None:
             if self.current_char == '\n':
                 self.line += 1
+                self.line_start = self.pos + 1
                 self.advance()
                 return
             self.advance()
@@ -91,6 +134,7 @@ class Lexer(object):
                 return
             if self.current_char == '\n':
                 self.line += 1
+                self.line_start = self.pos + 1
             self.advance()
         self.error("Unterminated comment at line {}".format(self.line))
 
@@ -124,6 +168,7 @@ class Lexer(object):
                 self.error(
                     message='Unterminated string literal at line {}'.format(self.line)
                 )
+                break
             result += self.current_char
             self.advance()
         self.advance()
@@ -141,7 +186,7 @@ class Lexer(object):
         if self.current_char != '\'':
             self.error("Unterminated char literal at line {}".format(self.line))
         self.advance()
-        return Token(CHAR_CONST, ord(ch))
+        return Token(CHAR_CONST, ord(ch or '\0'))
 
     def _id(self):
         """ Handles identifiers and reserved keywords. """
@@ -151,12 +196,24 @@ class Lexer(object):
             self.advance()
 
         # Return a reserved keyword token or an id token.
-        token = RESERVED_KEYWORDS.get(result, Token(ID, result))
-        return token
+        keyword = RESERVED_KEYWORDS.get(result)
+        if keyword is not None:
+            return Token(keyword.type, keyword.value)
+        return Token(ID, sys.intern(result))
 
     @property
     def get_next_token(self):
         """ The main lexer method that returns the next token in the text. """
+        self.token_count += 1
+        token = self.next_token()
+        token.start = self.offset + self.token_start
+        token.end = self.offset + self.pos
+        token.line = self.token_line
+        token.column = self.token_start - self.line_start + 1
+        return token
+
+    def next_token(self):
+        """ Scans the next token starting from the current position. """
         while self.current_char is not None:
 
             if self.current_char.isspace():
@@ -171,6 +228,9 @@ class Lexer(object):
                 self.skip_multiline_comment()
                 continue
 
+            self.token_start = self.pos
+            self.token_line = self.line
+
             if self.current_char.isalpha():
                 return self._id()
 
@@ -365,5 +425,8 @@ class Lexer(object):
             self.error(
                 message="Invalid char {} at line {}".format(self.current_char, self.line)
             )
+            self.advance()
 
+        self.token_start = self.pos
+        self.token_line = self.line
         return Token(EOF, None)
@@ -1,9 +1,16 @@
 class Token(object):
     """ A single lexical token"""
+    __slots__ = ('type', 'value', 'start', 'end', 'line', 'column')
 
     def __init__(self, token_type, token_value):
         self.type = token_type
         self.value = token_value
+        # offsets of the first character and after the last one in the file, line and column of the first,
+        # set by the lexer
+        self.start = None
+        self.end = None
+        self.line = None
+        self.column = None
 
     def __str__(self):
         """String representation of the class instance.
@@ -33,6 +33,28 @@ MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN = 'MOD_ASSIGN', 'ADD_ASSIGN', 'SUB_ASSIGN'
 LEFT_ASSIGN, RIGHT_ASSIGN = 'LEFT_ASSIGN', 'RIGHT_ASSIGN'
 AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN = 'AND_ASSIGN', 'XOR_ASSIGN', 'OR_ASSIGN'
 
+ASSIGNMENT_OPERATORS = frozenset([
+    ASSIGN, MUL_ASSIGN, DIV_ASSIGN, MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN,
+    LEFT_ASSIGN, RIGHT_ASSIGN, AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN
+])
+
+# Binary operators by precedence (a higher number binds tighter), all are left associative
+BINARY_PRECEDENCE = {
+    LOG_OR_OP: 1,
+    LOG_AND_OP: 2,
+    OR_OP: 3,
+    XOR_OP: 4,
+    AMPERSAND: 5,
+    EQ_OP: 6, NE_OP: 6,
+    LT_OP: 7, GT_OP: 7, LE_OP: 7, GE_OP: 7,
+    LEFT_OP: 8, RIGHT_OP: 8,
+    PLUS: 9, MINUS: 9,
+    ASTERISK: 10, DIV_OP: 10, MOD_OP: 10,
+}
+
+# Prefix and postfix operators (a cast is also a prefix operator)
+UNARY_OPERATORS = frozenset([INC_OP, DEC_OP, AMPERSAND, ASTERISK, PLUS, MINUS, LOG_NEG])
+
 # Parens 
 LPAREN, RPAREN = 'LPAREN', 'RPAREN'
 LBRACKET, RBRACKET = 'LBRACKET', 'RBRACKET'
@@ -50,6 +72,8 @@ SWITCH, DEFAULT, CASE = 'SWITCH', 'DEFAULT', 'CASE'
 STRUCT = 'STRUCT'
 ARROW = 'ARROW'
 
+POSTFIX_OPERATORS = frozenset([INC_OP, DEC_OP, DOT, ARROW, LPAREN])
+
 # Names
 ID = 'ID'
 
@@ -1,7 +1,8 @@
 from ..lexical_analysis.token_type import *
 from ..syntax_analysis.tree import *
 from .table import *
-from ..common.utils import get_functions, get_constants, MessageColor
+from .diagnostics import Diagnostics
+from ..common.utils import get_functions, get_constants
 from ..common.visitor import Visitor
 from ..common.ctype import CType, StructCType
 
@@ -18,30 +19,46 @@ class SemanticAnalyzer(Visitor):
 
     def __init__(self):
         """ Initializes the analyzer, there is no scope"""
-        self.current_scope = None
+        self.symbols = SymbolTable()
         # the number of nested loops/switches
         self.in_nested_loop = 0
         self.in_nested_switch = 0
+        # the CType returned by the function being analyzed
+        self.return_type = None
+        # warnings, formatted only if they are shown
+        self.diagnostics = Diagnostics()
+        # the number of symbols declared in all scopes
+        self.symbol_count = 0
+        # FunctionDecl -> (number of symbols declared in it, its Diagnostics with lines relative to the
+        # FunctionDecl's), for functions whose bodies are known to be correct and aren't analyzed again
+        # (see IncrementalCompiler), and for the analyzed ones
+        self.unchanged = {}
+        self.function_symbols = {}
 
     def error(self, message):
         raise SemanticError("SemanticError:" + message)
 
-    def warning(self, message):
-        print("SemanticWarning:" + MessageColor.WARNING + message + MessageColor.ENDC)
+    def insert(self, symbol):
+        """ Inserts a symbol in the current scope """
+        self.symbols.insert(symbol)
+        self.symbol_count += 1
 
+    def warning(self, code, node, template, *args):
+        """ Reports a warning about a node, see Diagnostics.report """
+        self.diagnostics.report(code, node.line, template, *args)
 
-    def get_next_scope_name(self, name):
-        """ Generates next scope name by incrementing the number of the current scope. """
-        if name[-2:].isdigit():
-            return '{}{:02d}'.format(
-                name[:-2],
-                int(name[-2:]) + 1
-            )
-        else:
-            return '{}{:02d}'.format(
-                name,
-                1
-            )
+    def visit(self, node):
+        """ Visits a node, annotates an expression with the CType it returns """
+        c_type = Visitor.visit(self, node)
+        if isinstance(node, ExprNode):
+            node.c_type = c_type
+        return c_type
+
+    @staticmethod
+    def convert(node, c_type):
+        """ Records that the value of an analyzed expression is implicitly converted to a numeric c_type """
+        if isinstance(node, ExprNode) and isinstance(node.c_type, CType) and node.c_type != c_type:
+            node.conversion = c_type
 
     """
         A series of visit functions. Beware of inconsistent return values:
@@ -51,22 +68,15 @@ class SemanticAnalyzer(Visitor):
     """
 
     def visit_Program(self, node):
-        # Create a global scope
-        global_scope = ScopedSymbolTable(
-            scope_name='global',
-            scope_level=1,
-            enclosing_scope=self.current_scope,
-        )
-
-        # Set the global scope as the current scope and recurse
-        self.current_scope = global_scope
+        # Enter the global scope and recurse
+        self.symbols.enter_scope('global')
         for child in node.children:
             self.visit(child)
-        if not self.current_scope.lookup('main'):
+        if not self.symbols.lookup('main'):
             self.error(
                 "Undeclared mandatory function main"
             )
-        self.current_scope = self.current_scope.enclosing_scope
+        self.symbols.leave_scope()
 
     def visit_StructDecl(self, node):
         """ name fields """
@@ -81,7 +91,7 @@ class SemanticAnalyzer(Visitor):
                     )
                 )
 
-        if self.current_scope.lookup(node.name, current_scope_only=True):
+        if self.symbols.lookup(node.name, current_scope_only=True):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(
                     node.name,
@@ -89,7 +99,7 @@ class SemanticAnalyzer(Visitor):
                 )
             )
 
-        self.current_scope.insert(struct_symbol)
+        self.insert(struct_symbol)
 
     def visit_VarDecl(self, node):
         """ type_node var_node """
@@ -100,7 +110,7 @@ class SemanticAnalyzer(Visitor):
         var_name = node.var_node.value
         var_symbol = VarSymbol(var_name, node.type_node.c_type)
 
-        if self.current_scope.lookup(var_name, current_scope_only=True):
+        if self.symbols.lookup(var_name, current_scope_only=True):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(
                     var_name,
@@ -108,7 +118,9 @@ class SemanticAnalyzer(Visitor):
                 )
             )
 
-        self.current_scope.insert(var_symbol)
+        self.insert(var_symbol)
+        node.var_node.symbol = var_symbol
+        node.var_node.c_type = var_symbol.c_type
 
     def visit_IncludeLibrary(self, node):
         """ #include <library_name.h> """
@@ -129,7 +141,7 @@ class SemanticAnalyzer(Visitor):
                 self.error(str(e) + " at line {}".format(node.line))
 
             func_name = func.__name__
-            if self.current_scope.lookup(func_name):
+            if self.symbols.lookup(func_name):
                 continue
 
             # Create function symbol
@@ -147,7 +159,7 @@ class SemanticAnalyzer(Visitor):
                     var_symbol = VarSymbol('param{:02d}'.format(i + 1), c_type)
                     func_symbol.params.append(var_symbol)
 
-            self.current_scope.insert(func_symbol)
+            self.insert(func_symbol)
 
         # now load constants
 
@@ -155,36 +167,44 @@ class SemanticAnalyzer(Visitor):
         for name, value in consts:
             c_type = CType.from_string('int')  # TODO: for now only int consts
             const_symbol = ConstSymbol(name, c_type)
-            self.current_scope.insert(const_symbol)
+            self.insert(const_symbol)
 
     def visit_FunctionDecl(self, node):
         """ type_node  func_name ( params ) body """
 
         # Create a function symbol and insert it in the current table
         func_name = node.func_name
-        if self.current_scope.lookup(func_name):
+        if self.symbols.lookup(func_name):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(func_name, node.line)
             )
         func_symbol = FunctionSymbol(func_name, node.type_node.c_type)
-        self.current_scope.insert(func_symbol)
+        self.insert(func_symbol)
+        self.return_type = node.type_node.c_type
 
-        # Create a new scope for the function
-        procedure_scope = ScopedSymbolTable(
-            scope_name=func_name,
-            scope_level=self.current_scope.scope_level + 1,
-            enclosing_scope=self.current_scope
-        )
-        self.current_scope = procedure_scope
+        # Enter a new scope for the function
+        self.symbols.enter_scope(func_name)
 
         # Visit function parameters, adding them to the new scope
         # Since visit_Param returns a symbol, add param symbols to the func symbol
         for param in node.params:
             func_symbol.params.append(self.visit(param))
 
-        self.visit(node.body)
+        if node in self.unchanged:
+            symbol_count, diagnostics = self.unchanged[node]
+            self.symbol_count += symbol_count
+            for diagnostic in diagnostics:
+                self.diagnostics.add(diagnostic.moved(node.line))
+        else:
+            symbol_count = self.symbol_count
+            reported = len(self.diagnostics)
+            self.visit(node.body)
+            self.function_symbols[node] = (
+                self.symbol_count - symbol_count,
+                [diagnostic.moved(-node.line) for diagnostic in self.diagnostics.since(reported)]
+            )
 
-        self.current_scope = self.current_scope.enclosing_scope
+        self.symbols.leave_scope()
 
     def visit_Param(self, node):
         """ type_node var_node, returns a param symbol"""
@@ -192,7 +212,7 @@ class SemanticAnalyzer(Visitor):
         var_name = node.var_node.value
         var_symbol = VarSymbol(var_name, node.type_node.c_type)
 
-        if self.current_scope.lookup(var_name, current_scope_only=True):
+        if self.symbols.lookup(var_name, current_scope_only=True):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(
                     var_name,
@@ -200,7 +220,9 @@ class SemanticAnalyzer(Visitor):
                 )
             )
 
-        self.current_scope.insert(var_symbol)
+        self.insert(var_symbol)
+        node.var_node.symbol = var_symbol
+        node.var_node.c_type = var_symbol.c_type
 
         # Return the param symbol (!)
         return var_symbol
@@ -214,20 +236,13 @@ class SemanticAnalyzer(Visitor):
     def visit_CompoundStmt(self, node):
         """ { children } """
 
-        # We entered a new block, create a new scope
-        block_scope = ScopedSymbolTable(
-            scope_name=self.get_next_scope_name(self.current_scope.scope_name),
-            scope_level=self.current_scope.scope_level + 1,
-            enclosing_scope=self.current_scope
-        )
-
-        # Set it as the current scope and recurse
-        self.current_scope = block_scope
+        # We entered a new block, enter a new scope and recurse
+        self.symbols.enter_scope('{}.block'.format(self.symbols.scope_name))
 
         for child in node.children:
             self.visit(child)
 
-        self.current_scope = self.current_scope.enclosing_scope
+        self.symbols.leave_scope()
 
     def visit_SwitchStmt(self, node):
         expr = self.visit(node.expr)
@@ -282,7 +297,10 @@ class SemanticAnalyzer(Visitor):
 
     def visit_ReturnStmt(self, node):
         """ return expression """
-        return self.visit(node.expression)
+        c_type = self.visit(node.expression)
+        if not self.return_type.pointer:
+            self.convert(node.expression, self.return_type)
+        return c_type
 
     def visit_ContinueStmt(self, node):
         """ continue """
@@ -310,12 +328,12 @@ class SemanticAnalyzer(Visitor):
         right_type = self.visit(node.right)
 
         # Allow logical operators only on ints
-        if node.token.type == AMPERSAND or node.token.type == OR_OP or node.token.type == XOR_OP:
+        if node.op in (Op.AMPERSAND, Op.OR_OP, Op.XOR_OP, Op.LEFT_OP, Op.RIGHT_OP):
             if left_type.type_spec != 'int' or right_type.type_spec != 'int':
                 self.error("Unsupported types ltype:<{}> rtype:<{}> at bitwise operator {} at line {}".format(
                     str(left_type),
                     str(right_type),
-                    node.token.type,
+                    Op.name(node.op),
                     node.line
                 ))
 
@@ -324,32 +342,49 @@ class SemanticAnalyzer(Visitor):
             self.error("Two pointer types (<{}> and <{}>) at binary operator {} at line {}".format(
                     str(left_type),
                     str(right_type),
-                    node.token.type,
+                    Op.name(node.op),
                     node.line
                 ))
 
         # If one pointer allow only PLUS and MINUS with int
         if left_type.pointer:
-            if right_type.type_spec != 'int' or (node.token.type not in [PLUS, MINUS, NE_OP]):
+            if right_type.type_spec != 'int' or (node.op not in [Op.PLUS, Op.MINUS, Op.NE_OP]):
                 self.error("Unsupported pointer arithmetic with types (<{}> and <{}>) at bin op {} at line {}".format(
                     str(left_type),
                     str(right_type),
-                    node.token.type,
+                    Op.name(node.op),
                     node.line
                 ))
             return left_type
         elif right_type.pointer:
-            if left_type.type_spec != 'int' or (node.token.type not in [PLUS, MINUS, NE_OP]):
+            if left_type.type_spec != 'int' or (node.op not in [Op.PLUS, Op.MINUS, Op.NE_OP]):
                 self.error("Unsupported pointer arithmetic with types (<{}> and <{}>) at bin op {} at line {}".format(
                     str(left_type),
                     str(right_type),
-                    node.token.type,
+                    Op.name(node.op),
                     node.line
                 ))
             return right_type
 
-        # Return the resulting type
-        return CType.combine_types(left_type, right_type)
+        # && and || only test their operands
+        if node.op in (Op.LOG_AND_OP, Op.LOG_OR_OP):
+            return CType(type_spec='int')
+
+        # A shift has the promoted type of its left operand
+        if node.op in (Op.LEFT_OP, Op.RIGHT_OP):
+            c_type = CType.combine_types(left_type, CType(type_spec='int'))
+            self.convert(node.left, c_type)
+            return c_type
+
+        # Both operands are converted to the stronger type
+        c_type = CType.combine_types(left_type, right_type)
+        self.convert(node.left, c_type)
+        self.convert(node.right, c_type)
+
+        # Comparisons are ints, the rest return the resulting type
+        if node.op in (Op.LT_OP, Op.GT_OP, Op.LE_OP, Op.GE_OP, Op.EQ_OP, Op.NE_OP):
+            return CType(type_spec='int')
+        return c_type
 
     def visit_UnOp(self, node):
         """ op expr """
@@ -361,19 +396,19 @@ class SemanticAnalyzer(Visitor):
         expr_type = self.visit(node.expr)
 
         # Fix for casting
-        if isinstance(node.token, Type):
-            return node.token.c_type
+        if node.op == Op.CAST:
+            return node.type_node.c_type
 
         # INC/DEC -> lvalue
-        if node.token.type in [INC_OP, DEC_OP] and not self.is_lvalue(node.expr):
+        if node.op in [Op.INC_OP, Op.DEC_OP] and not self.is_lvalue(node.expr):
             self.error("{} not an lvalue, can't inc/dec at un op {} at line {}".format(
                 type(node.expr),
-                node.token.type,
+                Op.name(node.op),
                 node.line
             ))
 
         # ASTERISK -> pointer
-        if node.token.type == ASTERISK:
+        if node.op == Op.ASTERISK:
             if expr_type.pointer or expr_type.type_spec == 'int': # TODO: debatable: pointer hierarchy not impl
                 return expr_type.dereference()
             else:
@@ -385,18 +420,23 @@ class SemanticAnalyzer(Visitor):
                 )
 
         # pointer -> ASTERISK/INC/DEC/AMPERSAND
-        if expr_type.pointer and node.token.type not in [INC_OP, DEC_OP, ASTERISK, AMPERSAND]:
+        if expr_type.pointer and node.op not in [Op.INC_OP, Op.DEC_OP, Op.ASTERISK, Op.AMPERSAND]:
             self.error("Unsupported pointer arithmetic on type (<{}>) at un op {} at line {}".format(
                 str(expr_type),
-                node.token.type,
+                Op.name(node.op),
                 node.line
             ))
 
-        # AMPERSAND casts to int
-        if node.token.type == AMPERSAND:
+        # AMPERSAND casts to int, so does !
+        if node.op in (Op.AMPERSAND, Op.LOG_NEG):
             return CType(type_spec='int')
-        else:
-            return expr_type
+
+        # -x and +x promote x
+        if node.op in (Op.MINUS, Op.PLUS) and isinstance(expr_type, CType):
+            c_type = CType.combine_types(expr_type, CType(type_spec='int'))
+            self.convert(node.expr, c_type)
+            return c_type
+        return expr_type
 
     def visit_TerOp(self, node):
         """ condition ? texpression : fexpression """
@@ -405,17 +445,25 @@ class SemanticAnalyzer(Visitor):
         true_c_type = self.visit(node.true_exp)
         false_c_type = self.visit(node.false_exp)
         if true_c_type != false_c_type:
-            self.warning("Incompatibile types at ternary operator texpr:<{}> fexpr:<{}> at line {}".format(
-                str(true_c_type),
-                str(false_c_type),
-                node.line
-            ))
+            self.warning(
+                'incompatible-ternary', node,
+                "Incompatibile types at ternary operator texpr:<{}> fexpr:<{}>",
+                true_c_type,
+                false_c_type
+            )
+            if isinstance(true_c_type, CType) and isinstance(false_c_type, CType) \
+                    and not true_c_type.pointer and not false_c_type.pointer:
+                # both are converted to the stronger type
+                c_type = CType.combine_types(true_c_type, false_c_type)
+                self.convert(node.true_exp, c_type)
+                self.convert(node.false_exp, c_type)
+                return c_type
         return false_c_type
 
     def is_lvalue(self, node):
         if isinstance(node, Var):
             return True
-        if isinstance(node, UnOp) and node.token.type == ASTERISK and isinstance(node.expr, Var):
+        if isinstance(node, UnOp) and node.op == Op.ASTERISK and node.prefix:
             return True
         if isinstance(node, FieldAccess):
             return True
@@ -430,46 +478,63 @@ class SemanticAnalyzer(Visitor):
         if not self.is_lvalue(node.left):
             self.error("Can't assign to a non-lvalue (<{}>) at ass op {} at line {}".format(
                 type(node.left),
-                node.token.type,
+                Op.name(node.op),
                 node.line
             ))
 
+        # Allow %= and the bitwise assignments only on ints, like their binary operators
+        if node.op in (Op.MOD_ASSIGN, Op.LEFT_ASSIGN, Op.RIGHT_ASSIGN, Op.AND_ASSIGN, Op.XOR_ASSIGN, Op.OR_ASSIGN):
+            if left.type_spec != 'int' or right.type_spec != 'int':
+                self.error("Unsupported types ltype:<{}> rtype:<{}> at ass op {} at line {}".format(
+                    str(left),
+                    str(right),
+                    Op.name(node.op),
+                    node.line
+                ))
+
         # it can be NumVar/PtrVar/*PtrVar
 
         # Allow only +=int and -=int and =int and =matching_type if it is a pointer
         if left.pointer:
-            if node.token.type == ADD_ASSIGN and right.type_spec == 'int':
-                return right
-            if node.token.type == SUB_ASSIGN and right.type_spec == 'int':
-                return right
-            if node.token.type == ASSIGN and right.pointer and left == right:
-                return right
-            if node.token.type == ASSIGN and right.type_spec == 'int':
-                return right
+            if node.op == Op.ADD_ASSIGN and right.type_spec == 'int':
+                return left
+            if node.op == Op.SUB_ASSIGN and right.type_spec == 'int':
+                return left
+            if node.op == Op.ASSIGN and right.pointer and left == right:
+                return left
+            if node.op == Op.ASSIGN and right.type_spec == 'int':
+                return left
             self.error("Unsupported pointer assignment on types (<{}> <{}>) at ass op {} at line {}".format(
                 str(left),
                 str(right),
-                node.token.type,
+                Op.name(node.op),
                 node.line
             ))
         else:
             # Otherwise, don't allow assignment with different types
             # TODO maybe don't allow but let's try
             if left != right:
-                self.warning("Incompatible types when assigning to type <{}> from type <{}> at line {}".format(
-                    str(left),
-                    str(right),
-                    node.line
-                ))
+                self.warning(
+                    'incompatible-assignment', node,
+                    "Incompatible types when assigning to type <{}> from type <{}>",
+                    left,
+                    right
+                )
+            if isinstance(left, CType) and isinstance(right, CType) and not right.pointer:
+                if node.op == Op.ASSIGN:
+                    self.convert(node.right, left)
+                elif node.op not in (Op.LEFT_ASSIGN, Op.RIGHT_ASSIGN):
+                    # the operation is done in the stronger type, its result converted to the left one
+                    self.convert(node.right, CType.combine_types(left, right))
 
-        # Return the resulting type
-        return right
+        # The assigned value has the type of the left side
+        return left
 
     def visit_Var(self, node):
         """ value """
         # Visit a variable and check if it exists in the current scope
         var_name = node.value
-        var_symbol = self.current_scope.lookup(var_name)
+        var_symbol = self.symbols.lookup(var_name)
         if var_symbol is None:
             self.error(
                 "Symbol(identifier) not found '{}' at line {}".format(
@@ -477,31 +542,46 @@ class SemanticAnalyzer(Visitor):
                     node.line
                 )
             )
+        node.symbol = var_symbol
 
         # Get type symbol from var symbol and construct a CType based on its name
         return var_symbol.c_type
 
-    def visit_FieldAccess(self, node):
-        # check if var exists
-        var_symbol = self.current_scope.lookup(node.var.value)
-        if var_symbol is None:
-            self.error(
-                "Var not found '{}' at line {}".format(
-                    var_symbol.name,
-                    node.line
+    def field_type(self, node):
+        """ Returns the declared CType of the field a FieldAccess refers to (a StructCType for struct fields) """
+        if isinstance(node.var, Var):
+            # check if var exists
+            var_symbol = self.symbols.lookup(node.var.value)
+            if var_symbol is None:
+                self.error(
+                    "Var not found '{}' at line {}".format(
+                        node.var.value,
+                        node.line
+                    )
                 )
-            )
-        if not isinstance(var_symbol.c_type, StructCType):
+            node.var.symbol = var_symbol
+            var_name, var_c_type = var_symbol.name, var_symbol.c_type
+        else:
+            # a chain like p->next->val
+            var_name, var_c_type = node.var.field.value, self.field_type(node.var)
+            if node.op == Op.DOT:
+                self.error(
+                    "Can't access a field of the struct field '{}' at line {}".format(
+                        var_name,
+                        node.line
+                    )
+                )
+        if not isinstance(var_c_type, StructCType):
             self.error(
                 "Var not a struct '{}' at line {}".format(
-                    var_symbol.name,
+                    var_name,
                     node.line
                 )
             )
 
         # check for ptr.field and struct->field
-        if (var_symbol.c_type.pointer and node.op_type == DOT) or \
-           (not var_symbol.c_type.pointer and node.op_type == ARROW):
+        if (var_c_type.pointer and node.op == Op.DOT) or \
+           (not var_c_type.pointer and node.op == Op.ARROW):
             self.error(
                 "Can't ptr.field or struct->field on line {}".format(
                     node.line
@@ -510,21 +590,25 @@ class SemanticAnalyzer(Visitor):
 
 
         # check for field in struct definition: we could also just define all a.b vars
-        struct_symbol = self.current_scope.lookup(var_symbol.c_type.name)
+        struct_symbol = self.symbols.lookup(var_c_type.name)
         if node.field.value not in struct_symbol.fields:
             self.error(
                 "No field '{}' in struct '{}' at line {}".format(
                     node.field.value,
-                    var_symbol.c_type.name,
+                    var_c_type.name,
                     node.line
                 )
             )
-        if isinstance(struct_symbol.fields[node.field.value], StructCType):
-            return CType.from_string('int')  # just a pointer
         return struct_symbol.fields[node.field.value]
 
+    def visit_FieldAccess(self, node):
+        field_c_type = self.field_type(node)
+        if isinstance(field_c_type, StructCType):
+            return CType.from_string('int')  # just a pointer
+        return field_c_type
+
     def visit_StructType(self, node):
-        struct_symbol = self.current_scope.lookup(node.c_type.name)
+        struct_symbol = self.symbols.lookup(node.c_type.name)
         if struct_symbol is None or not isinstance(struct_symbol, StructSymbol):
             self.error(
                 "Struct name not found '{}' at line {}".format(
@@ -553,18 +637,18 @@ class SemanticAnalyzer(Visitor):
 
     def visit_Num(self, node):
         """ value """
-        # Branch on token type to return the appropriate CType
-        if node.token.type == INTEGER_CONST:
+        # Branch on the constant kind to return the appropriate CType
+        if node.op == Op.INTEGER_CONST:
             return CType(type_spec='int')
-        elif node.token.type == CHAR_CONST:
+        elif node.op == Op.CHAR_CONST:
             return CType(type_spec='char')
-        elif node.token.type == REAL_CONST:
+        elif node.op == Op.REAL_CONST:
             return CType(type_spec='float')
         else:
-            self.error("Unknown num token type: {}".format(node.token.type))
+            self.error("Unknown num token type: {}".format(Op.name(node.op)))
 
     def visit_String(self, node):
-        pass
+        return CType(type_spec='char', pointer=True)
 
     def visit_NoOp(self, node):
         pass
@@ -572,7 +656,7 @@ class SemanticAnalyzer(Visitor):
     def visit_FunctionCall(self, node):
         # Get function symbol and check if its defined
         func_name = node.name
-        func_symbol = self.current_scope.lookup(func_name)
+        func_symbol = self.symbols.lookup(func_name)
         if func_symbol is None:
             self.error(
                 "Function '{}' not found at line {}".format(
@@ -586,6 +670,7 @@ class SemanticAnalyzer(Visitor):
                     node.line
                 )
             )
+        node.symbol = func_symbol
 
         # If function has no params or it is a variadic fn (params is None)
         # just visit the args with no checks and return the return CType
@@ -614,21 +699,33 @@ class SemanticAnalyzer(Visitor):
             param_type = func_symbol.params[i].c_type
             param_types.append(param_type)
             arg_types.append(arg_type)
+            if isinstance(param_type, CType) and not param_type.pointer:
+                self.convert(arg, param_type)
 
         if param_types != arg_types:
-            self.warning("Incompatibile argument types for function <{}{}> but found <{}{}> at line {}".format(
-                func_name,
-                str(param_types).replace('[', '(').replace(']', ')'),
+            self.warning(
+                'incompatible-arguments', node,
+                "Incompatibile argument types for function <{0}({1})> but found <{0}({2})>",
                 func_name,
-                str(arg_types).replace('[', '(').replace(']', ')'),
-                node.line
-            ))
+                param_types,
+                arg_types
+            )
 
         # Return the return value CType
         return func_symbol.c_type
 
     @staticmethod
-    def analyze(tree):
-        """ Analyzes the AST and looks for errors/warnings """
+    def analyze(tree, unchanged=None, diagnostics=None):
+        """
+            Analyzes the AST and looks for errors/warnings, returns the analyzer.
+            unchanged maps FunctionDecls whose bodies are not analyzed to the number of symbols they declare
+            and their diagnostics (see function_symbols), which are reported again.
+            Warnings are collected in diagnostics (a new Diagnostics by default), see analyzer.diagnostics.
+        """
         semantic_analyzer = SemanticAnalyzer()
-        semantic_analyzer.visit(tree)
\ No newline at end of file
+        if unchanged is not None:
+            semantic_analyzer.unchanged = unchanged
+        if diagnostics is not None:
+            semantic_analyzer.diagnostics = diagnostics
+        semantic_analyzer.visit(tree)
+        return semantic_analyzer
\ No newline at end of file
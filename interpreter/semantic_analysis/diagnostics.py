@@ -0,0 +1,121 @@
+"""
+Warnings of the semantic analysis, collected as records instead of being printed.
+
+A Diagnostic keeps its message template and arguments (CTypes, lists of CTypes) and only formats
+them when the message is asked for, so analyzing a file with many warnings costs no string building.
+Repeated diagnostics (same code on the same line) are counted instead of kept twice, and only the
+first limit distinct ones are kept.
+"""
+
+import json
+from collections import OrderedDict
+
+from ..common.utils import MessageColor
+
+
+# distinct diagnostics kept by default, the rest are only counted
+MAX_DIAGNOSTICS = 100
+
+WARNING = 'warning'
+
+
+def format_argument(value):
+    """ A list of types is written like a parameter list, without the parentheses """
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+
+class Diagnostic(object):
+    """ A warning (or other message) about a line of the program """
+    __slots__ = ('code', 'line', 'severity', 'template', 'args', 'count')
+
+    def __init__(self, code, line, template, args, severity=WARNING):
+        # short stable name of the check, e.g. 'incompatible-assignment'
+        self.code = code
+        self.line = line
+        self.severity = severity
+        # str.format template of the message and its arguments, formatted by message
+        self.template = template
+        self.args = args
+        # times it was reported
+        self.count = 1
+
+    @property
+    def message(self):
+        return self.template.format(*[format_argument(arg) for arg in self.args])
+
+    def to_dict(self):
+        return OrderedDict([
+            ('code', self.code),
+            ('message', self.message),
+            ('line', self.line),
+            ('severity', self.severity),
+            ('count', self.count),
+        ])
+
+    def __str__(self):
+        repeated = ' (reported {} times)'.format(self.count) if self.count > 1 else ''
+        return "SemanticWarning:{}{} at line {}{}{}".format(MessageColor.WARNING, self.message, self.line,
+                                                           repeated, MessageColor.ENDC)
+
+    def __repr__(self):
+        return 'Diagnostic({!r}, line={}, severity={!r})'.format(self.code, self.line, self.severity)
+
+    def moved(self, delta):
+        """ A copy of the diagnostic delta lines further """
+        diagnostic = Diagnostic(self.code, self.line + delta, self.template, self.args, self.severity)
+        diagnostic.count = self.count
+        return diagnostic
+
+
+class Diagnostics(object):
+    """ The diagnostics of one analysis, in the order they were first reported """
+
+    def __init__(self, limit=MAX_DIAGNOSTICS):
+        self.limit = limit
+        # (code, line) -> Diagnostic
+        self._reported = OrderedDict()
+        # reports of new diagnostics past the limit
+        self.dropped = 0
+
+    def report(self, code, line, template, *args, severity=WARNING):
+        """ Records a diagnostic, the arguments are only formatted into template when it is shown """
+        self.add(Diagnostic(code, line, template, args, severity))
+
+    def add(self, diagnostic):
+        """ Records a Diagnostic (reported diagnostic.count times) """
+        key = diagnostic.code, diagnostic.line
+        reported = self._reported.get(key)
+        if reported is not None:
+            reported.count += diagnostic.count
+        elif len(self._reported) < self.limit:
+            self._reported[key] = diagnostic
+        else:
+            self.dropped += diagnostic.count
+
+    def since(self, count):
+        """ The diagnostics first reported after the first count ones """
+        return list(self)[count:]
+
+    def __iter__(self):
+        return iter(self._reported.values())
+
+    def __len__(self):
+        return len(self._reported)
+
+    def format(self):
+        """ One line per diagnostic, as the analyzer used to print them """
+        lines = [str(diagnostic) for diagnostic in self]
+        if self.dropped:
+            lines.append('SemanticWarning:{} more not shown'.format(self.dropped))
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return OrderedDict([
+            ('diagnostics', [diagnostic.to_dict() for diagnostic in self]),
+            ('dropped', self.dropped),
+        ])
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
@@ -1,9 +1,9 @@
-from collections import OrderedDict
-
 """
 Symbols and tables used for semantic analysis
 """
 
+import sys
+
 
 class Symbol(object):
     def __init__(self, name, c_type=None):
@@ -11,6 +11,8 @@ class Symbol(object):
         self.name = name
         # a CType
         self.c_type = c_type
+        # level of the scope it is declared in, set by SymbolTable.insert
+        self.scope_level = 0
 
 
 class VarSymbol(Symbol):
@@ -78,53 +80,73 @@ class FunctionSymbol(Symbol):
     __repr__ = __str__
 
 
-class ScopedSymbolTable(object):
-    """ A scope containing a symbol table """
-    def __init__(self, scope_name, scope_level, enclosing_scope=None):
-        self._symbol_table = OrderedDict()
-        self.scope_name = scope_name
-        self.scope_level = scope_level
-        self.enclosing_scope = enclosing_scope
+class SymbolTable(object):
+    """
+        The symbols of all open scopes (global, function, blocks).
+
+        The scopes share one name -> symbol map, like the interpreter's Frame: every insert is recorded
+        in an undo log with the symbol it shadows and leaving a scope restores the log to the length it
+        had when the scope was entered, so a lookup is one dict access however deep the scopes are
+        nested. Every symbol knows the level of the scope it was declared in. Names are interned.
+    """
+    def __init__(self):
+        self._symbols = dict()
+        # (name, symbol, shadowed symbol or None) of every symbol in an open scope
+        self._log = []
+        # log length and name of every open scope, the scope level is its length
+        self._marks = []
+        self._names = []
+
+    @property
+    def scope_level(self):
+        return len(self._marks)
+
+    @property
+    def scope_name(self):
+        return self._names[-1] if self._names else None
+
+    def enter_scope(self, scope_name):
+        self._marks.append(len(self._log))
+        self._names.append(scope_name)
+
+    def leave_scope(self):
+        mark = self._marks.pop()
+        self._names.pop()
+        log = self._log
+        symbols = self._symbols
+        while len(log) > mark:
+            name, _, shadowed = log.pop()
+            if shadowed is None:
+                del symbols[name]
+            else:
+                symbols[name] = shadowed
 
     def __str__(self):
-        h1 = 'SCOPE (SCOPED SYMBOL TABLE)'
+        h1 = 'SYMBOL TABLE'
         lines = ['\n', h1, '=' * len(h1)]
-        for header_name, header_value in (
-            ('Scope name', self.scope_name),
-            ('Scope level', self.scope_level),
-            ('Enclosing scope',
-             self.enclosing_scope.scope_name if self.enclosing_scope else None
+        bounds = self._marks + [len(self._log)]
+        for level, name in enumerate(self._names, 1):
+            lines.append('%-15s: %s' % ('Scope name', name))
+            lines.append('%-15s: %s' % ('Scope level', level))
+            lines.extend(
+                ('%7s: %r' % (key, value))
+                for key, value, _ in self._log[bounds[level - 1]:bounds[level]]
             )
-        ):
-            lines.append('%-15s: %s' % (header_name, header_value))
-        h2 = 'Scope (Scoped symbol table) contents'
-        lines.extend([h2, '-' * len(h2)])
-        lines.extend(
-            ('%7s: %r' % (key, value))
-            for key, value in self._symbol_table.items()
-        )
         lines.append('\n')
-        s = '\n'.join(lines)
-        return s
+        return '\n'.join(lines)
 
     __repr__ = __str__
 
     def insert(self, symbol):
-        """ Inserts a new symbol in the current table. """
-        self._symbol_table[symbol.name] = symbol
+        """ Inserts a new symbol in the current scope. """
+        name = symbol.name = sys.intern(symbol.name)
+        symbol.scope_level = len(self._marks)
+        self._log.append((name, symbol, self._symbols.get(name)))
+        self._symbols[name] = symbol
 
     def lookup(self, name, current_scope_only=False):
-        """ Tries to find a symbol with a given name in the current table. """
-        symbol = self._symbol_table.get(name)
-
-        # return a symbol if found
-        if symbol is not None:
-            return symbol
-
-        # if current_scope_only flag is set, don't search in parent scopes
-        if current_scope_only:
+        """ Finds the innermost symbol with a given name, None if there is none (in the current scope). """
+        symbol = self._symbols.get(name)
+        if symbol is not None and current_scope_only and symbol.scope_level != len(self._marks):
             return None
-
-        # recursively go up the chain and search for the name in parent scopes
-        if self.enclosing_scope is not None:
-            return self.enclosing_scope.lookup(name)
+        return symbol
@@ -0,0 +1,158 @@
+"""
+Parallel parsing of the top-level declarations of a program.
+
+A cheap pre-scan (split_declarations) matches braces over the text, skipping comments, string and char
+literals, and finds where every top-level declaration ends: at a ';' or a '}' outside of any braces
+(a '}' followed by ';' closes a struct declaration, not a function) or at the end of an #include line.
+Consecutive declarations are grouped into batches of about the same size, every batch is lexed and
+parsed in a worker process, starting at the line, column and offset it starts at in the file, and the
+declarations are put together into one Program (see join), so every node gets the position the serial
+parser gives it. Batches stop at their first error, then the whole text is parsed serially, so the
+errors are the ones the serial parser reports.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from ..lexical_analysis.lexer import Lexer
+from .parser import Parser
+from .tree import Program, Positions, walk
+
+
+# texts are only split into batches of at least this many characters, smaller ones are parsed serially
+MIN_BATCH_CHARS = 20000
+# batches per worker, so that a slow batch doesn't keep the other workers idle
+BATCHES_PER_WORKER = 4
+
+# comments, literals (the lexer doesn't escape '"' in strings) and the characters that end a declaration
+_SCAN = re.compile(r'//[^\n]*|/\*.*?\*/|"[^"]*"|\'(?:\\n|.)\'|#[^\n]*|[{};]', re.S)
+# whitespace and comments (followed by a ';')
+_GAP = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.S)
+_SEMICOLON = re.compile(_GAP.pattern + ';', re.S)
+
+
+def split_declarations(text):
+    """
+        Returns the offsets at which the top-level declarations of text end, None if the braces
+        don't match (the serial parser reports the error).
+    """
+    ends = []
+    depth = 0
+    for match in _SCAN.finditer(text):
+        char = match.group()[0]
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                return None
+            if depth == 0 and not _SEMICOLON.match(text, match.end()):
+                ends.append(match.end())
+        elif depth == 0 and char in ';#':
+            ends.append(match.end())
+    if depth != 0:
+        return None
+    return ends
+
+
+def declaration_chunks(text):
+    """
+        Returns the (start, end, first line) of every top-level declaration of text, None if the braces
+        don't match. A declaration spans everything up to the first token of the next one, the serial
+        lexer has skipped that gap when the declaration is built.
+    """
+    ends = split_declarations(text)
+    if ends is None:
+        return None
+    chunks = []
+    start = 0
+    line = 1
+    for end in ends[:-1]:
+        end = _GAP.match(text, end).end()
+        chunks.append((start, end, line))
+        line += text.count('\n', start, end)
+        start = end
+    # trailing whitespace and comments belong to the last declaration
+    chunks.append((start, len(text), line))
+    return chunks
+
+
+def column(text, offset):
+    """ The column of an offset in text """
+    return offset - text.rfind('\n', 0, offset)
+
+
+def split_batches(text, count):
+    """
+        Splits text at declaration ends into at most count (text, line, offset, column) batches of about
+        the same size
+    """
+    chunks = declaration_chunks(text)
+    if not chunks:
+        return [(text, 1, 0, 1)]
+
+    batches = []
+    start = 0
+    line = 1
+    size = len(text) / count
+    for _, end, _ in chunks:
+        if end >= size * (len(batches) + 1) or end == len(text):
+            batches.append((text[start:end], line, start, column(text, start)))
+            line += text.count('\n', start, end)
+            start = end
+    return batches
+
+
+def parse_batch(batch):
+    """ Parses one batch of declarations, returns its Program and the number of tokens """
+    text, line, offset, column = batch
+    parser = Parser(Lexer(text, line, offset=offset, column=column))
+    return parser.parse(), parser.lexer.token_count
+
+
+def join(text, children, spans):
+    """
+        Returns the Program of text made of its top-level declarations, parsed from parts of the text.
+        spans has the (start, end) of every node, the Positions of the parts are stale once the
+        Program is numbered.
+    """
+    program = Program(children=children, line=children[0].line, positions=Positions(text))
+    spans[program] = spans[children[0]][0], spans[children[-1]][1]
+    program.positions.number(program, spans)
+    return program
+
+
+def parse_parallel(text, workers=None, min_batch_chars=MIN_BATCH_CHARS, max_errors=1):
+    """
+        Parses text in up to workers processes (os.cpu_count() by default), returns the Program and the
+        number of tokens like a serial Parser would have
+    """
+    batches = []
+    if text:
+        count = len(text) // min_batch_chars if min_batch_chars else len(text)
+        count = min(count, (workers or os.cpu_count() or 1) * BATCHES_PER_WORKER)
+        if count > 1:
+            batches = split_batches(text, count)
+    if len(batches) < 2:
+        return parse_serial(text, max_errors)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(parse_batch, batches))
+    except Exception:
+        # a batch doesn't parse, the serial parser reports the errors of the file
+        return parse_serial(text, max_errors)
+
+    children = [declaration for part, _ in results for declaration in part.children]
+    spans = {node: part.positions.span(node) for part, _ in results for node in walk(part)}
+    # every batch lexes its own EOF token, the serial lexer lexes one
+    tokens = sum(token_count for _, token_count in results) - (len(results) - 1)
+    return join(text, children, spans), tokens
+
+
+def parse_serial(text, max_errors=1):
+    """ Parses text in this process, returns the Program and the number of tokens """
+    parser = Parser(Lexer(text, max_errors=max_errors))
+    return parser.parse(), parser.lexer.token_count
+
@@ -1,6 +1,7 @@
 """ SCI - Simple C Interpreter """
 
 from ..lexical_analysis.token_type import *
+from ..lexical_analysis.token import Token
 from .tree import *
 from ..common.utils import restorable
 from ..common.ctype import CType, StructCType
@@ -11,15 +12,50 @@ class SyntaxError(Exception):
 
 
 class Parser(object):
+    # the spans of nodes made by probes aren't thrown away, pickling them on every probe would be slow
+    unrestored = ('spans',)
+
     def __init__(self, lexer):
         # use the lexer to fetch new tokens
         self.lexer = lexer
         # set current token to the first token taken from the input
         self.current_token = self.lexer.get_next_token
+        # the token after current_token if peek fetched it already
+        self.next_token = None
+        # the end offset of the last eaten token
+        self.last_end = self.current_token.start
+        # node -> (start, end) offsets, stored in the Positions of the Program at the end
+        self.spans = {}
 
     def error(self, message):
         raise SyntaxError("SyntaxError: " + message)
 
+    def recover(self, error, top_level=False):
+        """
+            Records a syntax error (raises it unless the lexer collects errors) and skips the rest of the
+            statement: up to a SEMICOLON or to the RBRACKET of the enclosing block, nested blocks included.
+            At the top level it skips the rest of the declaration, a function body included.
+        """
+        self.lexer.report(error)
+        depth = 0
+        while self.current_token.type != EOF:
+            token_type = self.current_token.type
+            if token_type == RBRACKET and depth == 0 and not top_level:
+                return
+            self.eat(token_type)
+            if token_type == LBRACKET:
+                depth += 1
+            elif token_type == RBRACKET:
+                depth -= 1
+                if depth <= 0:
+                    if self.current_token.type == SEMICOLON and top_level:
+                        self.eat(SEMICOLON)
+                    return
+            elif token_type == SEMICOLON and depth == 0:
+                return
+        # nothing left to parse
+        self.lexer.raise_errors()
+
     def eat(self, token_type):
         """ Compare the current token type with the passed token
         type and if they match then "eat" the current token
@@ -27,24 +63,40 @@ class Parser(object):
         otherwise raise an exception. """
 
         if self.current_token.type == token_type:
-            self.current_token = self.lexer.get_next_token
+            self.last_end = self.current_token.end
+            if self.next_token is not None:
+                self.current_token, self.next_token = self.next_token, None
+            else:
+                self.current_token = self.lexer.get_next_token
         else:
             self.error(
                 'Expected token <{}> but found <{}> at line {}.'.format(
-                    token_type, self.current_token.type, self.lexer.line
+                    token_type, self.current_token.type, self.current_token.line
                 )
             )
 
+    def span(self, node, start):
+        """ Records that node spans from start (its first token or node) to the last eaten token """
+        offset = start.start if isinstance(start, Token) else self.spans[start][0]
+        self.spans[node] = offset, max(offset, self.last_end)
+        return node
+
+    def peek(self):
+        """ Returns the token after the current one without eating anything """
+        if self.next_token is None:
+            self.next_token = self.lexer.get_next_token
+        return self.next_token
+
     def program(self):
         """
         program                     : declarations
         """
+        start = self.current_token
         root = Program(
             children=self.declarations(),
-            line=self.lexer.line
-
+            line=start.line
         )
-        return root
+        return self.span(root, start)
 
     def declarations(self):
         """
@@ -53,24 +105,28 @@ class Parser(object):
         declarations = []
 
         while self.current_token.type in TYPE_SPECIFIERS or self.current_token.type in [STRUCT, HASH]:
-            if self.current_token.type == HASH:
-                declarations.append(self.include_library())
-            elif self.check_function():
-                declarations.append(self.function_declaration())
-            else:
-                declarations.extend(self.declaration())
+            try:
+                if self.current_token.type == HASH:
+                    declarations.append(self.include_library())
+                elif self.check_function():
+                    declarations.append(self.function_declaration())
+                else:
+                    declarations.extend(self.declaration())
+            except SyntaxError as e:
+                self.recover(e, top_level=True)
         return declarations
 
     def include_library(self):
         """
         include_library             : HASH ID<'include'> LESS_THAN ID DOT ID<'h'> GREATER_THAN
         """
+        start = self.current_token
         self.eat(HASH)
         token = self.current_token
         if token.value != 'include':
             self.error(
                 'Expected token "include" but found {} at line {}.'.format(
-                    token.value, self.lexer.line
+                    token.value, token.line
                 )
             )
 
@@ -82,14 +138,14 @@ class Parser(object):
         extension = self.current_token
         if extension.value != 'h':
             self.error(
-                'You can include only *.h files [line {}]'.format(self.lexer.line)
+                'You can include only *.h files [line {}]'.format(extension.line)
             )
         self.eat(ID)
         self.eat(GT_OP)
-        return IncludeLibrary(
+        return self.span(IncludeLibrary(
             library_name=token.value,
-            line=self.lexer.line
-        )
+            line=start.line
+        ), start)
 
     @restorable
     def check_function(self):
@@ -103,36 +159,41 @@ class Parser(object):
         """
         function_declaration        : decl_type_spec ID LPAREN parameters RPAREN compound_statement
         """
+        start = self.current_token
         type_node = self.decl_type_spec()
         func_name = self.current_token.value
         self.eat(ID)
         self.eat(LPAREN)
         params = self.parameters()
         self.eat(RPAREN)
-        return FunctionDecl(
+        return self.span(FunctionDecl(
             type_node=type_node,
             func_name=func_name,
             params=params,
             body=self.function_body(),
-            line=self.lexer.line
-        )
+            line=start.line
+        ), start)
 
     def function_body(self):
         """
         function_body               : LBRACKET (declaration | statement)* RBRACKET
         """
         result = []
+        start = self.current_token
         self.eat(LBRACKET)
         while self.current_token.type != RBRACKET:
-            if self.current_token.type in TYPE_SPECIFIERS or self.current_token.type == STRUCT:
-                result.extend(self.declaration())
-            else:
-                result.append(self.statement())
+            try:
+                if self.current_token.type in TYPE_SPECIFIERS or self.current_token.type == STRUCT:
+                    result.extend(self.declaration())
+                else:
+                    result.append(self.statement())
+            except SyntaxError as e:
+                self.recover(e)
         self.eat(RBRACKET)
-        return FunctionBody(
+        return self.span(FunctionBody(
             children=result,
-            line=self.lexer.line
-        )
+            line=start.line
+        ), start)
 
     def parameters(self):
         """
@@ -140,20 +201,20 @@ class Parser(object):
         """
         nodes = []
         if self.current_token.type != RPAREN:
-            nodes = [Param(
-                type_node=self.decl_type_spec(),
-                var_node=self.variable(),
-                line=self.lexer.line
-            )]
+            nodes = [self.parameter()]
             while self.current_token.type == COMMA:
                 self.eat(COMMA)
-                nodes.append(Param(
-                    type_node=self.decl_type_spec(),
-                    var_node=self.variable(),
-                    line=self.lexer.line
-                ))
+                nodes.append(self.parameter())
         return nodes
 
+    def parameter(self):
+        start = self.current_token
+        return self.span(Param(
+            type_node=self.decl_type_spec(),
+            var_node=self.variable(),
+            line=start.line
+        ), start)
+
     def declaration(self):
         """
         declaration                 : STRUCT ID LBRACKET struct_field_declaration* RBRACKET SEMICOLON
@@ -176,6 +237,7 @@ class Parser(object):
         return self.current_token.type == LBRACKET
 
     def struct_declaration(self):
+        start = self.current_token
         self.eat(STRUCT)
         name = self.current_token.value
         self.eat(ID)
@@ -191,25 +253,26 @@ class Parser(object):
 
         self.eat(RBRACKET)
         self.eat(SEMICOLON)
-        return StructDecl(
+        return self.span(StructDecl(
             name=name,
             fields=fields_dict,  # name->type
-            line=self.lexer.line
-        )
+            line=start.line
+        ), start)
 
     def struct_field_declaration(self):
         """
         struct_field_declaration    : decl_type_spec struct_declarator_list SEMICOLON        """
         fields = list()
+        start = self.current_token
         type_node = self.decl_type_spec()
         for var in self.struct_declarator_list():
             fields.append(VarDecl(
                 type_node=type_node,
                 var_node=var,
-                line=self.lexer.line
+                line=start.line
             ))
         self.eat(SEMICOLON)
-        return fields
+        return [self.span(field, start) for field in fields]
 
     def struct_declarator_list(self):
         """
@@ -227,14 +290,18 @@ class Parser(object):
         var_declaration             : decl_type_spec init_declarator_list SEMICOLON
         """
         result = list()
+        start = self.current_token
         type_node = self.decl_type_spec()
         for node in self.init_declarator_list():
             if isinstance(node, Var):
-                result.append(VarDecl(
+                declaration = VarDecl(
                     type_node=type_node,
                     var_node=node,
-                    line=self.lexer.line
-                ))
+                    line=start.line
+                )
+                # from the type to the variable
+                self.spans[declaration] = self.spans[type_node][0], self.spans[node][1]
+                result.append(declaration)
             else:
                 result.append(node)
         self.eat(SEMICOLON)
@@ -261,12 +328,12 @@ class Parser(object):
         if self.current_token.type == ASSIGN:
             token = self.current_token
             self.eat(ASSIGN)
-            result.append(Assignment(
+            result.append(self.span(Assignment(
                 left=var,
                 token=token,
                 right=self.assignment_expression(),
-                line=self.lexer.line
-            ))
+                line=var.line
+            ), var))
         return result
 
     def statement(self):
@@ -296,17 +363,21 @@ class Parser(object):
         compound_statement          : LBRACKET (declaration | statement)* RBRACKET
         """
         result = []
+        start = self.current_token
         self.eat(LBRACKET)
         while self.current_token.type != RBRACKET:
-            if self.current_token.type in TYPE_SPECIFIERS or self.current_token.type == STRUCT:
-                result.extend(self.declaration())
-            else:
-                result.append(self.statement())
+            try:
+                if self.current_token.type in TYPE_SPECIFIERS or self.current_token.type == STRUCT:
+                    result.extend(self.declaration())
+                else:
+                    result.append(self.statement())
+            except SyntaxError as e:
+                self.recover(e)
         self.eat(RBRACKET)
-        return CompoundStmt(
+        return self.span(CompoundStmt(
             children=result,
-            line=self.lexer.line
-        )
+            line=start.line
+        ), start)
 
     @restorable
     def check_jump_statement(self):
@@ -318,29 +389,30 @@ class Parser(object):
                                     | BREAK SEMICOLON
                                     | CONTINUE SEMICOLON
         """
+        start = self.current_token
         if self.current_token.type == RETURN:
             self.eat(RETURN)
             expression = self.empty()
             if self.current_token.type != SEMICOLON:
                 expression = self.expression()
             self.eat(SEMICOLON)
-            return ReturnStmt(
+            return self.span(ReturnStmt(
                 expression=expression,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
         elif self.current_token.type == BREAK:
             self.eat(BREAK)
             self.eat(SEMICOLON)
-            return BreakStmt(
-                line=self.lexer.line
-            )
+            return self.span(BreakStmt(
+                line=start.line
+            ), start)
 
         elif self.current_token.type == CONTINUE:
             self.eat(CONTINUE)
             self.eat(SEMICOLON)
-            return ContinueStmt(
-                line=self.lexer.line
-            )
+            return self.span(ContinueStmt(
+                line=start.line
+            ), start)
 
     @restorable
     def check_selection_statement(self):
@@ -352,6 +424,7 @@ class Parser(object):
                                     | SWITCH LPAREN expression RPAREN LBRACKET (declaration | statement | switch_case)* RBRACKET
 
         """
+        start = self.current_token
         if self.current_token.type == IF:
             self.eat(IF)
             self.eat(LPAREN)
@@ -362,12 +435,12 @@ class Parser(object):
             if self.current_token.type == ELSE:
                 self.eat(ELSE)
                 false_body = self.statement()
-            return IfStmt(
+            return self.span(IfStmt(
                 condition=condition,
                 true_body=true_body,
                 false_body=false_body,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
         elif self.current_token.type == SWITCH:
             self.eat(SWITCH)
             self.eat(LPAREN)
@@ -376,34 +449,38 @@ class Parser(object):
             self.eat(LBRACKET)
             result = []
             while self.current_token.type != RBRACKET:
-                if self.current_token.type in TYPE_SPECIFIERS or self.current_token.type == STRUCT:
-                    result.extend(self.declaration())
-                elif self.current_token.type in (CASE, DEFAULT):
-                    result.append(self.switch_case_label())
-                else:
-                    result.append(self.statement())
+                try:
+                    if self.current_token.type in TYPE_SPECIFIERS or self.current_token.type == STRUCT:
+                        result.extend(self.declaration())
+                    elif self.current_token.type in (CASE, DEFAULT):
+                        result.append(self.switch_case_label())
+                    else:
+                        result.append(self.statement())
+                except SyntaxError as e:
+                    self.recover(e)
             self.eat(RBRACKET)
-            return SwitchStmt(
+            return self.span(SwitchStmt(
                 expr=expr,
                 children=result,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
 
     def switch_case_label(self):
+        start = self.current_token
         if self.current_token.type == CASE:
             self.eat(CASE)
             expr = self.expression()
             self.eat(COLON)
-            return SwitchCaseLabel(
+            return self.span(SwitchCaseLabel(
                 expr=expr,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
         else:
             self.eat(DEFAULT)
             self.eat(COLON)
-            return SwitchDefaultLabel(
-                line=self.lexer.line
-            )
+            return self.span(SwitchDefaultLabel(
+                line=start.line
+            ), start)
 
     @restorable
     def check_iteration_statement(self):
@@ -415,17 +492,18 @@ class Parser(object):
                                     | DO statement WHILE LPAREN expression RPAREN SEMICOLON
                                     | FOR LPAREN expression_statement expression_statement (expression)? RPAREN statement
         """
+        start = self.current_token
         if self.current_token.type == WHILE:
             self.eat(WHILE)
             self.eat(LPAREN)
             expression = self.expression()
             self.eat(RPAREN)
             statement = self.statement()
-            return WhileStmt(
+            return self.span(WhileStmt(
                 condition=expression,
                 body=statement,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
         elif self.current_token.type == DO:
             self.eat(DO)
             statement = self.statement()
@@ -434,28 +512,28 @@ class Parser(object):
             expression = self.expression()
             self.eat(RPAREN)
             self.eat(SEMICOLON)
-            return DoWhileStmt(
+            return self.span(DoWhileStmt(
                 condition=expression,
                 body=statement,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
         else:
             self.eat(FOR)
             self.eat(LPAREN)
             setup = self.expression_statement()
             condition = self.expression_statement()
-            increment = NoOp(line=self.lexer.line)
+            increment = self.empty()
             if self.current_token.type != RPAREN:
                 increment = self.expression()
             self.eat(RPAREN)
             statement = self.statement()
-            return ForStmt(
+            return self.span(ForStmt(
                 setup=setup,
                 condition=condition,
                 increment=increment,
                 body=statement,
-                line=self.lexer.line
-            )
+                line=start.line
+            ), start)
 
     def expression_statement(self):
         """
@@ -464,8 +542,10 @@ class Parser(object):
         node = None
         if self.current_token.type != SEMICOLON:
             node = self.expression()
+        else:
+            node = self.empty()
         self.eat(SEMICOLON)
-        return node and node or NoOp(line=self.lexer.line)
+        return node
 
     def expression(self):
         """
@@ -479,337 +559,142 @@ class Parser(object):
         if len(result) == 1:
             return result[0]
         else:
-            return Expression(
+            return self.span(Expression(
                 children=result,
-                line=self.lexer.line
-            )
-
-    @restorable
-    def check_assignment_expression(self):
-        if self.current_token.type == ASTERISK:
-            self.eat(ASTERISK)
-        if self.current_token.type == ID:
-            self.eat(ID)
-            if self.current_token.type == DOT:
-                self.eat(DOT)
-                if not self.current_token.type == ID:
-                    return False
-                self.eat(ID)
-            if self.current_token.type == ARROW:
-                self.eat(ARROW)
-                if not self.current_token.type == ID:
-                    return False
-                self.eat(ID)
-            return self.current_token.type.endswith('ASSIGN')
-        return False
+                line=result[0].line
+            ), result[0])
 
     def assignment_expression(self):
         """
-        assignment_expression       : primary_expression (assign_token assignment_expression)*
-                                    | conditional_expression
+        assignment_expression       : conditional_expression (assign_token assignment_expression)?
         """
-        if self.check_assignment_expression():
-            node = self.primary_expression()
-            while self.current_token.type.endswith('ASSIGN'):
-                token = self.current_token
-                self.eat(token.type)
-                return Assignment(
-                    left=node,
-                    token=token,
-                    right=self.assignment_expression(),
-                    line=self.lexer.line
-                )
-        return self.conditional_expression()
+        node = self.conditional_expression()
+        if self.current_token.type in ASSIGNMENT_OPERATORS:
+            if not isinstance(node, (Var, FieldAccess)) and \
+                    not (isinstance(node, UnOp) and node.op == Op.ASTERISK and node.prefix):
+                self.error("Can't assign to a non-lvalue at line {}".format(self.current_token.line))
+            token = self.current_token
+            self.eat(token.type)
+            return self.span(Assignment(
+                left=node,
+                token=token,
+                right=self.assignment_expression(),
+                line=node.line
+            ), node)
+        return node
 
     def conditional_expression(self):
         """
-        conditional_expression      : logical_and_expression (QUESTION_MARK expression COLON conditional_expression)?
+        conditional_expression      : binary_expression (QUESTION_MARK expression COLON conditional_expression)?
         """
-        node = self.logical_and_expression()
+        node = self.binary_expression(1)
         if self.current_token.type == QUESTION_MARK:
             self.eat(QUESTION_MARK)
             true_exp = self.expression()
             self.eat(COLON)
             false_exp = self.conditional_expression()
-            return TerOp(
+            return self.span(TerOp(
                 condition=node,
                 true_exp=true_exp,
                 false_exp=false_exp,
-                line=self.lexer.line
-            )
-        return node
-
-    def logical_and_expression(self):
-        """
-        logical_and_expression      : logical_or_expression (LOG_AND_OP logical_or_expression)*
-        """
-        node = self.logical_or_expression()
-        while self.current_token.type == LOG_AND_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.logical_or_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def logical_or_expression(self):
-        """
-        logical_or_expression       : inclusive_or_expression (LOG_OR_OP inclusive_or_expression)*
-        """
-        node = self.inclusive_or_expression()
-        while self.current_token.type == LOG_OR_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.inclusive_or_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def inclusive_or_expression(self):
-        """
-        inclusive_or_expression     : exclusive_or_expression (OR_OP exclusive_or_expression)*
-        """
-        node = self.exclusive_or_expression()
-        while self.current_token.type == OR_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.exclusive_or_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def exclusive_or_expression(self):
-        """
-        exclusive_or_expression     : and_expression (XOR_OP and_expression)*
-        """
-        node = self.and_expression()
-        while self.current_token.type == XOR_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.and_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def and_expression(self):
-        """
-        and_expression              : equality_expression (AMPERSAND equality_expression)*
-        """
-        node = self.equality_expression()
-        while self.current_token.type == AMPERSAND:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.equality_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def equality_expression(self):
-        """
-        equality_expression         : relational_expression ((EQ_OP | NE_OP) relational_expression)*
-        """
-        node = self.relational_expression()
-        while self.current_token.type in (EQ_OP, NE_OP):
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.relational_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def relational_expression(self):
-        """
-        relational_expression       : shift_expression ((LE_OP | LT_OP | GE_OP | GT_OP) shift_expression)*
-        """
-        node = self.shift_expression()
-        while self.current_token.type in (LE_OP, LT_OP, GE_OP, GT_OP):
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.shift_expression(),
-                line=self.lexer.line
-            )
-        return node
-
-    def shift_expression(self):
-        """
-        shift_expression            : additive_expression ((LEFT_OP | RIGHT_OP) additive_expression)*
-        """
-        node = self.additive_expression()
-        while self.current_token.type in (LEFT_OP, RIGHT_OP):
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.additive_expression(),
-                line=self.lexer.line
-            )
+                line=node.line
+            ), node)
         return node
 
-    def additive_expression(self):
+    def binary_expression(self, min_precedence):
         """
-        additive_expression         : multiplicative_expression ((PLUS | MINUS) multiplicative_expression)*
-        """
-        node = self.multiplicative_expression()
+        binary_expression           : unary_expression (binary_operator unary_expression)*
 
-        while self.current_token.type in (PLUS, MINUS):
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                token=token,
-                right=self.multiplicative_expression(),
-                line=self.lexer.line
-            )
-
-        return node
-
-    def multiplicative_expression(self):
+        Precedence climbing over BINARY_PRECEDENCE, all binary operators are left associative.
         """
-        multiplicative_expression   : cast_expression ((ASTERISK | DIV_OP | MOD_OP) cast_expression)*
-        """
-        node = self.cast_expression()
-        while self.current_token.type in (ASTERISK, DIV_OP, MOD_OP):
+        node = self.unary_expression()
+        precedence = BINARY_PRECEDENCE.get(self.current_token.type)
+        while precedence is not None and precedence >= min_precedence:
             token = self.current_token
             self.eat(token.type)
-            node = BinOp(
+            node = self.span(BinOp(
                 left=node,
                 token=token,
-                right=self.cast_expression(),
-                line=self.lexer.line
-            )
+                right=self.binary_expression(precedence + 1),
+                line=node.line
+            ), node)
+            precedence = BINARY_PRECEDENCE.get(self.current_token.type)
         return node
 
-    @restorable
-    def check_cast_expression(self):
-        if self.current_token.type == LPAREN:
-            self.eat(LPAREN)
-            if self.current_token.type not in TYPE_SPECIFIERS:
-                return False
-            while self.current_token.type in TYPE_SPECIFIERS:
-                self.eat(self.current_token.type)
-            return self.current_token.type == RPAREN
-        return False
-
-    def cast_expression(self):
-        """
-        multiplicative_expression   : LPAREN decl_type_spec RPAREN cast_expression
-                                    | unary_expression
-        """
-        if self.check_cast_expression():
-            self.eat(LPAREN)
-            type_node = self.decl_type_spec()
-            self.eat(RPAREN)
-            return UnOp(
-                token=type_node,  # TODO: not a token really, refactor
-                expr=self.cast_expression(),
-                line=self.lexer.line
-            )
-        else:
-            return self.unary_expression()
-
     def unary_expression(self):
         """
-        unary_expression            : INC_OP primary_expression
-                                    | DEC_OP primary_expression
+        unary_expression            : LPAREN decl_type_spec RPAREN unary_expression
+                                    | INC_OP unary_expression
+                                    | DEC_OP unary_expression
                                     | AMPERSAND variable
-                                    | ASTERISK cast_expression
-                                    | PLUS cast_expression
-                                    | MINUS cast_expression
-                                    | LOG_NEG cast_expression
+                                    | ASTERISK unary_expression
+                                    | PLUS unary_expression
+                                    | MINUS unary_expression
+                                    | LOG_NEG unary_expression
                                     | postfix_expression
         """
-        if self.current_token.type in (INC_OP, DEC_OP):
-            token = self.current_token
-            self.eat(token.type)
-            return UnOp(
-                token=token,
-                expr=self.primary_expression(),
-                line=self.lexer.line
-            )
-        elif self.current_token.type == AMPERSAND:
-            token = self.current_token
-            self.eat(token.type)
-            return UnOp(
-                token=token,
-                expr=self.variable(),
-                line=self.lexer.line
-            )
-        elif self.current_token.type in (ASTERISK, PLUS, MINUS, LOG_NEG):
-            token = self.current_token
+        token = self.current_token
+        if token.type == LPAREN and self.peek().type in TYPE_SPECIFIERS:
+            self.eat(LPAREN)
+            type_node = self.decl_type_spec()
+            self.eat(RPAREN)
+            return self.span(UnOp(
+                token=type_node,
+                expr=self.unary_expression(),
+                line=token.line
+            ), token)
+        elif token.type in UNARY_OPERATORS:
             self.eat(token.type)
-            return UnOp(
+            return self.span(UnOp(
                 token=token,
-                expr=self.cast_expression(),
-                line=self.lexer.line
-            )
-        else:
-            return self.postfix_expression()
+                expr=self.variable() if token.type == AMPERSAND else self.unary_expression(),
+                line=token.line
+            ), token)
+        return self.postfix_expression()
 
     def postfix_expression(self):
         """
-        postfix_expression          : primary_expression INC_OP
-                                    | primary_expression DEC_OP
-                                    | primary_expression DOT ID
-                                    | primary_expression LPAREN argument_expression_list? RPAREN
+        postfix_expression          : primary_expression postfix_operator*
+        postfix_operator            : INC_OP
+                                    | DEC_OP
+                                    | DOT ID
+                                    | ARROW ID
+                                    | LPAREN argument_expression_list? RPAREN
         """
         node = self.primary_expression()
-        if self.current_token.type in (INC_OP, DEC_OP):
+        while self.current_token.type in POSTFIX_OPERATORS:
             token = self.current_token
-            self.eat(token.type)
-            node = UnOp(
-                token=token,
-                expr=node,
-                line=self.lexer.line,
-                prefix=False
-            )
-        elif self.current_token.type == LPAREN:
-            self.eat(LPAREN)
-            args = list()
-            if not self.current_token.type == RPAREN:
-                args = self.argument_expression_list()
-            self.eat(RPAREN)
-            if not isinstance(node, Var):
-                self.error("Function identifier must be string")
-            node = FunctionCall(
-                name=node.value,
-                args=args,
-                line=self.lexer.line
-            )
-        elif self.current_token.type in [DOT, ARROW]:
-            op_type = self.current_token.type
-            self.eat(op_type)
-            if not isinstance(node, Var):
-                self.error("Struct var must be string")
-            var = node
-            field = self.variable()
-            node = FieldAccess(
-                op_type=op_type,
-                var=var,
-                field=field,
-                line=self.lexer.line
-            )
+            if token.type in (INC_OP, DEC_OP):
+                self.eat(token.type)
+                node = self.span(UnOp(
+                    token=token,
+                    expr=node,
+                    line=node.line,
+                    prefix=False
+                ), node)
+            elif token.type == LPAREN:
+                self.eat(LPAREN)
+                args = list()
+                if not self.current_token.type == RPAREN:
+                    args = self.argument_expression_list()
+                self.eat(RPAREN)
+                if not isinstance(node, Var):
+                    self.error("Function identifier must be string")
+                node = self.span(FunctionCall(
+                    name=node.value,
+                    args=args,
+                    line=node.line
+                ), node)
+            else:
+                self.eat(token.type)
+                if not isinstance(node, (Var, FieldAccess)):
+                    self.error("Struct var must be a variable or a field at line {}".format(token.line))
+                node = self.span(FieldAccess(
+                    op_type=token.type,
+                    var=node,
+                    field=self.variable(),
+                    line=node.line
+                ), node)
         return node
 
     def argument_expression_list(self):
@@ -827,9 +712,7 @@ class Parser(object):
         primary_expression          : LPAREN expression RPAREN
                                     | constant
                                     | string
-                                    | ASTERISK? variable
-                                    | ID DOT ID
-                                    | ID ARROW ID
+                                    | variable
         """
         token = self.current_token
 
@@ -837,44 +720,12 @@ class Parser(object):
             self.eat(LPAREN)
             node = self.expression()
             self.eat(RPAREN)
-            if self.current_token.type == DOT:
-                self.eat(DOT)
-                field_var = self.variable()
             return node
         elif token.type in (INTEGER_CONST, REAL_CONST, CHAR_CONST):
             return self.constant()
         elif token.type == STRING:
             return self.string()
-        elif token.type == ASTERISK:
-            self.eat(ASTERISK)
-            node = UnOp(
-                token=token,
-                expr=self.variable(),
-                line=self.lexer.line
-            )
-            return node
-        else:
-            node = self.variable()
-            if self.current_token.type == DOT:
-                self.eat(DOT)
-                field_var = self.variable()
-                return FieldAccess(
-                    op_type=DOT,
-                    var=node,
-                    field=field_var,
-                    line=self.lexer.line
-                )
-            elif self.current_token.type == ARROW:
-                self.eat(ARROW)
-                field_var = self.variable()
-                return FieldAccess(
-                    op_type=ARROW,
-                    var=node,
-                    field=field_var,
-                    line=self.lexer.line
-                )
-            else:
-                return node  # just a var
+        return self.variable()
         # TODO: [E] and case E: need to be const-exprs
 
     def constant(self):
@@ -886,22 +737,22 @@ class Parser(object):
         token = self.current_token
         if token.type == CHAR_CONST:
             self.eat(CHAR_CONST)
-            return Num(
+            return self.span(Num(
                 token=token,
-                line=self.lexer.line
-            )
+                line=token.line
+            ), token)
         elif token.type == INTEGER_CONST:
             self.eat(INTEGER_CONST)
-            return Num(
+            return self.span(Num(
                 token=token,
-                line=self.lexer.line
-            )
+                line=token.line
+            ), token)
         elif token.type == REAL_CONST:
             self.eat(REAL_CONST)
-            return Num(
+            return self.span(Num(
                 token=token,
-                line=self.lexer.line
-            )
+                line=token.line
+            ), token)
         else:
             self.error("Invalid constant type: {}".format(token.type))
 
@@ -909,6 +760,7 @@ class Parser(object):
         """
         decl_type_spec              : type_spec+ ASTERISK? | STRUCT ID
         """
+        start = self.current_token
         if self.current_token.type == STRUCT:
             self.eat(STRUCT)
             name = self.current_token.value
@@ -919,10 +771,10 @@ class Parser(object):
                 pointer = True
                 self.eat(ASTERISK)
 
-            return StructType(
-                line=self.lexer.line,
+            return self.span(StructType(
+                line=start.line,
                 c_type=StructCType(name, pointer)
-            )
+            ), start)
 
         # Build a string
         specifiers = []
@@ -938,47 +790,59 @@ class Parser(object):
         try:
             c_type = CType.from_string(' '.join(specifiers))
         except RuntimeError as e:
-            self.error(str(e) + " at line {}".format(self.lexer.line))
+            self.error(str(e) + " at line {}".format(start.line))
 
-        return Type(
-            line=self.lexer.line,
+        return self.span(Type(
+            line=start.line,
             c_type=c_type
-        )
+        ), start)
 
     def variable(self):
         """
         variable                    : ID
         """
+        start = self.current_token
         node = Var(
-            token=self.current_token,
-            line=self.lexer.line
+            token=start,
+            line=start.line
         )
         self.eat(ID)
-        return node
+        return self.span(node, start)
 
     def empty(self):
         """An empty production"""
-        return NoOp(
-            line=self.lexer.line
-        )
+        return self.span(NoOp(
+            line=self.current_token.line
+        ), self.current_token)
 
     def string(self):
         """
         string                      : STRING
         """
+        start = self.current_token
         node = String(
-            token=self.current_token,
-            line=self.lexer.line
+            token=start,
+            line=start.line
         )
         self.eat(STRING)
-        return node
+        return self.span(node, start)
 
     def parse(self):
         """
                 Parses the list of tokens and returns a Program AstNode according to grammar.txt
         """
         node = self.program()
-        if self.current_token.type != EOF:
-            self.error("Expected token <EOF> but found <{}>".format(self.current_token.type))
+        while self.current_token.type != EOF:
+            try:
+                self.error("Expected token <EOF> but found <{}>".format(self.current_token.type))
+            except SyntaxError as e:
+                self.recover(e, top_level=True)
+            node.children.extend(self.declarations())
+        self.lexer.raise_errors()
+
+        self.spans[node] = self.spans[node][0], self.last_end
+        lexer = self.lexer
+        node.positions = Positions(lexer.text, lexer.first_line, lexer.offset, lexer.first_column)
+        node.positions.number(node, self.spans)
 
         return node
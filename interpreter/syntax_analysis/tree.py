@@ -1,72 +1,176 @@
+import re
+from array import array
+from bisect import bisect_right
+
+from ..lexical_analysis.token_type import *
+
+
+# token types of the Op kinds, in order
+_OP_TOKEN_TYPES = (
+    PLUS, MINUS, ASTERISK, DIV_OP, MOD_OP, INC_OP, DEC_OP,
+    AMPERSAND, OR_OP, XOR_OP, LEFT_OP, RIGHT_OP,
+    LT_OP, GT_OP, LE_OP, GE_OP, EQ_OP, NE_OP,
+    LOG_AND_OP, LOG_OR_OP, LOG_NEG,
+    ASSIGN, MUL_ASSIGN, DIV_ASSIGN, MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN,
+    LEFT_ASSIGN, RIGHT_ASSIGN, AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN,
+    DOT, ARROW, 'CAST',
+    INTEGER_CONST, CHAR_CONST, REAL_CONST,
+)
+
+
+class Op(object):
+    """ Integer kinds of operators (BinOp, UnOp, Assignment, FieldAccess) and constants (Num) """
+    # arithmetic and bitwise
+    PLUS, MINUS, ASTERISK, DIV_OP, MOD_OP, INC_OP, DEC_OP = range(0, 7)
+    AMPERSAND, OR_OP, XOR_OP, LEFT_OP, RIGHT_OP = range(7, 12)
+    # comparisons and logical
+    LT_OP, GT_OP, LE_OP, GE_OP, EQ_OP, NE_OP = range(12, 18)
+    LOG_AND_OP, LOG_OR_OP, LOG_NEG = range(18, 21)
+    # assignments
+    ASSIGN, MUL_ASSIGN, DIV_ASSIGN, MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN = range(21, 27)
+    LEFT_ASSIGN, RIGHT_ASSIGN, AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN = range(27, 32)
+    # field access, cast
+    DOT, ARROW, CAST = range(32, 35)
+    # constants
+    INTEGER_CONST, CHAR_CONST, REAL_CONST = range(35, 38)
+
+    # token type of every kind, in order
+    TOKEN_TYPES = _OP_TOKEN_TYPES
+
+    @staticmethod
+    def of(token_type):
+        """ Returns the kind of a token type """
+        return _OP_KINDS[token_type]
+
+    @staticmethod
+    def name(op):
+        """ Returns the token type name of a kind, for messages """
+        return 'AMPERSAND' if op == Op.AMPERSAND else Op.TOKEN_TYPES[op]
+
+
+_OP_KINDS = {token_type: op for op, token_type in enumerate(Op.TOKEN_TYPES)}
+
+
 class AstNode(object):
-    """ A node in the abstract syntax tree """
+    """
+        A node in the abstract syntax tree.
+
+        Nodes only have slots: every class lists the attributes it adds in __slots__ and its position
+        in NODE_CLASSES is its integer kind. Operators are stored as Op kinds, tokens aren't kept.
+    """
+    __slots__ = ('line', 'node_id')
+
+    # set for every class below NODE_CLASSES
+    kind = -1
+    # attributes that can hold child nodes in traversal order, all slots but line, node_id and the
+    # annotations of an ExprNode unless set
+    child_fields = None
+
     def __init__(self, line):
         self.line = line
+        # Index of the node in its tree, assigned by number_nodes (0 for nodes outside of a numbered tree)
+        self.node_id = 0
+
+
+class ExprNode(AstNode):
+    """
+        An expression, the semantic analyzer annotates it with its CType and the CType its value is
+        implicitly converted to where it is used (None if it is used as is).
+    """
+    __slots__ = ('c_type', 'conversion')
+
+    def __init__(self, line):
+        AstNode.__init__(self, line)
+        self.c_type = None
+        self.conversion = None
 
 
 class NoOp(AstNode):
-    pass
+    __slots__ = ()
 
 
-class Num(AstNode):
+class Num(ExprNode):
+    __slots__ = ('op', 'value')
+
     def __init__(self, token, line):
-        AstNode.__init__(self, line)
-        self.token = token
+        ExprNode.__init__(self, line)
+        # Op.INTEGER_CONST, Op.CHAR_CONST or Op.REAL_CONST
+        self.op = Op.of(token.type)
         # Numeric value
         self.value = token.value
 
 
-class String(AstNode):
+class String(ExprNode):
+    __slots__ = ('value',)
+
     def __init__(self, token, line):
-        AstNode.__init__(self, line)
-        self.token = token
+        ExprNode.__init__(self, line)
         # String value
         self.value = token.value
 
 # TODO: int* a, b, c creates three pointers and int *a, *b is not allowed, FIX
 class Type(AstNode):
+    __slots__ = ('c_type',)
+
     def __init__(self, line, c_type):
         AstNode.__init__(self, line)
         self.c_type = c_type
 
 
 class StructType(AstNode):
+    __slots__ = ('c_type',)
+
     def __init__(self, line, c_type):
         AstNode.__init__(self, line)
         self.c_type = c_type  # struct name
 
 
-class Var(AstNode):
+class Var(ExprNode):
+    __slots__ = ('value', 'symbol')
+
     def __init__(self, token, line):
-        AstNode.__init__(self, line)
-        self.token = token
+        ExprNode.__init__(self, line)
         # Variable name as a string
         self.value = token.value
+        # the Symbol the name resolves to, set by the semantic analyzer
+        self.symbol = None
+
 
+class BinOp(ExprNode):
+    __slots__ = ('op', 'left', 'right')
 
-class BinOp(AstNode):
     def __init__(self, left, token, right, line):
-        AstNode.__init__(self, line)
-        # Binary operator token
-        self.token = token
+        ExprNode.__init__(self, line)
+        # Binary operator kind (Op)
+        self.op = Op.of(token.type)
         # BinOp arguments (AstNodes)
         self.left = left
         self.right = right
 
 
-class UnOp(AstNode):
+class UnOp(ExprNode):
+    __slots__ = ('op', 'type_node', 'expr', 'prefix')
+
     def __init__(self, token, expr, line, prefix=True):
-        AstNode.__init__(self, line)
-        self.token = token
+        ExprNode.__init__(self, line)
+        # Unary operator kind (Op), a cast is given as its Type node
+        if isinstance(token, Type):
+            self.op = Op.CAST
+            self.type_node = token
+        else:
+            self.op = Op.of(token.type)
+            self.type_node = None
         # UnOp argument (AstNode)
         self.expr = expr
         # A flag indicating if this is a prefix operator
         self.prefix = prefix
 
 
-class TerOp(AstNode):
+class TerOp(ExprNode):
+    __slots__ = ('condition', 'true_exp', 'false_exp')
+
     def __init__(self, condition, true_exp, false_exp, line):
-        AstNode.__init__(self, line)
+        ExprNode.__init__(self, line)
         # A condition to be tested (AstNode)
         self.condition = condition
         # Expressions to return based on the condition (AstNodes)
@@ -74,42 +178,57 @@ class TerOp(AstNode):
         self.false_exp = false_exp
 
 
-class Assignment(AstNode):
+class Assignment(ExprNode):
+    __slots__ = ('left', 'op', 'right')
+
     def __init__(self, left, token, right, line):
-        AstNode.__init__(self, line)
+        ExprNode.__init__(self, line)
         # Variable node (Var)
         self.left = left
-        # Assignment token
-        self.token = token
+        # Assignment operator kind (Op)
+        self.op = Op.of(token.type)
         # The expression to be assigned
         self.right = right
 
 
-class Expression(AstNode):
+class Expression(ExprNode):
+    __slots__ = ('children',)
+
     def __init__(self, children, line):
-        AstNode.__init__(self, line)
+        ExprNode.__init__(self, line)
         # a list of comma-delimited sub-expressions (AstNodes)
         self.children = children
 
 
-class FunctionCall(AstNode):
+class FunctionCall(ExprNode):
+    __slots__ = ('name', 'args', 'symbol', 'callee')
+
     def __init__(self, name, args, line):
-        AstNode.__init__(self, line)
+        ExprNode.__init__(self, line)
         # string name of the function
         self.name = name
         # a list of Param AstNodes
         self.args = args
+        # the FunctionSymbol of the function, set by the semantic analyzer
+        self.symbol = None
+        # inline cache filled by the interpreter on the first call:
+        # (FunctionDecl or python function, is python function, needs memory, return CType)
+        self.callee = None
 
 
-class FieldAccess(AstNode):
+class FieldAccess(ExprNode):
+    __slots__ = ('op', 'var', 'field')
+
     def __init__(self, op_type, var, field, line):
-        AstNode.__init__(self, line)
-        self.op_type = op_type # -> or .
+        ExprNode.__init__(self, line)
+        self.op = Op.of(op_type)  # Op.ARROW or Op.DOT
         self.var = var  # Var node
         self.field = field  # Var field
 
 
 class SwitchStmt(AstNode):
+    __slots__ = ('expr', 'children')
+
     def __init__(self, expr, children, line):
         AstNode.__init__(self, line)
         # The expression to compare
@@ -119,6 +238,8 @@ class SwitchStmt(AstNode):
 
 
 class SwitchCaseLabel(AstNode):
+    __slots__ = ('expr',)
+
     def __init__(self, expr, line):
         AstNode.__init__(self, line)
         # The expression to compare with
@@ -126,11 +247,15 @@ class SwitchCaseLabel(AstNode):
 
 
 class SwitchDefaultLabel(AstNode):
+    __slots__ = ()
+
     def __init__(self, line):
         AstNode.__init__(self, line)
 
 
 class IfStmt(AstNode):
+    __slots__ = ('condition', 'true_body', 'false_body')
+
     def __init__(self, condition, true_body, line, false_body=None):
         AstNode.__init__(self, line)
         # the expression AstNode to check
@@ -140,6 +265,8 @@ class IfStmt(AstNode):
         self.false_body = false_body
 
 class ForStmt(AstNode):
+    __slots__ = ('setup', 'condition', 'increment', 'body', 'idiom')
+
     def __init__(self, setup, condition, increment, body, line):
         AstNode.__init__(self, line)
         # Three expression AstNodes in for header
@@ -148,8 +275,12 @@ class ForStmt(AstNode):
         self.increment = increment
         # The expression to execute
         self.body = body
+        # bulk operation replacing the loop, set by interpreter.idioms.annotate
+        self.idiom = None
 
 class WhileStmt(AstNode):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body, line):
         AstNode.__init__(self, line)
         # the expression AstNode to check
@@ -159,6 +290,9 @@ class WhileStmt(AstNode):
 
 
 class DoWhileStmt(WhileStmt):
+    __slots__ = ()
+    child_fields = ('body', 'condition')
+
     def __init__(self, condition, body, line):
         AstNode.__init__(self, line)
         # the expression AstNode to execute
@@ -168,6 +302,8 @@ class DoWhileStmt(WhileStmt):
 
 
 class ReturnStmt(AstNode):
+    __slots__ = ('expression',)
+
     def __init__(self, expression, line):
         AstNode.__init__(self, line)
         # The expression AstNode to return
@@ -175,14 +311,16 @@ class ReturnStmt(AstNode):
 
 
 class BreakStmt(AstNode):
-    pass
+    __slots__ = ()
 
 
 class ContinueStmt(AstNode):
-    pass
+    __slots__ = ()
 
 
 class CompoundStmt(AstNode):
+    __slots__ = ('children',)
+
     def __init__(self, children, line):
         AstNode.__init__(self, line)
         # A list of statement/decl_list AstNodes that are compounded
@@ -190,6 +328,8 @@ class CompoundStmt(AstNode):
 
 
 class VarDecl(AstNode):
+    __slots__ = ('var_node', 'type_node')
+
     def __init__(self, var_node, type_node, line):
         AstNode.__init__(self, line)
         # Variable name and type nodes
@@ -198,6 +338,8 @@ class VarDecl(AstNode):
 
 
 class StructDecl(AstNode):
+    __slots__ = ('name', 'fields')
+
     def __init__(self, name, fields, line):
         AstNode.__init__(self, line)
         self.name = name  # string
@@ -205,6 +347,8 @@ class StructDecl(AstNode):
 
 
 class IncludeLibrary(AstNode):
+    __slots__ = ('library_name',)
+
     def __init__(self, library_name, line):
         AstNode.__init__(self, line)
         # Library name as a string
@@ -212,6 +356,8 @@ class IncludeLibrary(AstNode):
 
 
 class Param(AstNode):
+    __slots__ = ('var_node', 'type_node')
+
     def __init__(self, type_node, var_node, line):
         AstNode.__init__(self, line)
         # Function param: var and type nodes
@@ -220,6 +366,8 @@ class Param(AstNode):
 
 
 class FunctionDecl(AstNode):
+    __slots__ = ('type_node', 'func_name', 'params', 'body')
+
     def __init__(self, type_node, func_name, params, body, line):
         AstNode.__init__(self, line)
         # Function return type (AstNode), name(string)
@@ -234,6 +382,8 @@ class FunctionDecl(AstNode):
 class FunctionBody(AstNode):
     # Essentially the same as CompoundStmt but semantic analyzer
     # treats them differently so the parser conforms
+    __slots__ = ('children',)
+
     def __init__(self, children, line):
         AstNode.__init__(self, line)
         # A list of statement/decl_list AstNodes that are compounded
@@ -241,7 +391,111 @@ class FunctionBody(AstNode):
 
 
 class Program(AstNode):
-    def __init__(self, children, line):
+    __slots__ = ('children', 'positions')
+    child_fields = ('children',)
+
+    def __init__(self, children, line, positions=None):
         AstNode.__init__(self, line)
         # The whole program, list of declaration AstNodes / includes
-        self.children = children
\ No newline at end of file
+        self.children = children
+        # Positions of the nodes of the tree, set by the parser
+        self.positions = positions
+
+
+NODE_CLASSES = (
+    NoOp, Num, String, Type, StructType, Var, BinOp, UnOp, TerOp, Assignment, Expression, FunctionCall,
+    FieldAccess, SwitchStmt, SwitchCaseLabel, SwitchDefaultLabel, IfStmt, ForStmt, WhileStmt, DoWhileStmt,
+    ReturnStmt, BreakStmt, ContinueStmt, CompoundStmt, VarDecl, StructDecl, IncludeLibrary, Param,
+    FunctionDecl, FunctionBody, Program,
+)
+
+for _kind, _node_class in enumerate(NODE_CLASSES):
+    _node_class.kind = _kind
+    if 'child_fields' not in vars(_node_class):
+        _node_class.child_fields = tuple(
+            name for cls in reversed(_node_class.__mro__) for name in vars(cls).get('__slots__', ())
+            if name not in AstNode.__slots__ and name not in ExprNode.__slots__
+        )
+
+
+def iter_children(node):
+    """ Yields the direct AstNode children of a node """
+    for field in node.child_fields:
+        value = getattr(node, field)
+        if isinstance(value, AstNode):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, AstNode):
+                    yield item
+
+
+def walk(node):
+    """ Yields a node and all of its descendants in preorder, nodes shared by several parents only once """
+    seen = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        yield node
+        stack.extend(reversed(list(iter_children(node))))
+
+
+def number_nodes(tree):
+    """ Assigns consecutive node ids (starting from 1) in preorder, returns the list of nodes """
+    nodes = list(walk(tree))
+    for node_id, node in enumerate(nodes, 1):
+        node.node_id = node_id
+    return nodes
+
+
+class Positions(object):
+    """
+        Source positions of the nodes of a tree, kept in a side table instead of the nodes: the node
+        with node_id i spans the characters from starts[i] to ends[i] (offsets in the file), lines and
+        columns are computed from the offsets when they are needed.
+
+        Offsets count characters of the decoded source, not bytes: they index the str the lexer reads
+        (text[start:end] is the node), and columns count characters like an editor does. They differ
+        from byte offsets after non-ASCII text in comments or literals, text.encode()[:start] gives the
+        byte offset of one.
+    """
+
+    def __init__(self, text, line=1, offset=0, column=1):
+        # text is the part of the file that starts at offset, on the given line and column
+        self.line = line
+        self.line_starts = array('q', [offset - column + 1])
+        self.line_starts.extend(offset + match.end() for match in re.finditer('\n', text))
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def number(self, tree, spans):
+        """ Numbers the nodes of the tree (see number_nodes) and stores their (start, end) spans """
+        nodes = number_nodes(tree)
+        self.starts = array('q', [0] * (len(nodes) + 1))
+        self.ends = array('q', self.starts)
+        for node in nodes:
+            self.starts[node.node_id], self.ends[node.node_id] = spans.get(node, (0, 0))
+
+    def span(self, node):
+        """ The (start, end) offsets of a node of the tree, None for nodes outside of it """
+        if 0 < node.node_id < len(self.starts):
+            return self.starts[node.node_id], self.ends[node.node_id]
+        return None
+
+    def location(self, offset):
+        """ The (line, column) of an offset """
+        index = bisect_right(self.line_starts, offset) - 1
+        return self.line + index, offset - self.line_starts[index] + 1
+
+    def start(self, node):
+        """ The (line, column, offset) a node starts at """
+        offset = self.starts[node.node_id]
+        return self.location(offset) + (offset,)
+
+    def end(self, node):
+        """ The (line, column, offset) right after the last character of a node """
+        offset = self.ends[node.node_id]
+        return self.location(offset) + (offset,)
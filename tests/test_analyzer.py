@@ -2,6 +2,10 @@ import unittest
 from interpreter.lexical_analysis.lexer import Lexer
 from interpreter.syntax_analysis.parser import Parser
 from interpreter.semantic_analysis.analyzer import SemanticAnalyzer, SemanticError
+from interpreter.semantic_analysis.table import SymbolTable, VarSymbol, FunctionSymbol
+from interpreter.semantic_analysis.diagnostics import Diagnostics
+from interpreter.interpreter.interpreter import Interpreter
+from interpreter.syntax_analysis.tree import Var, FunctionCall, BinOp, Assignment, ReturnStmt, ExprNode, walk
 
 class SemanticAnalyzerTestCase(unittest.TestCase):
 
@@ -10,6 +14,7 @@ class SemanticAnalyzerTestCase(unittest.TestCase):
         parser = Parser(lexer)
         tree = parser.parse()
         SemanticAnalyzer.analyze(tree)
+        return tree
 
     def test_ok(self):
         self.analyze("""
@@ -51,6 +56,14 @@ class SemanticAnalyzerTestCase(unittest.TestCase):
                 }
             """)
 
+    def test_integer_assignment_ops(self):
+        for op in ('%=', '<<=', '>>=', '&=', '^=', '|='):
+            with self.assertRaises(SemanticError):
+                self.analyze("int main() { float f = 5.5; f {} 2; return 0; }".replace('{}', op))
+            with self.assertRaises(SemanticError):
+                self.analyze("int main() { int i = 5; i {} 2.5; return 0; }".replace('{}', op))
+            self.analyze("int main() { int i = 5; i {} 2; return 0; }".replace('{}', op))
+
     def test_redefinition_block(self):
         with self.assertRaises(SemanticError):
             self.analyze("""
@@ -431,6 +444,114 @@ class SemanticAnalyzerTestCase(unittest.TestCase):
                 int main() {return 0;}
             """)
 
+    def test_symbol_table(self):
+        table = SymbolTable()
+        table.enter_scope('global')
+        outer = VarSymbol(''.join(['a']), None)
+        table.insert(outer)
+        table.enter_scope('main')
+        self.assertIs(table.lookup('a'), outer)
+        self.assertIsNone(table.lookup('a', current_scope_only=True))
+        inner = VarSymbol('a', None)
+        table.insert(inner)
+        self.assertIs(table.lookup('a', current_scope_only=True), inner)
+        self.assertEqual((outer.scope_level, inner.scope_level), (1, 2))
+        self.assertIs(outer.name, 'a')
+        table.leave_scope()
+        self.assertIs(table.lookup('a'), outer)
+        table.leave_scope()
+        self.assertIsNone(table.lookup('a'))
+
+    def test_symbol_resolution(self):
+        tree = self.analyze("""
+            int a;
+            int f(int a) { return a; }
+            int main() {
+                a = 1;
+                {
+                    int a = 2;
+                    {
+                        a = f(a);
+                    }
+                }
+                return a;
+            }
+        """)
+        names = [node for node in walk(tree) if isinstance(node, (Var, FunctionCall))]
+        self.assertTrue(all(node.symbol is not None for node in names))
+        self.assertEqual(
+            [node.symbol.scope_level for node in names if isinstance(node, Var)],
+            [1, 2, 2, 1, 3, 3, 3, 1]
+        )
+        calls = [node for node in names if isinstance(node, FunctionCall)]
+        self.assertIsInstance(calls[0].symbol, FunctionSymbol)
+        self.assertEqual(calls[0].symbol.params[0].name, 'a')
+
+    def test_expression_types(self):
+        tree = self.analyze("""
+            double half(double x) { return x / 2; }
+            int main() {
+                int i = 3;
+                char c = 'a';
+                double d;
+                d = i + c * 2.5;
+                i = d < i;
+                d = half(i);
+                return d;
+            }
+        """)
+        self.assertTrue(all(
+            node.c_type is not None for node in walk(tree) if isinstance(node, ExprNode)
+        ))
+        binops = [node for node in walk(tree) if isinstance(node, BinOp)]
+        # x / 2: 2 is converted to double
+        self.assertEqual((str(binops[0].c_type), binops[0].left.conversion, str(binops[0].right.conversion)),
+                         ('double', None, 'double'))
+        # i + c * 2.5 in float, c converted to float, then i
+        add, mul, less = binops[1:]
+        self.assertEqual((str(add.c_type), str(add.left.conversion)), ('float', 'float'))
+        self.assertEqual((str(mul.c_type), str(mul.left.conversion), mul.right.conversion),
+                         ('float', 'float', None))
+        # the float result is converted to double when assigned
+        self.assertEqual(str(add.conversion), 'double')
+        # a comparison is an int, its int operand is converted to double
+        self.assertEqual((str(less.c_type), less.left.conversion, str(less.right.conversion)),
+                         ('int', None, 'double'))
+        # the argument is converted to the parameter type, the returned value to the return type
+        call = next(node for node in walk(tree) if isinstance(node, FunctionCall))
+        self.assertEqual((str(call.c_type), str(call.args[0].conversion)), ('double', 'double'))
+        returns = [node.expression for node in walk(tree) if isinstance(node, ReturnStmt)]
+        self.assertEqual([str(node.conversion) for node in returns], ['None', 'int'])
+        assignments = [node for node in walk(tree) if isinstance(node, Assignment)]
+        self.assertEqual([str(node.c_type) for node in assignments], ['int', 'char', 'double', 'int', 'double'])
+
+    def test_diagnostics(self):
+        program = Interpreter.compile("""
+            double half(double x) { return x / 2; }
+            int main() {
+                int i = 3;
+                double d = 2.5;
+                i = d;
+                half(i); half(i);
+                return 0;
+            }
+        """)
+        self.assertEqual(
+            [(diagnostic.code, diagnostic.line, diagnostic.count) for diagnostic in program.diagnostics],
+            [('incompatible-assignment', 5, 1), ('incompatible-assignment', 6, 1), ('incompatible-arguments', 7, 2)]
+        )
+        self.assertEqual(
+            program.diagnostics.to_dict()['diagnostics'][2]['message'],
+            'Incompatibile argument types for function <half(double)> but found <half(int)>'
+        )
+
+        # only the first limit distinct diagnostics are kept
+        diagnostics = Diagnostics(limit=1)
+        tree = Parser(Lexer("int main() { int i; double d;\n i = d;\n d = i;\n i = d;\n return 0; }")).parse()
+        SemanticAnalyzer.analyze(tree, diagnostics=diagnostics)
+        self.assertEqual((len(diagnostics), diagnostics.dropped), (1, 2))
+        self.assertIn('2 more', diagnostics.format())
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,15 @@
 import unittest
 import os
-from interpreter.interpreter.interpreter import Interpreter
+import threading
+from interpreter.interpreter.interpreter import Interpreter, ResourceLimitExceeded
+from interpreter.interpreter.number import UninitializedRead
+from interpreter.interpreter.sanitizer import SanitizerError
+from interpreter.interpreter.profiler import Profiler
+from interpreter.interpreter.coverage import Coverage
+from interpreter.interpreter.stats import RunStats
+from interpreter.interpreter.incremental import IncrementalCompiler
+from interpreter.semantic_analysis.analyzer import SemanticError
+from interpreter.syntax_analysis.tree import walk, FunctionCall, FunctionDecl, ForStmt
 
 class InterpreterTestCase(unittest.TestCase):
     def interpret(self, text):
@@ -20,6 +29,565 @@ class InterpreterTestCase(unittest.TestCase):
                 print(">>>>> " + filename + " finished running.")
                 print()
 
+    def test_step_budget(self):
+        with self.assertRaises(ResourceLimitExceeded) as cm:
+            Interpreter.run("""
+                int spin(int a) {
+                    while (1) {
+                        a++;
+                    }
+                    return a;
+                }
+                int main() {
+                    return spin(0);
+                }
+            """, max_steps=10000)
+        self.assertEqual(cm.exception.call_stack, ['_init', 'main', 'spin'])
+        self.assertIn(cm.exception.line, range(2, 8))
+
+    def test_time_limit(self):
+        with self.assertRaises(ResourceLimitExceeded):
+            Interpreter.run("""
+                int main() {
+                    int i = 0;
+                    while (1) { i++; }
+                    return 0;
+                }
+            """, time_limit=0.2)
+
+    def test_profiler(self):
+        profiler = Profiler(interval=0.001)
+        Interpreter.run("""
+            int fib(int n) {
+                int r = n;
+                if (n >= 2) {
+                    r = fib(n - 1) + fib(n - 2);
+                }
+                return r;
+            }
+            int main() {
+                return fib(12) - 144;
+            }
+        """, profiler=profiler)
+        self.assertEqual(profiler.calls['fib'], 465)
+        self.assertGreater(profiler.line_evals[5], 0)
+        for line in profiler.collapsed_stacks().splitlines():
+            frames, weight = line.rsplit(' ', 1)
+            self.assertTrue(frames.startswith('main:'))
+            self.assertGreater(int(weight), 0)
+
+    def test_coverage(self):
+        code = """int main() {
+    int i;
+    int odd = 0;
+    for (i = 0; i < 5; i++) {
+        if (i % 2) {
+            odd++;
+        }
+    }
+    return odd - 2;
+}
+"""
+        coverage = Coverage(code)
+        Interpreter.run(code, coverage=coverage)
+        Interpreter.run(code, coverage=coverage)
+        self.assertEqual(coverage.runs, 2)
+        branches = {kind: dict(taken) for line, kind, taken in coverage.branch_counts()}
+        self.assertEqual(branches['IfStmt'], {'true': 4, 'false': 6})
+        self.assertEqual(branches['ForStmt'], {'true': 10, 'false': 2})
+
+        merged = Coverage(code)
+        Interpreter.run(code, coverage=merged)
+        merged.merge(coverage.to_dict())
+        self.assertEqual(merged.runs, 3)
+        self.assertEqual(merged.summary()['branches'], {'covered': 4, 'total': 4})
+
+    def test_logical_operators(self):
+        code = """
+            #include <stdio.h>
+            int calls;
+            int touch(int value) {
+                calls++;
+                return value;
+            }
+            int main() {
+                int a = 5 && 7, b = 0 || 3, c = !5, d = !0, e = 2 || touch(1), f = 0 && touch(1);
+                int g = 2 < 3 == 1, i, n = 0;
+                double x = 0.5;
+                for (i = 0; i < 10 && !(i > 6 || touch(0)); i++) {
+                    n += i != 3 ? 1 : 10;
+                }
+                printf("%d %d %d %d %d %d %d %d %d %d", a, b, c, d, e, f, g, n, calls, x > 0 && x < 1);
+                return 0;
+            }
+        """
+        program = Interpreter.compile(code)
+        result = program.execute()
+        self.assertEqual(result.stdout, '1 1 0 1 1 0 1 16 7 1')
+        # conditions are counted the same with and without instrumentation
+        coverage = Coverage(code)
+        self.assertEqual(program.execute(coverage=coverage).stats.steps, result.stats.steps)
+
+    def test_operators(self):
+        result = Interpreter.compile("""
+            #include <stdio.h>
+            #include <stdlib.h>
+            struct node {
+                int val;
+                struct node* next;
+            };
+            int main() {
+                int a = 1 << 4 >> 1, b = 29, c = 0 || 1 && 0;
+                b %= 8; b <<= 2; b |= 1; b ^= 3; b &= 14; b >>= 1;
+                int* p = malloc(8);
+                *(p + 1) = 7;
+                *p = -*(p + 1);
+                struct node x, y;
+                x.next = &y;
+                y.val = 5;
+                x.next->val++;
+                printf("%d %d %d %d %d", a, b, c, *p, x.next->val);
+                return 0;
+            }
+        """).execute()
+        self.assertEqual(result.stdout, '8 3 0 -7 6')
+
+    def test_stats(self):
+        stats = RunStats()
+        Interpreter.run("""
+            #include <stdlib.h>
+            int depth(int n) {
+                int r = 0;
+                if (n > 0) {
+                    r = depth(n - 1) + 1;
+                }
+                return r;
+            }
+            int main() {
+                int p = malloc(8);
+                int q = malloc(8);
+                free(p);
+                return depth(3) - 3;
+            }
+        """, stats=stats)
+        self.assertEqual(list(stats.phases), ['parse', 'analyze', 'execute'])
+        self.assertEqual((stats.heap.allocations, stats.heap.frees), (2, 1))
+        # _init, main and four nested calls of depth
+        self.assertEqual(stats.max_frame_depth, 6)
+        self.assertGreater(stats.tokens, stats.ast_nodes)
+        self.assertGreater(stats.steps, 0)
+        self.assertIn('"peak_memory_entries"', stats.to_json())
+
+    def test_heap_stats(self):
+        stats = Interpreter.compile("""
+            #include <stdlib.h>
+            int main() {
+                int i;
+                for (i = 0; i < 3; i++) {
+                    free(malloc(16));
+                }
+                int* p = malloc(4);
+                int* q = malloc(40);
+                free(p);
+                return 0;
+            }
+        """).execute().stats
+        heap = stats.heap
+        self.assertEqual((heap.allocations, heap.frees), (5, 4))
+        self.assertEqual((heap.live_blocks, heap.bytes_leaked, heap.peak_bytes), (1, 40, 44))
+        self.assertEqual(heap.top_sites, [(6, 3, 48), (9, 1, 40), (8, 1, 4)])
+        self.assertEqual([leak[1:] for leak in heap.leaks], [(40, 9)])
+        self.assertIn('"bytes_leaked": 40', stats.to_json())
+
+    def test_compiled_program(self):
+        program = Interpreter.compile("""
+            #include <stdio.h>
+            int main() {
+                int n, sum = 0, x;
+                scanf("%d", &n);
+                while (n > 0) {
+                    scanf("%d", &x);
+                    sum += x;
+                    n--;
+                }
+                printf("%d\\n", sum);
+                return sum % 256;
+            }
+        """)
+        first = program.execute(stdin='3\n1\n2\n3\n')
+        second = program.execute(stdin='1\n40\n')
+        self.assertEqual((first.status, first.stdout), (6, '6\n'))
+        self.assertEqual((second.status, second.stdout), (40, '40\n'))
+        self.assertEqual(list(first.stats.phases), ['parse', 'analyze', 'execute'])
+        self.assertEqual(list(program.stats.phases), ['parse', 'analyze'])
+        with self.assertRaises(ResourceLimitExceeded):
+            program.execute(stdin='1000000\n', max_steps=1000)
+
+    def test_argv(self):
+        program = Interpreter.compile("""
+            #include <stdio.h>
+            int main(int argc, int* argv) {
+                char* arg = *(argv + argc - 1);
+                while (*arg != 0) {
+                    putchar(*arg);
+                    arg++;
+                }
+                return argc;
+            }
+        """)
+        result = program.execute(argv=['prog', 'first', 'last'])
+        self.assertEqual((result.status, result.stdout), (3, 'last'))
+
+    def test_concurrent_executions(self):
+        program = Interpreter.compile("""
+            #include <stdio.h>
+            #include <stdlib.h>
+            int main() {
+                int seed, i;
+                scanf("%d", &seed);
+                srand(seed);
+                for (i = 0; i < 50; i++) {
+                    printf("%d ", rand());
+                }
+                return 0;
+            }
+        """)
+        expected = {seed: program.execute(stdin=str(seed)).stdout for seed in range(4)}
+        results = {}
+
+        def execute(seed):
+            results[seed] = program.execute(stdin=str(seed)).stdout
+
+        threads = [threading.Thread(target=execute, args=(seed % 4,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+        self.assertEqual(len(set(expected.values())), 4)
+
+    def test_call_site_cache(self):
+        program = Interpreter.compile("""
+            #include <math.h>
+            int twice(int a) {
+                return 2 * a;
+            }
+            int main() {
+                int i, total = 0;
+                for (i = 0; i < 5; i++) {
+                    total += twice(i) + sqrt(16);
+                }
+                return total;
+            }
+        """)
+        nodes = program.stats.ast_nodes
+        self.assertEqual(program.execute().status, 40)
+        calls = {node.name: node for node in walk(program.tree) if isinstance(node, FunctionCall)}
+        self.assertIsInstance(calls['twice'].callee[0], FunctionDecl)
+        self.assertEqual(calls['sqrt'].callee[0].__name__, 'sqrt')
+        # cached callees are not children of the call site
+        self.assertEqual(sum(1 for _ in walk(program.tree)), nodes)
+        self.assertEqual(program.execute().status, 40)
+
+    def test_bulk_math(self):
+        program = Interpreter.compile("""
+            #include <math.h>
+            #include <stdio.h>
+            #include <stdlib.h>
+            int main() {
+                int i;
+                double* a = malloc(400);
+                double* b = malloc(400);
+                double* c = malloc(400);
+                double* p = a;
+                double* q = b;
+                double* r = c;
+                for (i = 0; i < 100; i++) {
+                    *p = i * 37;
+                    p++;
+                }
+                vsqrt(b, a, 50);
+                vpow(b + 50, a, a, 4);
+                p = a;
+                for (i = 0; i < 54; i++) {
+                    if (i < 50) {
+                        *r = sqrt(*p);
+                    } else {
+                        *r = pow(*(p - 50), *(p - 50));
+                    }
+                    if (*q != *r) {
+                        printf("%d ", i);
+                    }
+                    p++;
+                    q++;
+                    r++;
+                }
+                return *(b + 3);
+            }
+        """)
+        result = program.execute()
+        self.assertEqual(result.stdout, '')
+        # malloc'd cells hold ints so the results are truncated, like the scalar loop does
+        self.assertEqual(result.status, 10)
+    def test_loop_idioms(self):
+        source = """
+            #include <stdio.h>
+            #include <stdlib.h>
+            int main() {
+                int i, n = 200, sum = 0;
+                int* a = malloc(4 * n);
+                int* b = malloc(4 * n);
+                int* p = a;
+                int* q;
+                int* self;
+                for (i = 0; i < n; i++) {
+                    *p = 7;
+                    p++;
+                }
+                p = a + 5;
+                *p = 100;
+                p = b;
+                q = a;
+                for (i = 0; i < n; ++i) {
+                    *p = *q;
+                    q++;
+                    p++;
+                }
+                p = b;
+                for (i = 1; i <= n; i += 1) {
+                    sum += *p;
+                    p++;
+                }
+                self = &self;
+                for (i = 0; i < 3; i++) {
+                    *self = 0;
+                    self++;
+                }
+                printf("%d %d %d %d %d", sum, i, *(b + 5), p, self);
+                return 0;
+            }
+        """
+        program = Interpreter.compile(source)
+        loops = [node for node in walk(program.tree) if isinstance(node, ForStmt)]
+        self.assertEqual([loop.idiom.kind for loop in loops], ['fill', 'copy', 'sum', 'fill'])
+        optimized = program.execute()
+        for loop in loops:
+            loop.idiom = None
+        interpreted = program.execute()
+        self.assertEqual(optimized.stdout, interpreted.stdout)
+        self.assertTrue(optimized.stdout.startswith('1493 3 100 '))
+        self.assertEqual(optimized.stats.steps, interpreted.stats.steps)
+
+    def test_string_memory_functions(self):
+        result = Interpreter.compile("""
+            #include <stdlib.h>
+            #include <string.h>
+            int main() {
+                int i;
+                int* a = malloc(16);
+                int* b = malloc(16);
+                int* p = a;
+                for (i = 0; i < 4; i++) {
+                    *p = i + 1;
+                    p++;
+                }
+                memcpy(b, a, 16);
+                memmove(a + 1, a, 12);
+                memset(b + 3, 0, 4);
+                return *b * 1000 + *(a + 1) * 100 + *(a + 3) * 10 + *(b + 3);
+            }
+        """).execute()
+        self.assertEqual(result.status, 1130)
+
+    def test_c_strings(self):
+        program = Interpreter.compile("""
+            #include <stdio.h>
+            #include <stdlib.h>
+            #include <string.h>
+            int main(int argc, int* argv) {
+                char* hello = "hello, world";
+                char* buf = malloc(64);
+                char* comma = strchr(hello, ',');
+                strcpy(buf, "abc");
+                strcat(buf, hello);
+                printf("%d %d %s|%s|%s\\n", strlen(hello), strlen(buf), buf, comma, strstr(hello, "wor"));
+                printf("%d %d %d %d\\n", strcmp("abc", "abd"), strcmp(hello, hello), strcmp("b", "a"), memcmp(buf, "abch", 4));
+                strncpy(buf, "xy", 5);
+                printf("%s %d %d\\n", buf, *(buf + 3), strchr(hello, 'z'));
+                printf("%s\\n", *(argv + 1));
+                *hello = 'J';
+                printf("%s %c\\n", hello, *(hello + 4));
+                return 0;
+            }
+        """)
+        result = program.execute(argv=['prog', 'arg1'])
+        self.assertEqual(result.stdout.splitlines(), [
+            '12 15 abchello, world|, world|world',
+            '-1 0 1 0',
+            'xy 0 0',
+            'arg1',
+            'Jello, world o',
+        ])
+        # literals are stored once per run, a new run starts with fresh ones
+        self.assertIn('hello', program.execute(argv=['prog', 'arg1']).stdout)
+
+    def test_uninitialized_policies(self):
+        program = Interpreter.compile("""
+            #include <stdio.h>
+            #include <stdlib.h>
+            int main() {
+                int x, y;
+                int* p = malloc(8);
+                y = x + 1;
+                printf("%d %d", y, *p);
+                return 0;
+            }
+        """)
+        self.assertEqual(program.execute().stdout, '1 0')
+        first = program.execute(uninitialized='random', seed=7).stdout
+        self.assertEqual(program.execute(uninitialized='random', seed=7).stdout, first)
+        self.assertNotEqual(program.execute(uninitialized='random', seed=8).stdout, first)
+        with self.assertRaises(UninitializedRead) as cm:
+            program.execute(uninitialized='poison')
+        self.assertEqual(cm.exception.line, 7)
+        self.assertIn('uninitialized int', str(cm.exception))
+
+    def test_sanitizer(self):
+        def run(body):
+            return Interpreter.compile("""
+                #include <stdio.h>
+                #include <stdlib.h>
+                #include <string.h>
+                int main() {
+                    int x;
+                    int* p = malloc(8);
+                    int* q = malloc(4);
+            """ + body + """
+                    return 0;
+                }
+            """).execute(sanitize=True)
+
+        result = run('*p = 1; free(p); free(q);')
+        self.assertEqual(result.leaks, [])
+        # free(NULL) does nothing
+        result = run('free(0); free(p); free(q);')
+        self.assertEqual((result.status, result.leaks), (0, []))
+        result = run('*q = 2; printf("%d", *q); free(p);')
+        self.assertEqual(result.stdout, '2')
+        self.assertEqual(len(result.leaks), 1)
+        self.assertEqual(result.leaks[0][1:], (4, 8))
+        self.assertIn('4 bytes leaked in 1 block', result.leak_report)
+
+        with self.assertRaises(UninitializedRead) as cm:
+            run('x = *q;')
+        self.assertEqual(cm.exception.line, 9)
+        with self.assertRaises(SanitizerError) as cm:
+            run('free(p);\nfree(p);')
+        self.assertEqual((cm.exception.kind, cm.exception.line), ('double-free', 10))
+        with self.assertRaises(SanitizerError) as cm:
+            run('*p = 1; free(p);\nx = *p;')
+        self.assertEqual((cm.exception.kind, cm.exception.line), ('heap-use-after-free', 10))
+        with self.assertRaises(SanitizerError) as cm:
+            run('free(p);\n*p = 1;')
+        self.assertEqual(cm.exception.kind, 'heap-use-after-free')
+        with self.assertRaises(SanitizerError) as cm:
+            run('free(&x);')
+        self.assertEqual(cm.exception.kind, 'invalid-free')
+        # string.h functions writing or reading a freed block
+        for body in ('free(p);\nmemset(p, 0, 8);', 'free(p);\nmemcpy(q, p, 4);', 'free(q);\nmemmove(q, p, 4);'):
+            with self.assertRaises(SanitizerError) as cm:
+                run('*p = 1; *q = 2; ' + body)
+            self.assertEqual((cm.exception.kind, cm.exception.line), ('heap-use-after-free', 10))
+        result = run('memset(p, 0, 8);\nx = *p; free(p); free(q);')
+        self.assertEqual((result.status, result.leaks), (0, []))
+
+    def test_incremental_compilation(self):
+        def lines(tree):
+            return [(type(node).__name__, node.line) for node in walk(tree)]
+
+        source = """
+            #include <stdio.h>
+            int scale;
+            int square(int a) {
+                return a * a;
+            }
+            int twice(int a) {
+                return 2 * a;
+            }
+            int main() {
+                scale = 3;
+                printf("%d %d", square(scale), twice(scale));
+                return 0;
+            }
+        """
+        compiler = IncrementalCompiler()
+        program = compiler.compile(source)
+        self.assertEqual(program.execute().stdout, '9 6')
+        self.assertEqual((compiler.reparsed, compiler.reanalyzed), (5, 3))
+
+        # a changed body, the functions after it move down by one line
+        edited = source.replace('return a * a;', 'int b;\n                b = a * a;\n                return b;')
+        program = compiler.compile(edited)
+        self.assertEqual(program.execute().stdout, '9 6')
+        self.assertEqual((compiler.reparsed, compiler.reanalyzed), (1, 1))
+        full = Interpreter.compile(edited)
+        self.assertEqual(lines(program.tree), lines(full.tree))
+        self.assertEqual(program.tree.positions.starts, full.tree.positions.starts)
+        self.assertEqual(program.tree.positions.ends, full.tree.positions.ends)
+        self.assertEqual(program.stats.tokens, full.stats.tokens)
+        self.assertEqual(program.stats.symbols, full.stats.symbols)
+
+        # main didn't change, but it calls twice with the wrong number of arguments now
+        with self.assertRaises(SemanticError):
+            compiler.compile(edited.replace('int twice(int a)', 'int twice(int a, int b)'))
+        # back to the last version that compiled, nothing to analyze again
+        program = compiler.compile(edited)
+        self.assertEqual((compiler.reparsed, compiler.reanalyzed), (1, 0))
+
+        # syntax errors are the ones of the serial parser
+        with self.assertRaises(Exception) as error:
+            compiler.compile(edited.replace('return 2 * a;', 'return 2 * ;'))
+        with self.assertRaises(Exception) as serial_error:
+            Interpreter.compile(edited.replace('return 2 * a;', 'return 2 * ;'))
+        self.assertEqual(str(error.exception), str(serial_error.exception))
+        self.assertEqual(compiler.compile(edited).execute().stdout, '9 6')
+
+        # main isn't parsed again, its call sites call the new square
+        program = compiler.compile(edited.replace('b = a * a;', 'b = a * a + 1;'))
+        self.assertEqual((compiler.reparsed, compiler.reanalyzed), (1, 1))
+        self.assertEqual(program.execute().stdout, '10 6')
+        # and the ones of twice, whose signature changed (square and main are analyzed again)
+        program = compiler.compile(edited.replace('int twice(int a)', 'double twice(int a)'))
+        self.assertEqual(compiler.reanalyzed, 3)
+        self.assertEqual(program.execute().stdout, '9 6')
+        program = compiler.compile(edited.replace('return 2 * a;', 'return 200 * a;'))
+        self.assertEqual(program.execute().stdout, '9 600')
+    def test_incremental_diagnostics(self):
+        def warnings(program):
+            return [(diagnostic.code, diagnostic.line) for diagnostic in program.diagnostics]
+
+        source = """
+            int helper(int a) {
+                return a + 1;
+            }
+            int main() {
+                int i;
+                double d = 2.5;
+                i = d;
+                return helper(i);
+            }
+        """
+        compiler = IncrementalCompiler()
+        program = compiler.compile(source)
+        self.assertEqual(warnings(program), [('incompatible-assignment', 7), ('incompatible-assignment', 8)])
+
+        # main isn't analyzed again, its warnings move down with it
+        edited = source.replace('return a + 1;', 'a = a + 1;\n                return a;')
+        program = compiler.compile(edited)
+        self.assertEqual(compiler.reanalyzed, 1)
+        self.assertEqual(warnings(program), [('incompatible-assignment', 8), ('incompatible-assignment', 9)])
+        self.assertEqual(warnings(program), warnings(Interpreter.compile(edited)))
+
 
 if __name__ == '__main__':
     unittest.main()
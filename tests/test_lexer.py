@@ -133,6 +133,41 @@ class LexerTestCase(unittest.TestCase):
             lexer=lexer
         )
 
+    def test_positions(self):
+        lexer = Lexer('int a;\n  /* x */ return 12;', line=3, offset=100, column=5)
+        positions = []
+        for _ in range(7):
+            token = lexer.get_next_token
+            positions.append((token.type, token.line, token.column, token.start, token.end))
+        self.assertEqual(positions, [
+            (INT, 3, 5, 100, 103),
+            (ID, 3, 9, 104, 105),
+            (SEMICOLON, 3, 10, 105, 106),
+            (RETURN, 4, 11, 117, 123),
+            (INTEGER_CONST, 4, 18, 124, 126),
+            (SEMICOLON, 4, 20, 126, 127),
+            (EOF, 4, 21, 127, 127),
+        ])
+
+    def test_collected_errors(self):
+        with self.assertRaises(LexicalError):
+            self.check_list(ID, lexer=Lexer('a @ b'))
+
+        lexer = Lexer('a @ b $ "c', max_errors=10)
+        self.check_list(ID, ID, STRING, lexer=lexer)
+        self.assertEqual([str(error) for error in lexer.errors], [
+            'LexicalError: Invalid char @ at line 1',
+            'LexicalError: Invalid char $ at line 1',
+            'LexicalError: Unterminated string literal at line 1',
+        ])
+        with self.assertRaises(LexicalError) as error:
+            lexer.raise_errors()
+        self.assertEqual(len(error.exception.errors), 3)
+
+        with self.assertRaises(LexicalError) as error:
+            self.check_list(ID, ID, lexer=Lexer('a @ b $ c', max_errors=2))
+        self.assertEqual(str(error.exception).count('Invalid char'), 2)
+
     
 if __name__ == '__main__':
     unittest.main()
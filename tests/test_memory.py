@@ -2,6 +2,7 @@ import unittest
 from interpreter.interpreter.memory import Memory
 from interpreter.interpreter.number import Number
 from interpreter.common.ctype import CType
+from interpreter.__builtins__ import math as c_math
 
 
 class TestMemory(unittest.TestCase):
@@ -38,6 +39,46 @@ class TestMemory(unittest.TestCase):
         self.assertEqual(memory['a'], Number(CType(type_spec='int'), 1))
         memory.del_frame()
         self.assertTrue(memory.stack.is_empty())
+
+    def test_scopes(self):
+        int_type = CType(type_spec='int')
+        memory = Memory()
+        memory.new_frame('main')
+        memory.declare_num(int_type, 'a')
+        memory['a'] = Number(int_type, 1)
+        outer = memory.get_value_in_scope('a')
+        for _ in range(3):
+            memory.new_scope()
+            memory.declare_num(int_type, 'a')
+            memory.declare_num(int_type, 'b')
+            memory['a'] = Number(int_type, 2)
+            self.assertEqual(memory['a'], Number(int_type, 2))
+            memory.new_scope()
+            self.assertIn('main.scope_02', repr(memory.stack.curr_frame))
+            memory.del_scope()
+            memory.del_scope()
+            self.assertEqual(memory.get_value_in_scope('a'), outer)
+            self.assertEqual(memory['a'], Number(int_type, 1))
+            self.assertNotIn('b', memory.stack.curr_frame)
+        frame = memory.stack.curr_frame
+        self.assertEqual((frame._log[-1][0], frame._marks), ('a', []))
+        self.assertIn('main.scope_00\na:{}'.format(outer), repr(frame))
         
+
+    def test_bulk_math(self):
+        double = CType.from_string('double')
+        values = [0.0, 1e-7, 0.5, 2.0, 3.25, 1e6, 123456.789, 7.0]
+        # the scalar path reads the stored (already wrapped) values
+        expected = [Number(double, c_math.sqrt(Number(double, value).value)) for value in values]
+        memory = Memory()
+        src = memory.allocate(4 * len(values))
+        for idx, value in enumerate(values):
+            memory.set_at_address(src + 4 * idx, Number(double, value))
+        c_math.vsqrt(src, src, len(values), memory)
+        result = [memory.get_at_address(src + 4 * idx) for idx in range(len(values))]
+        self.assertEqual([num.value for num in result], [num.value for num in expected])
+        self.assertTrue(all(num.c_type == double for num in result))
+
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
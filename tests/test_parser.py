@@ -2,7 +2,11 @@ import unittest
 from interpreter.lexical_analysis.lexer import Lexer
 from interpreter.syntax_analysis.parser import Parser
 from interpreter.syntax_analysis.parser import SyntaxError
+from interpreter.syntax_analysis.parallel import parse_parallel, split_declarations
 from interpreter.syntax_analysis.tree import *
+from interpreter.lexical_analysis.token import Token
+from interpreter.lexical_analysis.token_type import INTEGER_CONST
+from interpreter.common.visitor import Visitor
 
 class ParserTestCase(unittest.TestCase):
 
@@ -270,5 +274,203 @@ class ParserTestCase(unittest.TestCase):
         parser.parse()
 
 
+    def test_node_kinds(self):
+        tree = self.make_parser("""
+            int main() {
+                int a = (int)2.5, b;
+                b = !a && a < 3;
+                b += -a;
+                return 0;
+            }
+        """).parse()
+        nodes = list(walk(tree))
+        self.assertTrue(all(not hasattr(node, '__dict__') for node in nodes))
+        self.assertTrue(all(NODE_CLASSES[node.kind] is type(node) for node in nodes))
+        ops = [(type(node).__name__, Op.name(node.op)) for node in nodes if isinstance(node, (BinOp, UnOp, Assignment))]
+        self.assertIn(('UnOp', 'CAST'), ops)
+        self.assertIn(('BinOp', 'LOG_AND_OP'), ops)
+        self.assertIn(('UnOp', 'LOG_NEG'), ops)
+        self.assertIn(('Assignment', 'ADD_ASSIGN'), ops)
+        cast = next(node for node in nodes if isinstance(node, UnOp) and node.op == Op.CAST)
+        self.assertIn(cast.type_node, nodes)
+        self.assertEqual([node.op for node in nodes if isinstance(node, Num)],
+                         [Op.REAL_CONST, Op.INTEGER_CONST, Op.INTEGER_CONST])
+
+
+    def test_visitor_dispatch(self):
+        class Counter(Visitor):
+            def __init__(self):
+                self.nums = 0
+
+            def visit_Num(self, node):
+                self.nums += 1
+
+        class Names(Visitor):
+            def visit_Num(self, node):
+                return 'num'
+
+        tree = self.make_parser("int main() { int a = 1 + 2; }").parse()
+        nums = [node for node in walk(tree) if isinstance(node, Num)]
+        counter = Counter()
+        for node in nums:
+            counter.visit(node)
+        self.assertEqual(counter.nums, 2)
+        self.assertEqual(Names().visit(nums[0]), 'num')
+        self.assertIsNot(Counter._dispatch, Names._dispatch)
+        with self.assertRaises(Exception):
+            counter.visit(tree)
+
+
+    def test_expression_precedence(self):
+        def parse(expression):
+            tree = self.make_parser("int main() { x = " + expression + "; }").parse()
+            return tree.children[0].body.children[0].right
+
+        def show(node):
+            if isinstance(node, BinOp):
+                return '({} {} {})'.format(show(node.left), Op.name(node.op), show(node.right))
+            if isinstance(node, UnOp):
+                if node.op == Op.CAST:
+                    return '(CAST {} {})'.format(show(node.type_node), show(node.expr))
+                return '({} {})'.format(Op.name(node.op), show(node.expr))
+            if isinstance(node, FieldAccess):
+                return '{}{}{}'.format(show(node.var), '.' if node.op == Op.DOT else '->', node.field.value)
+            if isinstance(node, Type):
+                return str(node.c_type)
+            return str(node.value)
+
+        self.assertEqual(show(parse('a || b && c')), '(a LOG_OR_OP (b LOG_AND_OP c))')
+        self.assertEqual(show(parse('a && b || c')), '((a LOG_AND_OP b) LOG_OR_OP c)')
+        self.assertEqual(show(parse('1 << 2 + 3 < 4')), '((1 LEFT_OP (2 PLUS 3)) LT_OP 4)')
+        self.assertEqual(show(parse('a - b - c * d % e')), '((a MINUS b) MINUS ((c ASTERISK d) MOD_OP e))')
+        self.assertEqual(show(parse('a & b ^ c | d == e')), '(((a AMPERSAND b) XOR_OP c) OR_OP (d EQ_OP e))')
+        self.assertEqual(show(parse('-(int*)p + 1')), '((MINUS (CAST int * p)) PLUS 1)')
+        self.assertEqual(show(parse('p->next->val++')), '(INC_OP p->next->val)')
+        self.assertEqual(show(parse('!*p')), '(LOG_NEG (ASTERISK p))')
+
+        assignment = parse('y %= z <<= 2')
+        self.assertEqual((Op.name(assignment.op), Op.name(assignment.right.op)), ('MOD_ASSIGN', 'LEFT_ASSIGN'))
+        with self.assertRaises(SyntaxError):
+            parse('a + b = c')
+
+    def test_parallel_parse(self):
+        def dump(tree):
+            nodes = []
+            for node in walk(tree):
+                fields = [(name, str(getattr(node, name, None)))
+                          for cls in type(node).__mro__ for name in getattr(cls, '__slots__', ())
+                          if not isinstance(getattr(node, name, None), (AstNode, list, Positions))]
+                nodes.append((type(node).__name__, fields))
+            return nodes
+
+        text = """
+            #include <stdio.h>
+            struct point { int x; int y; };
+            int total;   /* } { */
+
+            int add(int a, int b) {
+                // }
+                if (a > b) { return a + b; }
+                return a + b;
+            }
+            char brace = '}';
+
+            int main() {
+                printf("{ %d", add(1, 2));
+                return 0;
+            }
+        """
+        ends = split_declarations(text)
+        self.assertEqual(len(ends), 6)
+        self.assertEqual(text[ends[0] - 1], '>')
+        self.assertEqual(text[ends[3] - 1], '}')
+        self.assertEqual(split_declarations('int main() { '), None)
+
+        serial_tree = self.make_parser(text).parse()
+        tree, tokens = parse_parallel(text, workers=2, min_batch_chars=1)
+        self.assertEqual(dump(tree), dump(serial_tree))
+        self.assertEqual([node.line for node in walk(tree)], [node.line for node in walk(serial_tree)])
+        self.assertEqual(tree.positions.starts, serial_tree.positions.starts)
+        self.assertEqual(tree.positions.ends, serial_tree.positions.ends)
+
+        parser = self.make_parser(text)
+        parser.parse()
+        self.assertEqual(tokens, parser.lexer.token_count)
+
+        broken = text.replace('return 0;', 'return 0')
+        with self.assertRaises(SyntaxError) as serial_error:
+            self.make_parser(broken).parse()
+        with self.assertRaises(SyntaxError) as parallel_error:
+            parse_parallel(broken, workers=2, min_batch_chars=1)
+        self.assertEqual(str(parallel_error.exception), str(serial_error.exception))
+
+    def test_error_recovery(self):
+        text = """
+            int f(int a {
+                return a;
+            }
+            int main() {
+                int a = 3 +;
+                a = 2 @ 1;
+                if (a) {
+                    a = ;
+                    a = 1;
+                }
+                return a;
+            }
+            int b = ;
+        """
+        with self.assertRaises(SyntaxError) as error:
+            self.make_parser(text).parse()
+        self.assertEqual(len(error.exception.errors), 1)
+
+        with self.assertRaises(SyntaxError) as error:
+            Parser(Lexer(text, max_errors=20)).parse()
+        messages = [str(e) for e in error.exception.errors]
+        self.assertEqual(messages, [
+            'SyntaxError: Expected token <RPAREN> but found <LBRACKET> at line 2.',
+            'SyntaxError: Expected token <ID> but found <SEMICOLON> at line 6.',
+            'LexicalError: Invalid char @ at line 7',
+            'SyntaxError: Expected token <SEMICOLON> but found <INTEGER_CONST> at line 7.',
+            'SyntaxError: Expected token <ID> but found <SEMICOLON> at line 9.',
+            'SyntaxError: Expected token <ID> but found <SEMICOLON> at line 14.',
+        ])
+        self.assertEqual(str(error.exception), '\n'.join(messages))
+
+        with self.assertRaises(SyntaxError) as error:
+            Parser(Lexer(text, max_errors=3)).parse()
+        self.assertEqual(len(error.exception.errors), 3)
+
+        with self.assertRaises(SyntaxError) as error:
+            parse_parallel(text, workers=2, min_batch_chars=1, max_errors=20)
+        self.assertEqual([str(e) for e in error.exception.errors], messages)
+
+    def test_positions(self):
+        text = "int main() {\n    int a;\n    a = 1 +\n        2 * 3;\n    if (a) {\n        a++;\n    }\n    return a;\n}\n"
+        tree = self.make_parser(text).parse()
+        positions = tree.positions
+        body = tree.children[0].body.children
+        declaration, assignment, if_stmt, return_stmt = body
+
+        def source(node):
+            start, end = positions.span(node)
+            return text[start:end]
+
+        self.assertEqual(source(tree.children[0]), text.strip())
+        self.assertEqual(source(declaration), 'int a')
+        self.assertEqual(source(assignment), 'a = 1 +\n        2 * 3')
+        self.assertEqual(source(assignment.right.right), '2 * 3')
+        self.assertEqual(source(if_stmt), 'if (a) {\n        a++;\n    }')
+        self.assertEqual(source(if_stmt.true_body.children[0]), 'a++')
+        self.assertEqual(source(return_stmt), 'return a;')
+
+        # a node starts on the line of its first token
+        self.assertEqual([node.line for node in body], [2, 3, 5, 8])
+        self.assertEqual(assignment.right.right.line, 4)
+        self.assertEqual(positions.start(assignment.right.right), (4, 9, text.index('2 * 3')))
+        self.assertEqual(positions.end(if_stmt), (7, 6, text.index('}\n    return') + 1))
+        self.assertEqual(positions.span(Num(Token(INTEGER_CONST, 0), line=0)), None)
+
+
 if __name__ == '__main__':
     unittest.main()